@@ -0,0 +1,143 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import AsyncIterator, Callable, Optional, TypeVar
+
+from src.backend.backend import Backend
+from src.backend.data_classes import Match, Player, Sport
+from src.backend.rating import Ratings
+from src.backend.unit_of_work import UnitOfWork
+
+T = TypeVar("T")
+
+
+class AsyncBackend(ABC):
+    """
+    asyncio counterpart of `src.backend.backend.Backend`.
+    """
+
+    @abstractmethod
+    async def wipe(self) -> None:
+        ...
+
+    @abstractmethod
+    async def create_player(self, player: Player) -> Player:
+        ...
+
+    @abstractmethod
+    async def get_player(self, id: str) -> Optional[Player]:
+        ...
+
+    @abstractmethod
+    async def list_players(self) -> list[Player]:
+        ...
+
+    async def list_player_names(self) -> dict[str, str]:
+        return {player.id: player.name for player in await self.list_players()}
+
+    async def get_player_by_name(self, name: str) -> Optional[Player]:
+        name = name.lower()
+        return next((player for player in await self.list_players() if player.name.lower() == name), None)
+
+    async def is_name_taken(self, name: str) -> bool:
+        name = name.lower()
+        return any(player_name.lower() == name for player_name in (await self.list_player_names()).values())
+
+    @abstractmethod
+    async def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
+        ...
+
+    @abstractmethod
+    async def create_match(self, match: Match) -> Match:
+        ...
+
+    @abstractmethod
+    async def list_matches(self, sport: Sport) -> list[Match]:
+        ...
+
+    @abstractmethod
+    async def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        ...
+
+    @abstractmethod
+    async def delete_match(self, match: Match) -> None:
+        ...
+
+    @abstractmethod
+    async def update_matches(self, matches: list[Match]) -> None:
+        ...
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[UnitOfWork]:
+        unit_of_work = UnitOfWork()
+        yield unit_of_work
+        await self.commit(unit_of_work)
+
+    async def commit(self, unit_of_work: UnitOfWork) -> None:
+        for match in unit_of_work.deleted_matches:
+            await self.delete_match(match)
+        for match in unit_of_work.matches:
+            await self.create_match(match)
+        if unit_of_work.updated_matches:
+            await self.update_matches(unit_of_work.updated_matches)
+        for player_update in unit_of_work.player_updates:
+            await self.update_player(player_update.player.id, name=player_update.name, ratings=player_update.ratings)
+
+
+class ExecutorAsyncBackend(AsyncBackend):
+    """
+    Exposes a blocking backend as an AsyncBackend by running each call in an executor, so the event loop is free to
+    serve other requests while waiting for the round trip.
+    """
+
+    def __init__(self, backend: Backend, executor: Optional[Executor] = None) -> None:
+        self._backend = backend
+        self._executor = executor
+
+    async def _run(self, fn: Callable[..., T], *args: object, **kwargs: object) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def wipe(self) -> None:
+        await self._run(self._backend.wipe)
+
+    async def create_player(self, player: Player) -> Player:
+        return await self._run(self._backend.create_player, player)
+
+    async def get_player(self, id: str) -> Optional[Player]:
+        return await self._run(self._backend.get_player, id)
+
+    async def list_players(self) -> list[Player]:
+        return await self._run(self._backend.list_players)
+
+    async def list_player_names(self) -> dict[str, str]:
+        return await self._run(self._backend.list_player_names)
+
+    async def get_player_by_name(self, name: str) -> Optional[Player]:
+        return await self._run(self._backend.get_player_by_name, name)
+
+    async def is_name_taken(self, name: str) -> bool:
+        return await self._run(self._backend.is_name_taken, name)
+
+    async def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
+        return await self._run(self._backend.update_player, id, name=name, ratings=ratings)
+
+    async def create_match(self, match: Match) -> Match:
+        return await self._run(self._backend.create_match, match)
+
+    async def list_matches(self, sport: Sport) -> list[Match]:
+        return await self._run(self._backend.list_matches, sport)
+
+    async def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        return await self._run(self._backend.get_latest_match, sport)
+
+    async def delete_match(self, match: Match) -> None:
+        await self._run(self._backend.delete_match, match)
+
+    async def update_matches(self, matches: list[Match]) -> None:
+        await self._run(self._backend.update_matches, matches)
+
+    async def commit(self, unit_of_work: UnitOfWork) -> None:
+        await self._run(self._backend.commit, unit_of_work)
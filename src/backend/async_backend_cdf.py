@@ -0,0 +1,19 @@
+from concurrent.futures import Executor
+from typing import Optional
+
+from cognite.client import CogniteClient
+
+from src.backend.async_backend import ExecutorAsyncBackend
+from src.backend.backend_cdf import BackendCdf
+
+
+class AsyncBackendCdf(ExecutorAsyncBackend):
+    """
+    Runs the blocking CogniteClient calls of BackendCdf in an executor.
+    """
+
+    def __init__(
+        self, root_asset_external_id: str, cognite_client: CogniteClient, executor: Optional[Executor] = None
+    ) -> None:
+        self.backend_cdf = BackendCdf(root_asset_external_id, cognite_client)
+        super().__init__(self.backend_cdf, executor)
@@ -0,0 +1,47 @@
+from typing import Optional
+
+from src.backend.async_backend import AsyncBackend
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Match, Player, Sport
+from src.backend.rating import Ratings
+
+
+class AsyncBackendInMemory(AsyncBackend):
+    def __init__(self) -> None:
+        self._backend = BackendInMemory()
+
+    async def wipe(self) -> None:
+        self._backend.wipe()
+
+    async def create_player(self, player: Player) -> Player:
+        return self._backend.create_player(player)
+
+    async def get_player(self, id: str) -> Optional[Player]:
+        return self._backend.get_player(id)
+
+    async def list_players(self) -> list[Player]:
+        return self._backend.list_players()
+
+    async def get_player_by_name(self, name: str) -> Optional[Player]:
+        return self._backend.get_player_by_name(name)
+
+    async def is_name_taken(self, name: str) -> bool:
+        return self._backend.is_name_taken(name)
+
+    async def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
+        return self._backend.update_player(id, name=name, ratings=ratings)
+
+    async def create_match(self, match: Match) -> Match:
+        return self._backend.create_match(match)
+
+    async def list_matches(self, sport: Sport) -> list[Match]:
+        return self._backend.list_matches(sport)
+
+    async def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        return self._backend.get_latest_match(sport)
+
+    async def delete_match(self, match: Match) -> None:
+        self._backend.delete_match(match)
+
+    async def update_matches(self, matches: list[Match]) -> None:
+        self._backend.update_matches(matches)
@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from contextlib import contextmanager
+from typing import Iterator, Optional
 
 from src.backend.data_classes import Match, Player, Sport
+from src.backend.match_table import MatchTable
 from src.backend.rating import Ratings
+from src.backend.unit_of_work import UnitOfWork
 
 
 class Backend(ABC):
@@ -22,6 +25,26 @@ class Backend(ABC):
     def list_players(self) -> list[Player]:
         ...
 
+    def list_player_names(self) -> dict[str, str]:
+        """
+        Returns the name of every player by id, for callers that do not need the ratings.
+        """
+        return {player.id: player.name for player in self.list_players()}
+
+    def get_player_by_name(self, name: str) -> Optional[Player]:
+        """
+        Returns the player with the given name, compared case-insensitively, or None if there is none.
+        """
+        name = name.lower()
+        return next((player for player in self.list_players() if player.name.lower() == name), None)
+
+    def is_name_taken(self, name: str) -> bool:
+        """
+        Returns whether some player already has the given name, compared case-insensitively.
+        """
+        name = name.lower()
+        return any(player_name.lower() == name for player_name in self.list_player_names().values())
+
     @abstractmethod
     def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
         ...
@@ -32,4 +55,50 @@ class Backend(ABC):
 
     @abstractmethod
     def list_matches(self, sport: Sport) -> list[Match]:
+        """
+        Returns all matches of the given sport, in the order they were registered.
+        """
+        ...
+
+    def list_matches_table(self, sport: Optional[Sport] = None) -> MatchTable:
+        """
+        Returns the matches of the given sport, or of all sports, as a columnar table. The matches of each sport are in
+        the order they were registered.
+        """
+        sports = list(Sport) if sport is None else [sport]
+        return MatchTable.from_matches(match for s in sports for match in self.list_matches(s))
+
+    @abstractmethod
+    def get_latest_match(self, sport: Sport) -> Optional[Match]:
         ...
+
+    @abstractmethod
+    def delete_match(self, match: Match) -> None:
+        ...
+
+    @abstractmethod
+    def update_matches(self, matches: list[Match]) -> None:
+        """
+        Replaces the stored matches that have the same ids as the given ones, e.g. to correct the ratings stored with
+        them.
+        """
+        ...
+
+    @contextmanager
+    def transaction(self) -> Iterator[UnitOfWork]:
+        """
+        Collects the writes made on the yielded unit of work and commits them when the block exits without errors.
+        """
+        unit_of_work = UnitOfWork()
+        yield unit_of_work
+        self.commit(unit_of_work)
+
+    def commit(self, unit_of_work: UnitOfWork) -> None:
+        for match in unit_of_work.deleted_matches:
+            self.delete_match(match)
+        for match in unit_of_work.matches:
+            self.create_match(match)
+        if unit_of_work.updated_matches:
+            self.update_matches(unit_of_work.updated_matches)
+        for player_update in unit_of_work.player_updates:
+            self.update_player(player_update.player.id, name=player_update.name, ratings=player_update.ratings)
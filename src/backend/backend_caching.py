@@ -0,0 +1,205 @@
+import time
+from copy import copy
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from src.backend.backend import Backend
+from src.backend.data_classes import Match, Player, Sport
+from src.backend.rating import Ratings
+from src.backend.unit_of_work import UnitOfWork
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+class CachingBackend(Backend):
+    """
+    Write-through cache in front of another backend. Players and matches are kept in memory and served from there
+    until they are older than `ttl` seconds (never, if `ttl` is None) or explicitly invalidated. Players are handed
+    out as copies, so callers cannot change the cached ones.
+    """
+
+    def __init__(
+        self, backend: Backend, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._backend = backend
+        self._ttl = ttl
+        self._clock = clock
+        self.stats = CacheStats()
+
+        self._players: dict[str, tuple[Player, float]] = {}
+        # Lowercase name to id of the cached players
+        self._player_ids_by_name: dict[str, str] = {}
+        self._players_listed_until: Optional[float] = None
+        self._matches: dict[Sport, tuple[list[Match], float]] = {}
+
+    def _expires_at(self) -> float:
+        return float("inf") if self._ttl is None else self._clock() + self._ttl
+
+    def _is_fresh(self, expires_at: Optional[float]) -> bool:
+        return expires_at is not None and self._clock() < expires_at
+
+    def _hit(self) -> None:
+        self.stats.hits += 1
+
+    def _miss(self) -> None:
+        self.stats.misses += 1
+
+    def _cache_player(self, player: Player, expires_at: Optional[float] = None) -> None:
+        self._forget_player(player.id)
+        self._players[player.id] = (copy(player), self._expires_at() if expires_at is None else expires_at)
+        self._player_ids_by_name[player.name.lower()] = player.id
+
+    def _forget_player(self, id: str) -> None:
+        if id in self._players:
+            name = self._players.pop(id)[0].name.lower()
+            if self._player_ids_by_name.get(name) == id:
+                del self._player_ids_by_name[name]
+
+    def invalidate(self) -> None:
+        self._players = {}
+        self._player_ids_by_name = {}
+        self._players_listed_until = None
+        self._matches = {}
+
+    def invalidate_player(self, id: str) -> None:
+        self._forget_player(id)
+        self._players_listed_until = None
+
+    def invalidate_matches(self, sport: Optional[Sport] = None) -> None:
+        if sport is None:
+            self._matches = {}
+        else:
+            self._matches.pop(sport, None)
+
+    def wipe(self) -> None:
+        self._backend.wipe()
+        self.invalidate()
+
+    def create_player(self, player: Player) -> Player:
+        created_player = self._backend.create_player(player)
+        self._cache_player(created_player)
+        return created_player
+
+    def _cached_player(self, id: str) -> Optional[Player]:
+        if id in self._players:
+            player, expires_at = self._players[id]
+            if self._is_fresh(expires_at):
+                return copy(player)
+        return None
+
+    def get_player(self, id: str) -> Optional[Player]:
+        cached_player = self._cached_player(id)
+        if cached_player is not None:
+            self._hit()
+            return cached_player
+        self._miss()
+        fetched_player = self._backend.get_player(id)
+        if fetched_player is None:
+            self._forget_player(id)
+        else:
+            self._cache_player(fetched_player)
+        return fetched_player
+
+    def list_players(self) -> list[Player]:
+        if self._is_fresh(self._players_listed_until):
+            self._hit()
+            return [copy(player) for player, _ in self._players.values()]
+        self._miss()
+        players = self._backend.list_players()
+        expires_at = self._expires_at()
+        self._players = {}
+        self._player_ids_by_name = {}
+        for player in players:
+            self._cache_player(player, expires_at)
+        self._players_listed_until = expires_at
+        return players
+
+    def get_player_by_name(self, name: str) -> Optional[Player]:
+        id = self._player_ids_by_name.get(name.lower())
+        cached_player = self._cached_player(id) if id is not None else None
+        if cached_player is not None:
+            self._hit()
+            return cached_player
+        # Names of players that are not cached, or were renamed by another writer, are looked up in the backend
+        self._miss()
+        player = self._backend.get_player_by_name(name)
+        if player is not None:
+            self._cache_player(player)
+        return player
+
+    def is_name_taken(self, name: str) -> bool:
+        return self._backend.is_name_taken(name)
+
+    def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
+        updated_player = self._backend.update_player(id, name=name, ratings=ratings)
+        self._cache_player(updated_player)
+        return updated_player
+
+    def create_match(self, match: Match) -> Match:
+        created_match = self._backend.create_match(match.with_id())
+        if match.sport in self._matches:
+            self._matches[match.sport][0].append(created_match)
+        return created_match
+
+    def list_matches(self, sport: Sport) -> list[Match]:
+        if sport in self._matches:
+            matches, expires_at = self._matches[sport]
+            if self._is_fresh(expires_at):
+                self._hit()
+                return list(matches)
+        self._miss()
+        matches = self._backend.list_matches(sport)
+        self._matches[sport] = (list(matches), self._expires_at())
+        return matches
+
+    def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        if sport in self._matches:
+            matches, expires_at = self._matches[sport]
+            if self._is_fresh(expires_at):
+                self._hit()
+                return matches[-1] if matches else None
+        self._miss()
+        return self._backend.get_latest_match(sport)
+
+    def delete_match(self, match: Match) -> None:
+        self._backend.delete_match(match)
+        self._forget_match(match)
+
+    def update_matches(self, matches: list[Match]) -> None:
+        self._backend.update_matches(matches)
+        self._update_cached_matches(matches)
+
+    def _update_cached_matches(self, matches: list[Match]) -> None:
+        updated_matches = {match.id: match for match in matches}
+        for sport in {match.sport for match in matches}:
+            if sport in self._matches:
+                cached_matches = self._matches[sport][0]
+                cached_matches[:] = [updated_matches.get(m.id, m) for m in cached_matches]
+
+    def _forget_match(self, match: Match) -> None:
+        if match.sport in self._matches:
+            matches = self._matches[match.sport][0]
+            if matches and matches[-1].id == match.id:
+                matches.pop()
+            else:
+                matches[:] = [m for m in matches if m.id != match.id]
+
+    def commit(self, unit_of_work: UnitOfWork) -> None:
+        self._backend.commit(unit_of_work)
+        for match in unit_of_work.deleted_matches:
+            self._forget_match(match)
+        for match in unit_of_work.matches:
+            if match.sport in self._matches:
+                self._matches[match.sport][0].append(match)
+        self._update_cached_matches(unit_of_work.updated_matches)
+        for player_update in unit_of_work.player_updates:
+            self._cache_player(player_update.updated_player())
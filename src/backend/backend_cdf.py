@@ -1,26 +1,55 @@
 import time
-from dataclasses import fields
+from dataclasses import dataclass, fields
 from enum import Enum
 from typing import Optional
 
 from cognite.client import CogniteClient
-from cognite.client.data_classes import Asset, Event, TimeSeries
+from cognite.client.data_classes import Asset, AssetUpdate, Event, EventUpdate, TimeSeries
 
 from src.backend.backend import Backend
-from src.backend.data_classes import Hand, Match, Player, Sport
+from src.backend.data_classes import Hand, LazyPlayer, Match, Player, Sport
+from src.backend.datapoint_queue import Datapoint, DatapointQueue
 from src.backend.rating import Ratings
+from src.backend.unit_of_work import PlayerUpdate, UnitOfWork
 
 STARTING_RATING = 1000
 SPORT = "Sport"
 MATCH = "Match"
 HAND = "Hand"
 RATINGS = "Ratings"
+# Prefix of the match ids given to events created before matches had ids of their own
+LEGACY_EVENT_ID_PREFIX = "event:"
+
+
+@dataclass
+class RatingUpdate:
+    player_id: str
+    name: str
+    old_ratings: Ratings
+    new_ratings: Ratings
+
+    def changed_ratings(self) -> list[tuple[Hand, Sport, int]]:
+        old_ratings = set(self.old_ratings)
+        return [rating for rating in self.new_ratings if rating not in old_ratings]
 
 
 class BackendCdf(Backend):
-    def __init__(self, root_asset_external_id: str, cognite_client: CogniteClient) -> None:
+    def __init__(
+        self,
+        root_asset_external_id: str,
+        cognite_client: CogniteClient,
+        datapoint_queue: Optional[DatapointQueue] = None,
+    ) -> None:
         self.root_asset_external_id = root_asset_external_id
         self.client = cognite_client
+        # Rating datapoints are written behind through this queue if given, and inserted directly otherwise. The queue
+        # is started by the caller, since it outlives attempts to create the backend.
+        self._datapoint_queue = datapoint_queue
+        self._asset_ids: dict[str, int] = {}
+        self._time_series_ids: dict[tuple[str, Hand, Sport], int] = {}
+        self._time_series_indexed_players: set[str] = set()
+        # Lowercase player name to player id, loaded on first use and kept up to date by this backend's writes
+        self._player_ids_by_name: Optional[dict[str, str]] = None
 
         self.root_asset = self.client.assets.retrieve(external_id=root_asset_external_id)
         if self.root_asset is None:
@@ -40,6 +69,10 @@ class BackendCdf(Backend):
         self.client.events.delete(events_to_delete)
 
         self.client.assets.delete(external_id=self.root_asset_external_id, recursive=True)
+        self._asset_ids = {}
+        self._time_series_ids = {}
+        self._time_series_indexed_players = set()
+        self._player_ids_by_name = None
 
     def create_player(self, player: Player) -> Player:
         asset = self.client.assets.create(
@@ -47,9 +80,10 @@ class BackendCdf(Backend):
                 external_id=player.id,
                 name=player.name,
                 parent_id=self.root_asset.id,
-                metadata={RATINGS: Ratings().to_json()},
+                metadata={RATINGS: Ratings().encode()},
             )
         )
+        self._index_name(player.id, None, player.name)
         return self._player_from_asset(asset)
 
     def get_player(self, id: str) -> Optional[Player]:
@@ -59,55 +93,140 @@ class BackendCdf(Backend):
         return None
 
     def list_players(self) -> list[Player]:
-        player_assets = [
+        return [self._player_from_asset(asset) for asset in self._list_player_assets()]
+
+    def list_player_names(self) -> dict[str, str]:
+        assets = self._list_player_assets()
+        self._asset_ids.update({asset.external_id: asset.id for asset in assets})
+        return {asset.external_id: asset.name for asset in assets}
+
+    def get_player_by_name(self, name: str) -> Optional[Player]:
+        id = self._name_index().get(name.lower())
+        return self.get_player(id) if id is not None else None
+
+    def is_name_taken(self, name: str) -> bool:
+        return name.lower() in self._name_index()
+
+    def _list_player_assets(self) -> list[Asset]:
+        assets = [
             p for p in self.client.assets.list(limit=-1, root_ids=[self.root_asset.id]) if p.id != self.root_asset.id
         ]
-        return [self._player_from_asset(asset) for asset in player_assets]
+        self._player_ids_by_name = {asset.name.lower(): asset.external_id for asset in assets}
+        return assets
+
+    def _name_index(self) -> dict[str, str]:
+        if self._player_ids_by_name is None:
+            self._list_player_assets()
+        return self._player_ids_by_name or {}
+
+    def _index_name(self, id: str, old_name: Optional[str], new_name: str) -> None:
+        if self._player_ids_by_name is None:
+            return
+        if old_name is not None and self._player_ids_by_name.get(old_name.lower()) == id:
+            del self._player_ids_by_name[old_name.lower()]
+        self._player_ids_by_name[new_name.lower()] = id
 
     def _player_from_asset(self, asset: Asset) -> Player:
-        return Player(asset.external_id, asset.name, Ratings.from_json(asset.metadata[RATINGS]))
+        self._asset_ids[asset.external_id] = asset.id
+        return LazyPlayer(asset.external_id, asset.name, asset.metadata[RATINGS])
 
     def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
         player_asset = self.client.assets.retrieve(external_id=id)
         if name:
+            self._index_name(id, player_asset.name, name)
             player_asset.name = name
         if ratings:
-            player_asset.metadata[RATINGS] = ratings.to_json()
-            self._update_rating_time_series(id, player_asset.id, player_asset.name, ratings)
+            old_ratings = Ratings.decode(player_asset.metadata[RATINGS])
+            player_asset.metadata[RATINGS] = ratings.encode()
+            self._asset_ids[id] = player_asset.id
+            self._update_rating_time_series(RatingUpdate(id, player_asset.name, old_ratings, ratings))
         updated_asset = self.client.assets.update(player_asset)
         return self._player_from_asset(updated_asset)
 
-    def _update_rating_time_series(self, player_id: str, asset_id: int, name: str, ratings: Ratings) -> None:
-        time_series = self.client.time_series.list(asset_external_ids=[player_id])
-        ts_id_and_rating: list[tuple[int, int]] = []
-        for hand, sport, rating in ratings:
-            for ts in time_series:
-                if ts.metadata.get(HAND) == hand.value and ts.metadata.get(SPORT) == sport.value:
-                    ts_id_and_rating.append((ts.id, rating))
-                    break
-            else:
-                new_ts = self.client.time_series.create(
-                    TimeSeries(
-                        name=f"{name} {sport.value} {hand} ELO",
-                        asset_id=asset_id,
+    def prefetch_time_series_ids(self) -> None:
+        """
+        Loads the ids of all rating time series below the root asset, so rating updates can skip looking them up.
+        """
+        player_ids = {asset.id: asset.external_id for asset in self._list_player_assets()}
+        self._asset_ids.update({external_id: id for id, external_id in player_ids.items()})
+        time_series = self.client.time_series.list(asset_subtree_ids=[self.root_asset.id], limit=-1)
+        self._index_time_series(time_series, player_ids)
+        self._time_series_indexed_players.update(player_ids.values())
+
+    def _index_time_series(self, time_series: list[TimeSeries], player_ids: dict[int, str]) -> None:
+        for ts in time_series:
+            metadata = ts.metadata or {}
+            hand, sport = Hand.of(metadata.get(HAND)), Sport.of(metadata.get(SPORT))
+            if ts.asset_id in player_ids and hand and sport:
+                self._time_series_ids.setdefault((player_ids[ts.asset_id], hand, sport), ts.id)
+
+    def _index_player_time_series(self, *player_ids: str) -> dict[str, int]:
+        asset_ids = self._get_asset_ids(*player_ids)
+        not_indexed = [id for id in player_ids if id not in self._time_series_indexed_players]
+        if not_indexed:
+            time_series = self.client.time_series.list(asset_external_ids=not_indexed, limit=-1)
+            self._index_time_series(time_series, {asset_ids[id]: id for id in not_indexed})
+            self._time_series_indexed_players.update(not_indexed)
+        return asset_ids
+
+    def _get_time_series_ids(self, *rating_updates: RatingUpdate) -> dict[tuple[str, Hand, Sport], int]:
+        asset_ids = self._index_player_time_series(*{update.player_id for update in rating_updates})
+        missing_time_series: dict[tuple[str, Hand, Sport], TimeSeries] = {}
+        for update in rating_updates:
+            for hand, sport, _ in update.changed_ratings():
+                key = (update.player_id, hand, sport)
+                if key not in self._time_series_ids:
+                    missing_time_series[key] = TimeSeries(
+                        name=f"{update.name} {sport.value} {hand} ELO",
+                        asset_id=asset_ids[update.player_id],
                         metadata={SPORT: sport.value, HAND: hand.value},
                     )
-                )
-                ts_id_and_rating.append((new_ts.id, rating))
+        if missing_time_series:
+            created_time_series = self.client.time_series.create(list(missing_time_series.values()))
+            for key, ts in zip(missing_time_series, created_time_series):
+                self._time_series_ids[key] = ts.id
+        return self._time_series_ids
 
-        for ts_id, new_rating in ts_id_and_rating:
-            self.client.datapoints.insert(id=ts_id, datapoints=[(int(time.time() * 1000), new_rating)])
+    def _update_rating_time_series(
+        self,
+        *rating_updates: RatingUpdate,
+        timestamp: Optional[int] = None,
+        skip: frozenset[tuple[str, Hand, Sport]] = frozenset(),
+    ) -> None:
+        ts_ids = self._get_time_series_ids(*rating_updates)
+        timestamp = timestamp or int(time.time() * 1000)
+        datapoints: list[Datapoint] = [
+            (ts_ids[(update.player_id, hand, sport)], timestamp, rating)
+            for update in rating_updates
+            for hand, sport, rating in update.changed_ratings()
+            if (update.player_id, hand, sport) not in skip
+        ]
+        if self._datapoint_queue is not None:
+            self._datapoint_queue.put(datapoints)
+        elif datapoints:
+            self.client.datapoints.insert_multiple([{"id": id, "datapoints": [(t, v)]} for id, t, v in datapoints])
 
     def create_match(self, match: Match) -> Match:
-        event_metadata = self._match_to_metadata(match)
-        asset_ids = [a.id for a in self._get_player_assets(match.player1_id, match.player2_id)]
-        created_event = self.client.events.create(
-            Event(type=MATCH, subtype=match.sport.value, metadata=event_metadata, asset_ids=asset_ids)
+        created_event = self.client.events.create(self._match_to_event(match.with_id()))
+        return self._event_to_match(created_event)
+
+    def _match_to_event(self, match: Match) -> Event:
+        asset_ids = self._get_asset_ids(match.player1_id, match.player2_id)
+        return Event(
+            external_id=match.id,
+            start_time=match.created_time,
+            type=MATCH,
+            subtype=match.sport.value,
+            metadata=self._match_to_metadata(match),
+            asset_ids=[asset_ids[match.player1_id], asset_ids[match.player2_id]],
         )
-        return self._metadata_to_match(created_event.metadata)
 
-    def _get_player_assets(self, *external_id: str) -> list[Asset]:
-        return [asset for asset in self.client.assets.retrieve_multiple(external_ids=list(external_id))]
+    def _get_asset_ids(self, *external_ids: str) -> dict[str, int]:
+        missing_external_ids = list({id for id in external_ids if id not in self._asset_ids})
+        if missing_external_ids:
+            for asset in self.client.assets.retrieve_multiple(external_ids=missing_external_ids):
+                self._asset_ids[asset.external_id] = asset.id
+        return {id: self._asset_ids[id] for id in external_ids}
 
     @staticmethod
     def _match_to_metadata(match: Match) -> dict[str, str]:
@@ -121,7 +240,8 @@ class BackendCdf(Backend):
         return metadata
 
     @staticmethod
-    def _metadata_to_match(metadata: dict[str, str]) -> Match:
+    def _event_to_match(event: Event) -> Match:
+        metadata = event.metadata
         return Match(
             player1_id=metadata["player1_id"],
             player2_id=metadata["player2_id"],
@@ -132,10 +252,108 @@ class BackendCdf(Backend):
             sport=Sport(metadata["sport"]),
             player1_hand=Hand(metadata["player1_hand"]),
             player2_hand=Hand(metadata["player2_hand"]),
+            id=metadata.get("id", f"{LEGACY_EVENT_ID_PREFIX}{event.id}"),
+            created_time=int(metadata["created_time"]) if "created_time" in metadata else event.created_time,
         )
 
     def list_matches(self, sport: Sport) -> list[Match]:
         events = self.client.events.list(
             limit=-1, type=MATCH, subtype=sport.value, root_asset_external_ids=[self.root_asset_external_id]
         )
-        return [self._metadata_to_match(e.metadata) for e in events]
+        return [self._event_to_match(e) for e in sorted(events, key=lambda e: (e.created_time, e.id))]
+
+    def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        events = self.client.events.list(
+            limit=1,
+            type=MATCH,
+            subtype=sport.value,
+            root_asset_external_ids=[self.root_asset_external_id],
+            sort=["createdTime:desc"],
+        )
+        return self._event_to_match(events[0]) if events else None
+
+    def delete_match(self, match: Match) -> None:
+        self._delete_match_events(match)
+        self._delete_match_datapoints(match)
+
+    def _delete_match_events(self, *matches: Match) -> None:
+        legacy_ids = [self._legacy_event_id(m.id) for m in matches]
+        ids = [id for id in legacy_ids if id is not None]
+        external_ids = [m.id for m, id in zip(matches, legacy_ids) if id is None]
+        self.client.events.delete(id=ids or None, external_id=external_ids or None)
+
+    def update_matches(self, matches: list[Match]) -> None:
+        if matches:
+            self.client.events.update([self._match_to_event_update(match) for match in matches])
+
+    def _match_to_event_update(self, match: Match) -> EventUpdate:
+        legacy_id = self._legacy_event_id(match.id)
+        event_update = EventUpdate(id=legacy_id) if legacy_id is not None else EventUpdate(external_id=match.id)
+        return event_update.metadata.add(
+            {"player1_rating": str(match.player1_rating), "player2_rating": str(match.player2_rating)}
+        )
+
+    @staticmethod
+    def _legacy_event_id(id: Optional[str]) -> Optional[int]:
+        if id is not None and id.startswith(LEGACY_EVENT_ID_PREFIX):
+            return int(id[len(LEGACY_EVENT_ID_PREFIX) :])
+        return None
+
+    def _delete_match_datapoints(self, *matches: Match) -> None:
+        """
+        Removes the rating datapoints written when the matches were registered, which brings the rating time series
+        back to the ratings the players had before the matches.
+        """
+        rating_keys = {key: match for match in matches for key in self._match_rating_keys(match)}
+        self._index_player_time_series(*{player_id for player_id, _, _ in rating_keys})
+        ranges = [
+            {"id": self._time_series_ids[key], "start": match.created_time, "end": match.created_time + 1}
+            for key, match in rating_keys.items()
+            if key in self._time_series_ids and match.created_time is not None
+        ]
+        if self._datapoint_queue is not None:
+            # Datapoints of the matches that are still queued would otherwise be inserted after the delete
+            self._datapoint_queue.discard([(r["id"], r["start"], r["end"]) for r in ranges])
+        if ranges:
+            self.client.datapoints.delete_ranges(ranges)
+
+    @staticmethod
+    def _match_rating_keys(match: Match) -> list[tuple[str, Hand, Sport]]:
+        return [
+            (match.player1_id, match.player1_hand, match.sport),
+            (match.player2_id, match.player2_hand, match.sport),
+        ]
+
+    def commit(self, unit_of_work: UnitOfWork) -> None:
+        if unit_of_work.deleted_matches:
+            self._delete_match_events(*unit_of_work.deleted_matches)
+            self._delete_match_datapoints(*unit_of_work.deleted_matches)
+        if unit_of_work.matches:
+            self.client.events.create([self._match_to_event(match) for match in unit_of_work.matches])
+        self.update_matches(unit_of_work.updated_matches)
+        if unit_of_work.player_updates:
+            self.client.assets.update([self._player_update_to_asset_update(u) for u in unit_of_work.player_updates])
+            for u in unit_of_work.player_updates:
+                if u.name:
+                    self._index_name(u.player.id, u.player.name, u.name)
+            rating_updates = [
+                RatingUpdate(u.player.id, u.updated_player().name, u.player.ratings, u.ratings)
+                for u in unit_of_work.player_updates
+                if u.ratings
+            ]
+            if rating_updates:
+                # Ratings restored by deleting a match are already rolled back by deleting its datapoints
+                self._update_rating_time_series(
+                    *rating_updates,
+                    timestamp=unit_of_work.matches[-1].created_time if unit_of_work.matches else None,
+                    skip=frozenset(k for m in unit_of_work.deleted_matches for k in self._match_rating_keys(m)),
+                )
+
+    @staticmethod
+    def _player_update_to_asset_update(player_update: PlayerUpdate) -> AssetUpdate:
+        asset_update = AssetUpdate(external_id=player_update.player.id)
+        if player_update.name:
+            asset_update.name.set(player_update.name)
+        if player_update.ratings:
+            asset_update.metadata.add({RATINGS: player_update.ratings.encode()})
+        return asset_update
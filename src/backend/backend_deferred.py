@@ -0,0 +1,99 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+import structlog
+
+from src.backend.backend import Backend
+from src.backend.data_classes import Match, Player, Sport
+from src.backend.match_table import MatchTable
+from src.backend.rating import Ratings
+from src.backend.unit_of_work import UnitOfWork
+
+log = structlog.getLogger(__name__)
+
+DEFAULT_BACKOFF_SECONDS = 1.0
+DEFAULT_MAX_BACKOFF_SECONDS = 60.0
+
+
+class DeferredBackend(Backend):
+    """
+    Creates another backend on a background thread, so slow setup such as connecting to CDF is off the startup path.
+    Creation is retried with exponential backoff until it succeeds, e.g. while CDF is unreachable, and calls block
+    until then.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Backend],
+        backoff: float = DEFAULT_BACKOFF_SECONDS,
+        max_backoff: float = DEFAULT_MAX_BACKOFF_SECONDS,
+    ) -> None:
+        self._future: Future[Backend] = Future()
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        threading.Thread(target=self._create, args=(factory,), name="deferred-backend", daemon=True).start()
+
+    def _create(self, factory: Callable[[], Backend]) -> None:
+        delay = self._backoff
+        while True:
+            try:
+                self._future.set_result(factory())
+                return
+            except Exception:
+                log.exception("Failed to create backend, retrying", retry_in_seconds=delay)
+                time.sleep(delay)
+                delay = min(delay * 2, self._max_backoff)
+
+    @property
+    def backend(self) -> Backend:
+        return self._future.result()
+
+    def is_ready(self) -> bool:
+        return self._future.done()
+
+    def wipe(self) -> None:
+        self.backend.wipe()
+
+    def create_player(self, player: Player) -> Player:
+        return self.backend.create_player(player)
+
+    def get_player(self, id: str) -> Optional[Player]:
+        return self.backend.get_player(id)
+
+    def list_players(self) -> list[Player]:
+        return self.backend.list_players()
+
+    def list_player_names(self) -> dict[str, str]:
+        return self.backend.list_player_names()
+
+    def get_player_by_name(self, name: str) -> Optional[Player]:
+        return self.backend.get_player_by_name(name)
+
+    def is_name_taken(self, name: str) -> bool:
+        return self.backend.is_name_taken(name)
+
+    def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
+        return self.backend.update_player(id, name=name, ratings=ratings)
+
+    def create_match(self, match: Match) -> Match:
+        return self.backend.create_match(match)
+
+    def list_matches(self, sport: Sport) -> list[Match]:
+        return self.backend.list_matches(sport)
+
+    def list_matches_table(self, sport: Optional[Sport] = None) -> MatchTable:
+        return self.backend.list_matches_table(sport)
+
+    def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        return self.backend.get_latest_match(sport)
+
+    def delete_match(self, match: Match) -> None:
+        self.backend.delete_match(match)
+
+    def update_matches(self, matches: list[Match]) -> None:
+        self.backend.update_matches(matches)
+
+    def commit(self, unit_of_work: UnitOfWork) -> None:
+        self.backend.commit(unit_of_work)
@@ -7,40 +7,71 @@ from src.backend.rating import Ratings
 
 
 class BackendInMemory(Backend):
+    """
+    Players are indexed by id and by lowercase name, and matches are kept in one append-only list per sport, so every
+    lookup is O(1) and listing matches never touches other sports.
+    """
+
     def __init__(self) -> None:
-        self._players: list[Player] = []
-        self._matches: list[Match] = []
+        self._players: dict[str, Player] = {}
+        self._player_ids_by_name: dict[str, str] = {}
+        self._matches: dict[Sport, list[Match]] = {sport: [] for sport in Sport}
 
     def wipe(self) -> None:
-        self._players = []
-        self._matches = []
+        self._players = {}
+        self._player_ids_by_name = {}
+        self._matches = {sport: [] for sport in Sport}
 
     def create_player(self, player: Player) -> Player:
-        self._players.append(player)
+        self._players[player.id] = player
+        self._player_ids_by_name[player.name.lower()] = player.id
         return copy(player)
 
     def get_player(self, id: str) -> Optional[Player]:
-        players = list(filter(lambda p: p.id == id, self._players))
-        if len(players) == 0:
-            return None
-        return players[0]
+        return self._players.get(id)
+
+    def get_player_by_name(self, name: str) -> Optional[Player]:
+        id = self._player_ids_by_name.get(name.lower())
+        return self._players[id] if id is not None else None
+
+    def is_name_taken(self, name: str) -> bool:
+        return name.lower() in self._player_ids_by_name
 
     def list_players(self) -> list[Player]:
-        return [p for p in self._players]
+        return list(self._players.values())
 
     def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
-        idx = [p.id for p in self._players].index(id)
-        player = copy(self._players[idx])
+        player = copy(self._players[id])
         if name:
+            if self._player_ids_by_name.get(player.name.lower()) == id:
+                del self._player_ids_by_name[player.name.lower()]
+            self._player_ids_by_name[name.lower()] = id
             player.name = name
         if ratings:
             player.ratings = ratings
-        self._players[idx] = player
+        self._players[id] = player
         return player
 
     def create_match(self, match: Match) -> Match:
-        self._matches.append(match)
+        match = match.with_id()
+        self._matches[match.sport].append(match)
         return copy(match)
 
     def list_matches(self, sport: Sport) -> list[Match]:
-        return [match for match in self._matches if match.sport == sport]
+        return list(self._matches[sport])
+
+    def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        matches = self._matches[sport]
+        return matches[-1] if matches else None
+
+    def delete_match(self, match: Match) -> None:
+        matches = self._matches[match.sport]
+        if matches and matches[-1].id == match.id:
+            matches.pop()
+        else:
+            self._matches[match.sport] = [m for m in matches if m.id != match.id]
+
+    def update_matches(self, matches: list[Match]) -> None:
+        updated_matches = {match.id: match for match in matches}
+        for sport in {match.sport for match in matches}:
+            self._matches[sport] = [updated_matches.get(m.id, m) for m in self._matches[sport]]
@@ -0,0 +1,80 @@
+from typing import Optional
+
+from src.backend.backend import Backend
+from src.backend.data_classes import Match, Player, Sport
+from src.backend.match_table import MatchTable
+from src.backend.metrics import REGISTRY, MetricsRegistry
+from src.backend.rating import Ratings
+from src.backend.unit_of_work import UnitOfWork
+
+METRIC_PREFIX = "pingpong_backend"
+
+
+class InstrumentedBackend(Backend):
+    """
+    Records the latency, errors and in-flight calls of every method of another backend, labelled by method name.
+    """
+
+    def __init__(self, backend: Backend, metrics: MetricsRegistry = REGISTRY) -> None:
+        self._backend = backend
+        self._metrics = metrics
+
+    def wipe(self) -> None:
+        with self._metrics.track(METRIC_PREFIX, method="wipe"):
+            self._backend.wipe()
+
+    def create_player(self, player: Player) -> Player:
+        with self._metrics.track(METRIC_PREFIX, method="create_player"):
+            return self._backend.create_player(player)
+
+    def get_player(self, id: str) -> Optional[Player]:
+        with self._metrics.track(METRIC_PREFIX, method="get_player"):
+            return self._backend.get_player(id)
+
+    def list_players(self) -> list[Player]:
+        with self._metrics.track(METRIC_PREFIX, method="list_players"):
+            return self._backend.list_players()
+
+    def list_player_names(self) -> dict[str, str]:
+        with self._metrics.track(METRIC_PREFIX, method="list_player_names"):
+            return self._backend.list_player_names()
+
+    def get_player_by_name(self, name: str) -> Optional[Player]:
+        with self._metrics.track(METRIC_PREFIX, method="get_player_by_name"):
+            return self._backend.get_player_by_name(name)
+
+    def is_name_taken(self, name: str) -> bool:
+        with self._metrics.track(METRIC_PREFIX, method="is_name_taken"):
+            return self._backend.is_name_taken(name)
+
+    def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
+        with self._metrics.track(METRIC_PREFIX, method="update_player"):
+            return self._backend.update_player(id, name=name, ratings=ratings)
+
+    def create_match(self, match: Match) -> Match:
+        with self._metrics.track(METRIC_PREFIX, method="create_match"):
+            return self._backend.create_match(match)
+
+    def list_matches(self, sport: Sport) -> list[Match]:
+        with self._metrics.track(METRIC_PREFIX, method="list_matches"):
+            return self._backend.list_matches(sport)
+
+    def list_matches_table(self, sport: Optional[Sport] = None) -> MatchTable:
+        with self._metrics.track(METRIC_PREFIX, method="list_matches_table"):
+            return self._backend.list_matches_table(sport)
+
+    def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        with self._metrics.track(METRIC_PREFIX, method="get_latest_match"):
+            return self._backend.get_latest_match(sport)
+
+    def delete_match(self, match: Match) -> None:
+        with self._metrics.track(METRIC_PREFIX, method="delete_match"):
+            self._backend.delete_match(match)
+
+    def update_matches(self, matches: list[Match]) -> None:
+        with self._metrics.track(METRIC_PREFIX, method="update_matches"):
+            self._backend.update_matches(matches)
+
+    def commit(self, unit_of_work: UnitOfWork) -> None:
+        with self._metrics.track(METRIC_PREFIX, method="commit"):
+            self._backend.commit(unit_of_work)
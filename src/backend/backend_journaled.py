@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from enum import IntEnum
+from typing import Any, Iterator, Optional
+
+from src.backend.backend import Backend
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Hand, Match, Player, Sport
+from src.backend.rating import Ratings
+from src.backend.unit_of_work import UnitOfWork
+
+JOURNAL_FILE = "journal.bin"
+SNAPSHOT_FILE = "snapshot.bin"
+SNAPSHOT_MAGIC = b"PPSNAP"
+SNAPSHOT_VERSION = 1
+# magic, version, sequence number of the last journal record included in the snapshot
+SNAPSHOT_HEADER = struct.Struct("<6sHQ")
+# sequence number, operation, payload length, crc32 of the payload
+RECORD_HEADER = struct.Struct("<QBII")
+# Listings of the wrapped backend that may be discarded because of concurrent writes before reconcile blocks writes
+RECONCILE_ATTEMPTS = 3
+
+
+class Operation(IntEnum):
+    CREATE_PLAYER = 1
+    UPDATE_PLAYER = 2
+    CREATE_MATCH = 3
+    DELETE_MATCH = 4
+    UPDATE_MATCHES = 5
+
+
+def _encode_player(player: Player) -> list[Any]:
+    return [player.id, player.name, player.ratings.encode()]
+
+
+def _decode_player(payload: list[Any]) -> Player:
+    return Player(payload[0], payload[1], Ratings.decode(payload[2]))
+
+
+def _encode_match(match: Match) -> list[Any]:
+    return [
+        match.player1_id,
+        match.player2_id,
+        match.player1_score,
+        match.player2_score,
+        match.player1_rating,
+        match.player2_rating,
+        match.sport.value,
+        match.player1_hand.value,
+        match.player2_hand.value,
+        match.id,
+        match.created_time,
+    ]
+
+
+def _decode_match(payload: list[Any]) -> Match:
+    # Journals written before matches had ids hold only the first nine fields
+    id, created_time = payload[9:] if len(payload) > 9 else (None, None)
+    return Match(
+        player1_id=payload[0],
+        player2_id=payload[1],
+        player1_score=payload[2],
+        player2_score=payload[3],
+        player1_rating=payload[4],
+        player2_rating=payload[5],
+        sport=Sport(payload[6]),
+        player1_hand=Hand(payload[7]),
+        player2_hand=Hand(payload[8]),
+        id=id,
+        created_time=created_time,
+    )
+
+
+def _encode_record(seq: int, operation: Operation, payload: Any) -> bytes:
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return RECORD_HEADER.pack(seq, operation, len(data), zlib.crc32(data)) + data
+
+
+def _decode_records(buffer: memoryview, offset: int = 0) -> Iterator[tuple[int, int, Operation, Any]]:
+    """
+    Yields (end offset, sequence number, operation, payload) for each record in the buffer, stopping at the first
+    incomplete or corrupt record, which is what a crash in the middle of a write leaves behind.
+    """
+    while offset + RECORD_HEADER.size <= len(buffer):
+        seq, operation, length, crc = RECORD_HEADER.unpack_from(buffer, offset)
+        start = offset + RECORD_HEADER.size
+        data = buffer[start : start + length]
+        if len(data) < length or zlib.crc32(data) != crc:
+            return
+        offset = start + length
+        yield offset, seq, Operation(operation), json.loads(bytes(data))
+
+
+def _same_state(a: BackendInMemory, b: BackendInMemory) -> bool:
+    return {p.id: p for p in a.list_players()} == {p.id: p for p in b.list_players()} and all(
+        [(m.id, m) for m in a.list_matches(sport)] == [(m.id, m) for m in b.list_matches(sport)] for sport in Sport
+    )
+
+
+class JournaledBackend(Backend):
+    """
+    Keeps a local copy of all players and matches and serves every read from it. Writes go to the wrapped backend
+    first and are then appended to a local append-only journal. Every `snapshot_interval` records the local state is
+    compacted into a snapshot and the journal is truncated, so a restart only maps the latest snapshot and replays the
+    short journal tail instead of listing the full history from the wrapped backend. A backend recovered from disk
+    answers from the local copy straight away; `reconcile` brings it in line with the wrapped backend afterwards.
+    """
+
+    def __init__(self, backend: Backend, directory: str, snapshot_interval: int = 1000, fsync: bool = True) -> None:
+        self._backend = backend
+        self._directory = directory
+        self._snapshot_interval = snapshot_interval
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._state = BackendInMemory()
+        self._seq = 0
+        self._records_since_snapshot = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.recovered = os.path.exists(self._snapshot_path) or os.path.exists(self._journal_path)
+        if self.recovered:
+            self._recover()
+        else:
+            self._bootstrap()
+        self._journal = open(self._journal_path, "ab")
+
+    @property
+    def _journal_path(self) -> str:
+        return os.path.join(self._directory, JOURNAL_FILE)
+
+    @property
+    def _snapshot_path(self) -> str:
+        return os.path.join(self._directory, SNAPSHOT_FILE)
+
+    def _bootstrap(self) -> None:
+        self._state = self._list_backend_state()
+        self._write_snapshot()
+
+    def _list_backend_state(self) -> BackendInMemory:
+        state = BackendInMemory()
+        for player in self._backend.list_players():
+            state.create_player(player)
+        for sport in Sport:
+            for match in self._backend.list_matches(sport):
+                state.create_match(match)
+        return state
+
+    def reconcile(self) -> bool:
+        """
+        Lists all players and matches from the wrapped backend and replaces the local copy with them if they differ,
+        e.g. because another instance wrote to the wrapped backend. Writes are only blocked while the local copy is
+        replaced, unless they keep interleaving with the listing. Returns whether the local copy changed.
+        """
+        for _ in range(RECONCILE_ATTEMPTS):
+            seq = self._seq
+            state = self._list_backend_state()
+            with self._lock:
+                if self._seq == seq:
+                    return self._replace_state(state)
+        with self._lock:
+            return self._replace_state(self._list_backend_state())
+
+    def _replace_state(self, state: BackendInMemory) -> bool:
+        if _same_state(state, self._state):
+            return False
+        self._state = state
+        self._snapshot()
+        return True
+
+    def _recover(self) -> None:
+        snapshot_seq = self._load_snapshot()
+        self._seq = snapshot_seq
+        valid_length = 0
+        if os.path.exists(self._journal_path):
+            with open(self._journal_path, "rb") as f:
+                journal = f.read()
+            for valid_length, seq, operation, payload in _decode_records(memoryview(journal)):
+                if seq > snapshot_seq:
+                    self._apply(operation, payload)
+                    self._seq = seq
+                    self._records_since_snapshot += 1
+            if valid_length < len(journal):
+                os.truncate(self._journal_path, valid_length)
+
+    def _load_snapshot(self) -> int:
+        if not os.path.exists(self._snapshot_path):
+            return 0
+        with open(self._snapshot_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buffer = memoryview(mm)
+            try:
+                magic, version, seq = SNAPSHOT_HEADER.unpack_from(buffer)
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    raise ValueError(f"Unsupported snapshot {self._snapshot_path}")
+                for _, _, operation, payload in _decode_records(buffer, SNAPSHOT_HEADER.size):
+                    self._apply(operation, payload)
+            finally:
+                buffer.release()
+        return seq
+
+    def _write_snapshot(self) -> None:
+        tmp_path = self._snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self._seq))
+            for player in self._state.list_players():
+                f.write(_encode_record(0, Operation.CREATE_PLAYER, _encode_player(player)))
+            for sport in Sport:
+                for match in self._state.list_matches(sport):
+                    f.write(_encode_record(0, Operation.CREATE_MATCH, _encode_match(match)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        # Records up to self._seq are now covered by the snapshot, so they are skipped even if truncation fails
+        with open(self._journal_path, "wb"):
+            pass
+        self._records_since_snapshot = 0
+
+    def _apply(self, operation: Operation, payload: Any) -> None:
+        if operation == Operation.CREATE_PLAYER:
+            self._state.create_player(_decode_player(payload))
+        elif operation == Operation.UPDATE_PLAYER:
+            id, name, ratings = payload
+            self._state.update_player(id, name=name, ratings=Ratings.decode(ratings) if ratings else None)
+        elif operation == Operation.CREATE_MATCH:
+            self._state.create_match(_decode_match(payload))
+        elif operation == Operation.DELETE_MATCH:
+            self._state.delete_match(_decode_match(payload))
+        elif operation == Operation.UPDATE_MATCHES:
+            self._state.update_matches([_decode_match(match) for match in payload])
+
+    def _append(self, *records: tuple[Operation, Any]) -> None:
+        data = b""
+        for operation, payload in records:
+            self._seq += 1
+            data += _encode_record(self._seq, operation, payload)
+            self._apply(operation, payload)
+        self._journal.write(data)
+        self._journal.flush()
+        if self._fsync:
+            os.fsync(self._journal.fileno())
+        self._records_since_snapshot += len(records)
+        if self._records_since_snapshot >= self._snapshot_interval:
+            self._snapshot()
+
+    def snapshot(self) -> None:
+        with self._lock:
+            self._snapshot()
+
+    def _snapshot(self) -> None:
+        self._journal.close()
+        self._write_snapshot()
+        self._journal = open(self._journal_path, "ab")
+
+    def close(self) -> None:
+        with self._lock:
+            self._journal.close()
+
+    def wipe(self) -> None:
+        with self._lock:
+            self._backend.wipe()
+            self._state.wipe()
+            self._seq = 0
+            self._snapshot()
+
+    def create_player(self, player: Player) -> Player:
+        with self._lock:
+            created_player = self._backend.create_player(player)
+            self._append((Operation.CREATE_PLAYER, _encode_player(created_player)))
+            return created_player
+
+    def get_player(self, id: str) -> Optional[Player]:
+        return self._state.get_player(id)
+
+    def list_players(self) -> list[Player]:
+        return self._state.list_players()
+
+    def get_player_by_name(self, name: str) -> Optional[Player]:
+        return self._state.get_player_by_name(name)
+
+    def is_name_taken(self, name: str) -> bool:
+        return self._state.is_name_taken(name)
+
+    def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
+        with self._lock:
+            updated_player = self._backend.update_player(id, name=name, ratings=ratings)
+            self._append((Operation.UPDATE_PLAYER, [id, name, ratings.encode() if ratings else None]))
+            return updated_player
+
+    def create_match(self, match: Match) -> Match:
+        with self._lock:
+            created_match = self._backend.create_match(match.with_id())
+            self._append((Operation.CREATE_MATCH, _encode_match(created_match)))
+            return created_match
+
+    def list_matches(self, sport: Sport) -> list[Match]:
+        return self._state.list_matches(sport)
+
+    def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        return self._state.get_latest_match(sport)
+
+    def delete_match(self, match: Match) -> None:
+        with self._lock:
+            self._backend.delete_match(match)
+            self._append((Operation.DELETE_MATCH, _encode_match(match)))
+
+    def update_matches(self, matches: list[Match]) -> None:
+        with self._lock:
+            self._backend.update_matches(matches)
+            self._append((Operation.UPDATE_MATCHES, [_encode_match(match) for match in matches]))
+
+    def commit(self, unit_of_work: UnitOfWork) -> None:
+        with self._lock:
+            self._backend.commit(unit_of_work)
+            records: list[tuple[Operation, Any]] = [
+                *[(Operation.DELETE_MATCH, _encode_match(match)) for match in unit_of_work.deleted_matches],
+                *[(Operation.CREATE_MATCH, _encode_match(match)) for match in unit_of_work.matches],
+            ]
+            if unit_of_work.updated_matches:
+                # One record for all of them, as replaying a match update rewrites the match list of its sport
+                records.append((Operation.UPDATE_MATCHES, [_encode_match(m) for m in unit_of_work.updated_matches]))
+            records.extend(
+                (Operation.UPDATE_PLAYER, [u.player.id, u.name, u.ratings.encode() if u.ratings else None])
+                for u in unit_of_work.player_updates
+            )
+            self._append(*records)
@@ -0,0 +1,252 @@
+import sqlite3
+import threading
+from copy import copy
+from typing import Optional
+
+from src.backend.backend import Backend
+from src.backend.data_classes import Hand, LazyPlayer, Match, Player, Sport
+from src.backend.match_table import HAND_INDICES, SPORT_INDICES, MatchTable
+from src.backend.rating import Ratings
+from src.backend.unit_of_work import UnitOfWork
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    ratings TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_name_lower ON players (name_lower);
+CREATE TABLE IF NOT EXISTS matches (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    sport TEXT NOT NULL,
+    player1_id TEXT NOT NULL,
+    player2_id TEXT NOT NULL,
+    player1_score INTEGER NOT NULL,
+    player2_score INTEGER NOT NULL,
+    player1_rating INTEGER NOT NULL,
+    player2_rating INTEGER NOT NULL,
+    player1_hand TEXT NOT NULL,
+    player2_hand TEXT NOT NULL,
+    id TEXT,
+    created_time INTEGER
+);
+CREATE INDEX IF NOT EXISTS matches_sport ON matches (sport, seq);
+CREATE INDEX IF NOT EXISTS matches_player1_id ON matches (player1_id);
+CREATE INDEX IF NOT EXISTS matches_player2_id ON matches (player2_id);
+"""
+# Columns added after the first release, added to existing databases when they are opened
+ADDED_MATCH_COLUMNS = {"id": "TEXT", "created_time": "INTEGER"}
+
+# The statements are constant strings with bound parameters, so sqlite3 compiles each of them once and reuses the
+# prepared statement from its statement cache on every later call.
+INSERT_PLAYER = "INSERT INTO players (id, name, name_lower, ratings) VALUES (?, ?, ?, ?)"
+SELECT_PLAYER = "SELECT id, name, ratings FROM players WHERE id = ?"
+SELECT_PLAYERS = "SELECT id, name, ratings FROM players ORDER BY rowid"
+SELECT_PLAYER_NAMES = "SELECT id, name FROM players ORDER BY rowid"
+SELECT_PLAYER_BY_NAME = "SELECT id, name, ratings FROM players WHERE name_lower = ? ORDER BY rowid LIMIT 1"
+SELECT_NAME_TAKEN = "SELECT 1 FROM players WHERE name_lower = ? LIMIT 1"
+UPDATE_PLAYER_NAME = "UPDATE players SET name = ?, name_lower = ? WHERE id = ?"
+UPDATE_PLAYER_RATINGS = "UPDATE players SET ratings = ? WHERE id = ?"
+MATCH_COLUMNS = (
+    "player1_id, player2_id, player1_score, player2_score, player1_rating, player2_rating, sport, "
+    "player1_hand, player2_hand, id, created_time"
+)
+INSERT_MATCH = f"INSERT INTO matches ({MATCH_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+SELECT_MATCHES = f"SELECT {MATCH_COLUMNS}, seq FROM matches WHERE sport = ? ORDER BY seq"
+SELECT_MATCH_TABLE_ROWS = (
+    "SELECT player1_id, player2_id, player1_score, player2_score, player1_rating, player2_rating, player1_hand, "
+    "player2_hand, sport FROM matches WHERE sport = ? OR ? IS NULL ORDER BY seq"
+)
+SELECT_LATEST_MATCH = f"SELECT {MATCH_COLUMNS}, seq FROM matches WHERE sport = ? ORDER BY seq DESC LIMIT 1"
+DELETE_MATCH = "DELETE FROM matches WHERE id = ?"
+UPDATE_MATCH_RATINGS = "UPDATE matches SET player1_rating = ?, player2_rating = ? WHERE id = ?"
+UPDATE_MATCH_RATINGS_BY_SEQ = "UPDATE matches SET player1_rating = ?, player2_rating = ? WHERE seq = ? AND id IS NULL"
+DELETE_MATCH_BY_SEQ = "DELETE FROM matches WHERE seq = ? AND id IS NULL"
+
+
+class BackendSqlite(Backend):
+    """
+    Local SQLite store running in WAL mode, so other connections can read the database while the bot writes to it.
+    The bot's own connection is shared between threads and guarded by a lock.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+            self._add_missing_match_columns()
+
+    def _add_missing_match_columns(self) -> None:
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(matches)")}
+        for column, column_type in ADDED_MATCH_COLUMNS.items():
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE matches ADD COLUMN {column} {column_type}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def wipe(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM players")
+            self._connection.execute("DELETE FROM matches")
+
+    def create_player(self, player: Player) -> Player:
+        with self._lock, self._connection:
+            self._connection.execute(
+                INSERT_PLAYER, (player.id, player.name, player.name.lower(), player.ratings.encode())
+            )
+        return copy(player)
+
+    def get_player(self, id: str) -> Optional[Player]:
+        with self._lock:
+            row = self._connection.execute(SELECT_PLAYER, (id,)).fetchone()
+        return self._row_to_player(row) if row else None
+
+    def list_players(self) -> list[Player]:
+        with self._lock:
+            rows = self._connection.execute(SELECT_PLAYERS).fetchall()
+        return [self._row_to_player(row) for row in rows]
+
+    def list_player_names(self) -> dict[str, str]:
+        with self._lock:
+            return dict(self._connection.execute(SELECT_PLAYER_NAMES).fetchall())
+
+    def get_player_by_name(self, name: str) -> Optional[Player]:
+        with self._lock:
+            row = self._connection.execute(SELECT_PLAYER_BY_NAME, (name.lower(),)).fetchone()
+        return self._row_to_player(row) if row else None
+
+    def is_name_taken(self, name: str) -> bool:
+        with self._lock:
+            return self._connection.execute(SELECT_NAME_TAKEN, (name.lower(),)).fetchone() is not None
+
+    @staticmethod
+    def _row_to_player(row: tuple[str, str, str]) -> Player:
+        id, name, ratings = row
+        return LazyPlayer(id, name, ratings)
+
+    def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
+        with self._lock, self._connection:
+            self._update_player(id, name, ratings)
+            row = self._connection.execute(SELECT_PLAYER, (id,)).fetchone()
+        if row is None:
+            raise KeyError(id)
+        return self._row_to_player(row)
+
+    def _update_player(self, id: str, name: Optional[str], ratings: Optional[Ratings]) -> None:
+        if name:
+            self._connection.execute(UPDATE_PLAYER_NAME, (name, name.lower(), id))
+        if ratings:
+            self._connection.execute(UPDATE_PLAYER_RATINGS, (ratings.encode(), id))
+
+    def create_match(self, match: Match) -> Match:
+        match = match.with_id()
+        with self._lock, self._connection:
+            self._connection.execute(INSERT_MATCH, self._match_to_row(match))
+        return copy(match)
+
+    @staticmethod
+    def _match_to_row(match: Match) -> tuple:
+        return (
+            match.player1_id,
+            match.player2_id,
+            match.player1_score,
+            match.player2_score,
+            match.player1_rating,
+            match.player2_rating,
+            match.sport.value,
+            match.player1_hand.value,
+            match.player2_hand.value,
+            match.id,
+            match.created_time,
+        )
+
+    @staticmethod
+    def _row_to_match(row: tuple) -> Match:
+        return Match(
+            player1_id=row[0],
+            player2_id=row[1],
+            player1_score=row[2],
+            player2_score=row[3],
+            player1_rating=row[4],
+            player2_rating=row[5],
+            sport=Sport(row[6]),
+            player1_hand=Hand(row[7]),
+            player2_hand=Hand(row[8]),
+            # matches stored before ids were introduced are identified by their sequence number
+            id=row[9] if row[9] is not None else f"seq:{row[11]}",
+            created_time=row[10],
+        )
+
+    def list_matches(self, sport: Sport) -> list[Match]:
+        with self._lock:
+            rows = self._connection.execute(SELECT_MATCHES, (sport.value,)).fetchall()
+        return [self._row_to_match(row) for row in rows]
+
+    def list_matches_table(self, sport: Optional[Sport] = None) -> MatchTable:
+        sport_value = sport.value if sport else None
+        with self._lock:
+            rows = self._connection.execute(SELECT_MATCH_TABLE_ROWS, (sport_value, sport_value)).fetchall()
+        table = MatchTable()
+        hand_indices = {hand.value: i for hand, i in HAND_INDICES.items()}
+        sport_indices = {sport.value: i for sport, i in SPORT_INDICES.items()}
+        for player1_id, player2_id, score1, score2, rating1, rating2, hand1, hand2, sport_name in rows:
+            table.append_row(
+                table.intern(player1_id),
+                table.intern(player2_id),
+                score1,
+                score2,
+                rating1,
+                rating2,
+                hand_indices[hand1],
+                hand_indices[hand2],
+                sport_indices[sport_name],
+            )
+        return table
+
+    def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        with self._lock:
+            row = self._connection.execute(SELECT_LATEST_MATCH, (sport.value,)).fetchone()
+        return self._row_to_match(row) if row else None
+
+    def delete_match(self, match: Match) -> None:
+        with self._lock, self._connection:
+            self._delete_match(match)
+
+    def _delete_match(self, match: Match) -> None:
+        if match.id is not None and match.id.startswith("seq:"):
+            self._connection.execute(DELETE_MATCH_BY_SEQ, (int(match.id[4:]),))
+        else:
+            self._connection.execute(DELETE_MATCH, (match.id,))
+
+    def update_matches(self, matches: list[Match]) -> None:
+        with self._lock, self._connection:
+            self._update_matches(matches)
+
+    def _update_matches(self, matches: list[Match]) -> None:
+        """
+        Updates the ratings stored with the matches, the only fields of a registered match that may change.
+        """
+        rows, legacy_rows = [], []
+        for match in matches:
+            if match.id is not None and match.id.startswith("seq:"):
+                legacy_rows.append((match.player1_rating, match.player2_rating, int(match.id[4:])))
+            else:
+                rows.append((match.player1_rating, match.player2_rating, match.id))
+        self._connection.executemany(UPDATE_MATCH_RATINGS, rows)
+        self._connection.executemany(UPDATE_MATCH_RATINGS_BY_SEQ, legacy_rows)
+
+    def commit(self, unit_of_work: UnitOfWork) -> None:
+        with self._lock, self._connection:
+            for match in unit_of_work.deleted_matches:
+                self._delete_match(match)
+            self._connection.executemany(INSERT_MATCH, [self._match_to_row(m) for m in unit_of_work.matches])
+            self._update_matches(unit_of_work.updated_matches)
+            for player_update in unit_of_work.player_updates:
+                self._update_player(player_update.player.id, player_update.name, player_update.ratings)
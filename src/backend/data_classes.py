@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import TYPE_CHECKING
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Optional
 
 from src.backend.util import BaseEnum
 
@@ -19,14 +21,52 @@ class Hand(BaseEnum):
     NON_DOMINANT = "Non-dominant hand"
 
 
-@dataclass
+@dataclass(slots=True)
 class Player:
     id: str
     name: str
     ratings: Ratings
 
 
-@dataclass
+class LazyPlayer(Player):
+    """
+    Player whose ratings are kept in their encoded form until they are first accessed, for listings where most callers
+    only look at ids and names.
+    """
+
+    __slots__ = ("_encoded_ratings", "_ratings")
+
+    def __init__(self, id: str, name: str, encoded_ratings: str) -> None:
+        self.id = id
+        self.name = name
+        self._encoded_ratings = encoded_ratings
+        self._ratings: Optional[Ratings] = None
+
+    @property
+    def ratings(self) -> Ratings:
+        if self._ratings is None:
+            from src.backend.rating import Ratings
+
+            self._ratings = Ratings.decode(self._encoded_ratings)
+        return self._ratings
+
+    @ratings.setter
+    def ratings(self, ratings: Ratings) -> None:
+        self._ratings = ratings
+
+    def __copy__(self) -> LazyPlayer:
+        # Copies the ratings in whichever form they are in, instead of decoding them to read them
+        player = LazyPlayer(self.id, self.name, self._encoded_ratings)
+        player._ratings = self._ratings
+        return player
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Player):
+            return NotImplemented
+        return (self.id, self.name, self.ratings) == (other.id, other.name, other.ratings)
+
+
+@dataclass(slots=True)
 class Match:
     player1_id: str
     player2_id: str
@@ -37,3 +77,18 @@ class Match:
     sport: Sport
     player1_hand: Hand
     player2_hand: Hand
+    # Assigned when the match is registered, see with_id. Not part of equality, so matches compare by content.
+    id: Optional[str] = field(default=None, compare=False)
+    created_time: Optional[int] = field(default=None, compare=False)
+
+    def with_id(self) -> Match:
+        """
+        Returns the match with an id and a creation timestamp (ms since epoch), generating them if missing.
+        """
+        if self.id is not None and self.created_time is not None:
+            return self
+        return replace(
+            self,
+            id=self.id or uuid.uuid4().hex,
+            created_time=self.created_time or int(time.time() * 1000),
+        )
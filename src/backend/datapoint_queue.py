@@ -0,0 +1,372 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import structlog
+from cognite.client.exceptions import CogniteAPIError, CogniteNotFoundError
+
+log = structlog.getLogger(__name__)
+
+JOURNAL_FILE = "datapoints.jsonl"
+# Datapoints CDF rejected permanently, kept for inspection instead of blocking the queue
+DEAD_LETTER_FILE = "dead_letter.jsonl"
+# Responses that will not change on a retry, e.g. because the time series was deleted
+PERMANENT_ERROR_CODES = {400, 404}
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_FLUSH_INTERVAL_SECONDS = 5.0
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_SECONDS = 0.5
+DEFAULT_MAX_BACKOFF_SECONDS = 30.0
+
+# time series id, timestamp in milliseconds, value
+Datapoint = tuple[int, int, float]
+InsertMultiple = Callable[[list[dict[str, Any]]], None]
+DeleteRanges = Callable[[list[dict[str, Any]]], None]
+# time series id, start and end timestamp in milliseconds
+Range = tuple[int, int, int]
+
+
+def _to_insert_request(datapoints: list[Datapoint]) -> list[dict[str, Any]]:
+    by_id: dict[int, list[tuple[int, float]]] = {}
+    for id, timestamp, value in datapoints:
+        by_id.setdefault(id, []).append((timestamp, value))
+    return [{"id": id, "datapoints": points} for id, points in by_id.items()]
+
+
+def _to_delete_request(ranges: list[Range]) -> list[dict[str, Any]]:
+    return [{"id": id, "start": start, "end": end} for id, start, end in ranges]
+
+
+def _in_ranges(datapoint: Datapoint, ranges: list[Range]) -> bool:
+    return any(datapoint[0] == id and start <= datapoint[1] < end for id, start, end in ranges)
+
+
+def _is_permanent(error: Exception) -> bool:
+    return isinstance(error, CogniteNotFoundError) or (
+        isinstance(error, CogniteAPIError) and error.code in PERMANENT_ERROR_CODES
+    )
+
+
+def _not_found_ids(error: Exception) -> set[int]:
+    if not isinstance(error, CogniteNotFoundError):
+        return set()
+    return {item["id"] if isinstance(item, dict) else item for item in error.not_found}
+
+
+class DatapointQueue:
+    """
+    Write-behind queue for time series datapoints. `put` appends the datapoints to a local journal and returns, and a
+    background thread inserts them in batches once `batch_size` datapoints are pending or every `flush_interval`
+    seconds. Batches failing with transient errors are retried with exponential backoff and stay queued until they are
+    inserted, also across restarts. Datapoints CDF rejects permanently are moved to a dead letter file. Inserting a
+    datapoint again just overwrites it with the same value, so replaying the journal is harmless.
+
+    The journal is only appended to: besides the queued datapoints it records how many were inserted and which ranges
+    were discarded, and it is truncated whenever the queue is empty.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff: float = DEFAULT_BACKOFF_SECONDS,
+        max_backoff: float = DEFAULT_MAX_BACKOFF_SECONDS,
+        fsync: bool = True,
+    ) -> None:
+        self._directory = directory
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_attempts = max_attempts
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._pending_changed = threading.Condition(self._lock)
+        # Serializes flushes, so datapoints are only removed from the front of the pending list by one flush at a time
+        self._flush_lock = threading.Lock()
+        self._insert: Optional[InsertMultiple] = None
+        self._delete: Optional[DeleteRanges] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._pending: list[Datapoint] = []
+        # Number of datapoints at the front of the pending list that are being inserted
+        self._in_flight = 0
+        # Discarded ranges that were being inserted, deleted again once the insert is done
+        self._deletes: list[Range] = []
+        # Number of inserted datapoints and deleted ranges still recorded in the journal
+        self._journal_garbage = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._journal = open(self._journal_path, "ab")
+
+    @property
+    def _journal_path(self) -> str:
+        return os.path.join(self._directory, JOURNAL_FILE)
+
+    @property
+    def _dead_letter_path(self) -> str:
+        return os.path.join(self._directory, DEAD_LETTER_FILE)
+
+    def _recover(self) -> None:
+        if not os.path.exists(self._journal_path):
+            return
+        valid_length = 0
+        with open(self._journal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    record = None
+                # A crash in the middle of a write leaves an incomplete last line behind
+                if record is None:
+                    break
+                self._apply(record)
+                valid_length += len(line)
+        os.truncate(self._journal_path, valid_length)
+        if self._pending or self._deletes:
+            log.info("Recovered queued datapoints", pending=len(self._pending), deletes=len(self._deletes))
+
+    def _apply(self, record: Any) -> None:
+        """
+        Replays a journal record: a list of queued datapoints, or an object with the number of datapoints "inserted",
+        the ranges to "discard" from the queue, the ranges to "delete" after an insert, or the number "deleted".
+        """
+        if isinstance(record, list):
+            self._pending.extend((id, timestamp, value) for id, timestamp, value in record)
+            return
+        if "inserted" in record:
+            del self._pending[: record["inserted"]]
+            self._journal_garbage += record["inserted"]
+        if "discard" in record:
+            ranges = [(id, start, end) for id, start, end in record["discard"]]
+            kept = [datapoint for datapoint in self._pending if not _in_ranges(datapoint, ranges)]
+            self._journal_garbage += len(self._pending) - len(kept)
+            self._pending = kept
+        if "delete" in record:
+            self._deletes.extend((id, start, end) for id, start, end in record["delete"])
+        if "deleted" in record:
+            del self._deletes[: record["deleted"]]
+            self._journal_garbage += record["deleted"]
+
+    def _write(self, record: Any) -> None:
+        self._journal.write((json.dumps(record, separators=(",", ":")) + "\n").encode())
+        self._journal.flush()
+        if self._fsync:
+            os.fsync(self._journal.fileno())
+
+    def start(self, insert: InsertMultiple, delete: DeleteRanges) -> None:
+        """
+        Starts inserting the queued datapoints with the given functions, e.g. `CogniteClient.datapoints.insert_multiple`
+        and `CogniteClient.datapoints.delete_ranges`. Starting a started queue does nothing.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="datapoint-queue", daemon=True)
+        self._insert = insert
+        self._delete = delete
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def put(self, datapoints: list[Datapoint]) -> None:
+        if not datapoints:
+            return
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Datapoint queue is closed")
+            self._write(datapoints)
+            self._pending.extend(datapoints)
+            if len(self._pending) >= self._batch_size:
+                self._pending_changed.notify()
+
+    def _run(self) -> None:
+        failed = False
+        while True:
+            with self._lock:
+                # After a failed flush a full batch does not trigger the next one, so CDF is not retried in a busy loop
+                if not self._closed and (failed or len(self._pending) < self._batch_size):
+                    self._pending_changed.wait(self._flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                failed = False
+            except Exception:
+                log.exception("Failed to insert datapoints, keeping them queued", pending=self.pending)
+                failed = True
+
+    def flush(self) -> None:
+        """
+        Inserts all datapoints queued so far in batches. Raises the last error if a batch still fails with a transient
+        error after `max_attempts` attempts, in which case that batch and the ones after it stay queued.
+        """
+        if self._insert is None or self._delete is None:
+            raise RuntimeError("Datapoint queue is not started")
+        with self._flush_lock:
+            self._delete_with_retries(self._delete)
+            with self._lock:
+                remaining = len(self._pending)
+            while remaining > 0:
+                with self._lock:
+                    self._in_flight = min(self._batch_size, remaining, len(self._pending))
+                    batch = self._pending[: self._in_flight]
+                remaining -= self._batch_size
+                if not batch:
+                    break
+                try:
+                    rejected = self._insert_with_retries(self._insert, batch)
+                except Exception:
+                    with self._lock:
+                        self._in_flight = 0
+                    raise
+                with self._lock:
+                    # Datapoints discarded during the insert are already gone from the front of the pending list
+                    in_flight, self._in_flight = self._in_flight, 0
+                    if rejected:
+                        self._dead_letter(rejected)
+                    del self._pending[:in_flight]
+                    self._write({"inserted": in_flight})
+                    self._journal_garbage += in_flight
+                    self._compact_journal()
+                self._delete_with_retries(self._delete)
+
+    def discard(self, ranges: list[Range]) -> None:
+        """
+        Removes the queued datapoints in the given (time series id, start, end) ranges, for when the same ranges are
+        deleted in CDF. Datapoints that are being inserted cannot be taken back, so their ranges are deleted again once
+        the insert is done.
+        """
+        with self._lock:
+            in_flight = [datapoint for datapoint in self._pending[: self._in_flight] if _in_ranges(datapoint, ranges)]
+            kept = [datapoint for datapoint in self._pending if not _in_ranges(datapoint, ranges)]
+            if len(kept) == len(self._pending):
+                return
+            deletes = [r for r in ranges if any(_in_ranges(datapoint, [r]) for datapoint in in_flight)]
+            self._write({"discard": ranges, "delete": deletes} if deletes else {"discard": ranges})
+            self._journal_garbage += len(self._pending) - len(kept)
+            self._pending = kept
+            self._in_flight -= len(in_flight)
+            self._deletes.extend(deletes)
+            self._compact_journal()
+
+    def _insert_with_retries(self, insert: InsertMultiple, batch: list[Datapoint]) -> list[Datapoint]:
+        """
+        Inserts the batch and returns the datapoints CDF rejected permanently. If only some time series were not found,
+        the datapoints of the other ones are inserted on their own.
+        """
+        rejected: list[Datapoint] = []
+        delay = self._backoff
+        attempt = 1
+        while batch:
+            try:
+                insert(_to_insert_request(batch))
+                break
+            except Exception as e:
+                if _is_permanent(e):
+                    not_found = _not_found_ids(e)
+                    found = [datapoint for datapoint in batch if datapoint[0] not in not_found]
+                    if len(found) == len(batch):
+                        # The error does not tell which datapoints were rejected
+                        rejected.extend(batch)
+                        break
+                    rejected.extend(datapoint for datapoint in batch if datapoint[0] in not_found)
+                    batch = found
+                    continue
+                if attempt == self._max_attempts:
+                    raise
+                log.warning("Failed to insert datapoints, retrying", attempt=attempt, retry_in_seconds=delay)
+                time.sleep(delay)
+                delay = min(delay * 2, self._max_backoff)
+                attempt += 1
+        return rejected
+
+    def _delete_with_retries(self, delete: DeleteRanges) -> None:
+        """
+        Deletes the ranges discarded while their datapoints were being inserted. Ranges of time series that no longer
+        exist have nothing left to delete.
+        """
+        with self._lock:
+            ranges = list(self._deletes)
+        if not ranges:
+            return
+        delay = self._backoff
+        attempt = 1
+        while True:
+            try:
+                delete(_to_delete_request(ranges))
+                break
+            except Exception as e:
+                if _is_permanent(e):
+                    log.warning("Failed to delete discarded datapoints, dropping them", ranges=len(ranges))
+                    break
+                if attempt == self._max_attempts:
+                    raise
+                log.warning("Failed to delete discarded datapoints, retrying", attempt=attempt, retry_in_seconds=delay)
+                time.sleep(delay)
+                delay = min(delay * 2, self._max_backoff)
+                attempt += 1
+        with self._lock:
+            del self._deletes[: len(ranges)]
+            self._write({"deleted": len(ranges)})
+            self._journal_garbage += len(ranges)
+            self._compact_journal()
+
+    def _dead_letter(self, datapoints: list[Datapoint]) -> None:
+        with open(self._dead_letter_path, "ab") as f:
+            f.write((json.dumps(datapoints, separators=(",", ":")) + "\n").encode())
+            f.flush()
+            if self._fsync:
+                os.fsync(f.fileno())
+        log.error("Datapoints rejected by CDF", count=len(datapoints), dead_letter_file=self._dead_letter_path)
+
+    def _compact_journal(self) -> None:
+        """
+        Truncates the journal once the queue is empty. A queue that never runs empty is rewritten once the journal
+        records more inserted than queued datapoints, so each datapoint is only rewritten a constant number of times.
+        """
+        if not self._pending and not self._deletes:
+            self._journal.truncate(0)
+            self._journal_garbage = 0
+            return
+        if self._journal_garbage <= len(self._pending) + len(self._deletes):
+            return
+        tmp_path = self._journal_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            if self._pending:
+                f.write((json.dumps(self._pending, separators=(",", ":")) + "\n").encode())
+            if self._deletes:
+                f.write((json.dumps({"delete": self._deletes}, separators=(",", ":")) + "\n").encode())
+            f.flush()
+            if self._fsync:
+                os.fsync(f.fileno())
+        self._journal.close()
+        os.replace(tmp_path, self._journal_path)
+        self._journal = open(self._journal_path, "ab")
+        self._journal_garbage = 0
+
+    def close(self) -> None:
+        """
+        Stops the background thread and drains the queue. Datapoints that still cannot be inserted are left in the
+        journal and inserted after the next start.
+        """
+        with self._lock:
+            self._closed = True
+            self._pending_changed.notify()
+        if self._thread is not None:
+            self._thread.join()
+        if self._insert is not None and self._delete is not None:
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Failed to drain datapoint queue", pending=self.pending)
+        with self._lock:
+            self._journal.close()
@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+import copy
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence, Union
+
+from cognite.client.data_classes import (
+    Asset,
+    AssetList,
+    AssetUpdate,
+    Datapoints,
+    Event,
+    EventList,
+    EventUpdate,
+    TimeSeries,
+    TimeSeriesList,
+)
+from cognite.client.exceptions import CogniteDuplicatedError, CogniteNotFoundError
+
+# Operation recorded for calls made outside of any `CallLog.operation` block
+NO_OPERATION = ""
+
+
+class CallLog:
+    """
+    Counts the calls made to a fake client, by API method (e.g. "events.create") and by the high-level operation that
+    was running when the call was made.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._calls: Counter[tuple[str, str]] = Counter()
+
+    @contextmanager
+    def operation(self, name: str) -> Iterator[None]:
+        previous = getattr(self._local, "operation", NO_OPERATION)
+        self._local.operation = name
+        try:
+            yield
+        finally:
+            self._local.operation = previous
+
+    def record(self, method: str) -> None:
+        with self._lock:
+            self._calls[(getattr(self._local, "operation", NO_OPERATION), method)] += 1
+
+    def count(self, operation: Optional[str] = None, method: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(
+                n
+                for (op, m), n in self._calls.items()
+                if (operation is None or op == operation) and (method is None or m == method)
+            )
+
+    def by_method(self, operation: Optional[str] = None) -> dict[str, int]:
+        with self._lock:
+            counts: Counter[str] = Counter()
+            for (op, method), n in self._calls.items():
+                if operation is None or op == operation:
+                    counts[method] += n
+            return dict(counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+
+
+class FakeCogniteClient:
+    """
+    In-process stand-in for the part of `CogniteClient` used by `BackendCdf`: assets, events, time series and
+    datapoints. Every API call is recorded in `call_log` and sleeps `latency` seconds, plus or minus up to `jitter`
+    seconds, to simulate a round trip to CDF.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.call_log = CallLog()
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._next_id = 1
+        self._last_time = 0
+
+        self.assets = FakeAssetsAPI(self)
+        self.events = FakeEventsAPI(self)
+        self.time_series = FakeTimeSeriesAPI(self)
+        self.datapoints = FakeDatapointsAPI(self)
+
+    def _round_trip(self, method: str) -> None:
+        self.call_log.record(method)
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter)))
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def _now(self) -> int:
+        # Strictly increasing, so resources created in one call are ordered like the request
+        self._last_time = max(self._last_time + 1, int(time.time() * 1000))
+        return self._last_time
+
+
+def _as_list(value: Union[Any, Sequence[Any], None]) -> list[Any]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+class FakeAssetsAPI:
+    def __init__(self, client: FakeCogniteClient) -> None:
+        self._client = client
+        self._assets: dict[int, Asset] = {}
+
+    def _copy(self, asset: Asset) -> Asset:
+        copied = copy.deepcopy(asset)
+        copied._cognite_client = self._client
+        return copied
+
+    def _by_external_id(self, external_id: str) -> Optional[Asset]:
+        return next((a for a in self._assets.values() if a.external_id == external_id), None)
+
+    def _root_external_id(self, asset_id: int) -> Optional[str]:
+        asset = self._assets.get(asset_id)
+        return None if asset is None else self._assets[asset.root_id].external_id
+
+    def in_subtree(self, asset_id: Optional[int], subtree_ids: Sequence[int]) -> bool:
+        while asset_id is not None:
+            if asset_id in subtree_ids:
+                return True
+            asset = self._assets.get(asset_id)
+            asset_id = None if asset is None else asset.parent_id
+        return False
+
+    def __call__(self, root_external_ids: Sequence[str]) -> Iterator[Asset]:
+        self._client._round_trip("assets.list")
+        with self._client._lock:
+            assets = [self._copy(a) for a in self._assets.values() if self._root_external_id(a.id) in root_external_ids]
+        return iter(assets)
+
+    def retrieve(self, id: Optional[int] = None, external_id: Optional[str] = None) -> Optional[Asset]:
+        self._client._round_trip("assets.retrieve")
+        with self._client._lock:
+            asset = self._assets.get(id) if id is not None else self._by_external_id(external_id or "")
+            return None if asset is None else self._copy(asset)
+
+    def retrieve_multiple(
+        self, ids: Optional[Sequence[int]] = None, external_ids: Optional[Sequence[str]] = None
+    ) -> AssetList:
+        self._client._round_trip("assets.retrieve_multiple")
+        with self._client._lock:
+            assets = [self._assets.get(id) for id in ids or []]
+            assets += [self._by_external_id(external_id) for external_id in external_ids or []]
+            missing = [identifier for identifier, a in zip([*(ids or []), *(external_ids or [])], assets) if a is None]
+            if missing:
+                raise CogniteNotFoundError(missing)
+            return AssetList([self._copy(a) for a in assets if a is not None])
+
+    def list(self, root_ids: Optional[Sequence[int]] = None, limit: int = 25) -> AssetList:
+        self._client._round_trip("assets.list")
+        with self._client._lock:
+            assets = [self._copy(a) for a in self._assets.values() if root_ids is None or a.root_id in root_ids]
+        return AssetList(assets if limit in (-1, None) else assets[:limit])
+
+    def create(self, asset: Union[Asset, Sequence[Asset]]) -> Union[Asset, AssetList]:
+        self._client._round_trip("assets.create")
+        with self._client._lock:
+            new_assets = _as_list(asset)
+            duplicated = [a.external_id for a in new_assets if self._by_external_id(a.external_id)]
+            if duplicated:
+                raise CogniteDuplicatedError(duplicated)
+            created = []
+            for new_asset in new_assets:
+                stored = copy.deepcopy(new_asset)
+                stored.id = self._client._new_id()
+                stored.created_time = stored.last_updated_time = self._client._now()
+                stored.root_id = stored.id if stored.parent_id is None else self._assets[stored.parent_id].root_id
+                self._assets[stored.id] = stored
+                created.append(self._copy(stored))
+        return AssetList(created) if isinstance(asset, (list, tuple)) else created[0]
+
+    def update(self, item: Union[Asset, AssetUpdate, Sequence[Union[Asset, AssetUpdate]]]) -> Union[Asset, AssetList]:
+        self._client._round_trip("assets.update")
+        with self._client._lock:
+            updated = [self._update(i) for i in _as_list(item)]
+        return AssetList(updated) if isinstance(item, (list, tuple)) else updated[0]
+
+    def _update(self, item: Union[Asset, AssetUpdate]) -> Asset:
+        if isinstance(item, Asset):
+            id, external_id = item.id, item.external_id
+        else:
+            dumped = item.dump()
+            id, external_id = dumped.get("id"), dumped.get("externalId")
+        stored = self._assets.get(id) if id is not None else self._by_external_id(external_id)
+        if stored is None:
+            raise CogniteNotFoundError([id or external_id])
+        if isinstance(item, Asset):
+            stored.name = item.name
+            stored.metadata = copy.deepcopy(item.metadata)
+        else:
+            changes = dumped["update"]
+            if "name" in changes:
+                stored.name = changes["name"]["set"]
+            if "metadata" in changes:
+                metadata = changes["metadata"]
+                stored.metadata = dict(metadata["set"]) if "set" in metadata else {**(stored.metadata or {})}
+                stored.metadata.update(metadata.get("add", {}))
+                for key in metadata.get("remove", []):
+                    stored.metadata.pop(key, None)
+        stored.last_updated_time = self._client._now()
+        return self._copy(stored)
+
+    def delete(
+        self,
+        id: Union[int, Sequence[int], None] = None,
+        external_id: Union[str, Sequence[str], None] = None,
+        recursive: bool = False,
+    ) -> None:
+        self._client._round_trip("assets.delete")
+        with self._client._lock:
+            roots = [self._assets.get(i) for i in _as_list(id)]
+            roots += [self._by_external_id(external_id) for external_id in _as_list(external_id)]
+            if any(root is None for root in roots):
+                raise CogniteNotFoundError([*_as_list(id), *_as_list(external_id)])
+            root_ids = [root.id for root in roots if root is not None]
+            if recursive:
+                deleted = [a.id for a in self._assets.values() if self.in_subtree(a.id, root_ids)]
+            else:
+                deleted = root_ids
+            for asset_id in deleted:
+                del self._assets[asset_id]
+
+
+class FakeEventsAPI:
+    def __init__(self, client: FakeCogniteClient) -> None:
+        self._client = client
+        self._events: dict[int, Event] = {}
+
+    def _matches(
+        self,
+        event: Event,
+        type: Optional[str],
+        subtype: Optional[str],
+        root_asset_external_ids: Optional[Sequence[str]],
+    ) -> bool:
+        if type is not None and event.type != type:
+            return False
+        if subtype is not None and event.subtype != subtype:
+            return False
+        if root_asset_external_ids is not None:
+            roots = {self._client.assets._root_external_id(asset_id) for asset_id in event.asset_ids or []}
+            return not roots.isdisjoint(root_asset_external_ids)
+        return True
+
+    def __call__(
+        self, type: Optional[str] = None, root_asset_external_ids: Optional[Sequence[str]] = None
+    ) -> Iterator[Event]:
+        return iter(self.list(type=type, root_asset_external_ids=root_asset_external_ids, limit=-1))
+
+    def list(
+        self,
+        type: Optional[str] = None,
+        subtype: Optional[str] = None,
+        root_asset_external_ids: Optional[Sequence[str]] = None,
+        sort: Optional[Sequence[str]] = None,
+        limit: int = 25,
+    ) -> EventList:
+        self._client._round_trip("events.list")
+        with self._client._lock:
+            events = [
+                copy.deepcopy(e)
+                for e in self._events.values()
+                if self._matches(e, type, subtype, root_asset_external_ids)
+            ]
+        for sort_spec in reversed(sort or []):
+            field, _, order = sort_spec.partition(":")
+            attribute = "created_time" if field == "createdTime" else field
+            events.sort(key=lambda e: getattr(e, attribute), reverse=order == "desc")
+        return EventList(events if limit in (-1, None) else events[:limit])
+
+    def create(self, event: Union[Event, Sequence[Event]]) -> Union[Event, EventList]:
+        self._client._round_trip("events.create")
+        with self._client._lock:
+            new_events = _as_list(event)
+            existing = {e.external_id for e in self._events.values() if e.external_id is not None}
+            duplicated = [e.external_id for e in new_events if e.external_id is not None and e.external_id in existing]
+            if duplicated:
+                raise CogniteDuplicatedError(duplicated)
+            created = []
+            for new_event in new_events:
+                stored = copy.deepcopy(new_event)
+                stored.id = self._client._new_id()
+                stored.created_time = stored.last_updated_time = self._client._now()
+                self._events[stored.id] = stored
+                created.append(copy.deepcopy(stored))
+        return EventList(created) if isinstance(event, (list, tuple)) else created[0]
+
+    def delete(
+        self, id: Union[int, Sequence[int], None] = None, external_id: Union[str, Sequence[str], None] = None
+    ) -> None:
+        self._client._round_trip("events.delete")
+        with self._client._lock:
+            by_external_id = {e.external_id: e.id for e in self._events.values() if e.external_id is not None}
+            ids = _as_list(id) + [by_external_id.get(external_id) for external_id in _as_list(external_id)]
+            if any(i not in self._events for i in ids):
+                raise CogniteNotFoundError([*_as_list(id), *_as_list(external_id)])
+            for i in ids:
+                del self._events[i]
+
+    def update(self, item: Union[EventUpdate, Sequence[EventUpdate]]) -> Union[Event, EventList]:
+        self._client._round_trip("events.update")
+        with self._client._lock:
+            by_external_id = {e.external_id: e.id for e in self._events.values() if e.external_id is not None}
+            updated = [self._update(i, by_external_id) for i in _as_list(item)]
+        return EventList(updated) if isinstance(item, (list, tuple)) else updated[0]
+
+    def _update(self, item: EventUpdate, by_external_id: dict[str, int]) -> Event:
+        dumped = item.dump()
+        id, external_id = dumped.get("id"), dumped.get("externalId")
+        stored = self._events.get(id if id is not None else by_external_id.get(external_id, -1))
+        if stored is None:
+            raise CogniteNotFoundError([id or external_id])
+        metadata = dumped["update"].get("metadata", {})
+        stored.metadata = dict(metadata["set"]) if "set" in metadata else {**(stored.metadata or {})}
+        stored.metadata.update(metadata.get("add", {}))
+        for key in metadata.get("remove", []):
+            stored.metadata.pop(key, None)
+        stored.last_updated_time = self._client._now()
+        return copy.deepcopy(stored)
+
+
+class FakeTimeSeriesAPI:
+    def __init__(self, client: FakeCogniteClient) -> None:
+        self._client = client
+        self._time_series: dict[int, TimeSeries] = {}
+
+    def list(
+        self,
+        asset_ids: Optional[Sequence[int]] = None,
+        asset_external_ids: Optional[Sequence[str]] = None,
+        asset_subtree_ids: Optional[Sequence[int]] = None,
+        limit: int = 25,
+    ) -> TimeSeriesList:
+        self._client._round_trip("time_series.list")
+        with self._client._lock:
+            assets = self._client.assets
+            if asset_external_ids is not None:
+                external_asset_ids = [a.id for a in map(assets._by_external_id, asset_external_ids) if a is not None]
+                asset_ids = [*(asset_ids or []), *external_asset_ids]
+            time_series = [
+                copy.deepcopy(ts)
+                for ts in self._time_series.values()
+                if (asset_ids is None or ts.asset_id in asset_ids)
+                and (asset_subtree_ids is None or assets.in_subtree(ts.asset_id, asset_subtree_ids))
+            ]
+        return TimeSeriesList(time_series if limit in (-1, None) else time_series[:limit])
+
+    def create(self, time_series: Union[TimeSeries, Sequence[TimeSeries]]) -> Union[TimeSeries, TimeSeriesList]:
+        self._client._round_trip("time_series.create")
+        with self._client._lock:
+            created = []
+            for new_time_series in _as_list(time_series):
+                stored = copy.deepcopy(new_time_series)
+                stored.id = self._client._new_id()
+                stored.created_time = stored.last_updated_time = self._client._now()
+                self._time_series[stored.id] = stored
+                self._client.datapoints._datapoints[stored.id] = {}
+                created.append(copy.deepcopy(stored))
+        return TimeSeriesList(created) if isinstance(time_series, (list, tuple)) else created[0]
+
+    def delete(self, id: Union[int, Sequence[int], None] = None) -> None:
+        self._client._round_trip("time_series.delete")
+        with self._client._lock:
+            ids = _as_list(id)
+            if any(i not in self._time_series for i in ids):
+                raise CogniteNotFoundError(ids)
+            for i in ids:
+                del self._time_series[i]
+                self._client.datapoints._datapoints.pop(i, None)
+
+
+class FakeDatapointsAPI:
+    def __init__(self, client: FakeCogniteClient) -> None:
+        self._client = client
+        self._datapoints: dict[int, dict[int, float]] = {}
+
+    def _series(self, id: int) -> dict[int, float]:
+        if id not in self._datapoints:
+            raise CogniteNotFoundError([id])
+        return self._datapoints[id]
+
+    def retrieve(self, id: int, start: int = 0, end: Optional[int] = None) -> Datapoints:
+        self._client._round_trip("datapoints.retrieve")
+        with self._client._lock:
+            points = sorted((t, v) for t, v in self._series(id).items() if start <= t and (end is None or t < end))
+        return Datapoints(id=id, timestamp=[t for t, _ in points], value=[v for _, v in points])
+
+    def insert_multiple(self, datapoints: list[dict[str, Any]]) -> None:
+        self._client._round_trip("datapoints.insert_multiple")
+        with self._client._lock:
+            for series in datapoints:
+                self._series(series["id"]).update(series["datapoints"])
+
+    def delete_ranges(self, ranges: list[dict[str, Any]]) -> None:
+        self._client._round_trip("datapoints.delete_ranges")
+        with self._client._lock:
+            for delete_range in ranges:
+                series = self._series(delete_range["id"])
+                for t in [t for t in series if delete_range["start"] <= t < delete_range["end"]]:
+                    del series[t]
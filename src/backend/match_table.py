@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass, field
+from itertools import compress
+from typing import Iterable, Optional
+
+from src.backend.data_classes import Hand, Match, Sport
+from src.backend.rating import HANDS, SPORTS
+
+HAND_INDICES = {hand: i for i, hand in enumerate(HANDS)}
+SPORT_INDICES = {sport: i for i, sport in enumerate(SPORTS)}
+
+
+@dataclass
+class MatchTable:
+    """
+    Columnar copy of a match log, one typed array per match field. Player ids are interned to indices into
+    `player_ids`; hands and sports are stored as indices into `HANDS` and `SPORTS`. Row i of every column describes the
+    i-th match, in the order the matches were registered.
+    """
+
+    player_ids: list[str] = field(default_factory=list)
+    player_indices: dict[str, int] = field(default_factory=dict)
+    player1: array = field(default_factory=lambda: array("l"))
+    player2: array = field(default_factory=lambda: array("l"))
+    score1: array = field(default_factory=lambda: array("l"))
+    score2: array = field(default_factory=lambda: array("l"))
+    rating1: array = field(default_factory=lambda: array("l"))
+    rating2: array = field(default_factory=lambda: array("l"))
+    hand1: array = field(default_factory=lambda: array("b"))
+    hand2: array = field(default_factory=lambda: array("b"))
+    sport: array = field(default_factory=lambda: array("b"))
+
+    @classmethod
+    def from_matches(cls, matches: Iterable[Match]) -> MatchTable:
+        table = cls()
+        for match in matches:
+            table.append(match)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.player1)
+
+    def intern(self, player_id: str) -> int:
+        index = self.player_indices.get(player_id)
+        if index is None:
+            index = self.player_indices[player_id] = len(self.player_ids)
+            self.player_ids.append(player_id)
+        return index
+
+    def append(self, match: Match) -> None:
+        self.append_row(
+            self.intern(match.player1_id),
+            self.intern(match.player2_id),
+            match.player1_score,
+            match.player2_score,
+            match.player1_rating,
+            match.player2_rating,
+            HAND_INDICES[match.player1_hand],
+            HAND_INDICES[match.player2_hand],
+            SPORT_INDICES[match.sport],
+        )
+
+    def append_row(
+        self,
+        player1: int,
+        player2: int,
+        score1: int,
+        score2: int,
+        rating1: int,
+        rating2: int,
+        hand1: int,
+        hand2: int,
+        sport: int,
+    ) -> None:
+        self.player1.append(player1)
+        self.player2.append(player2)
+        self.score1.append(score1)
+        self.score2.append(score2)
+        self.rating1.append(rating1)
+        self.rating2.append(rating2)
+        self.hand1.append(hand1)
+        self.hand2.append(hand2)
+        self.sport.append(sport)
+
+    def match(self, row: int) -> Match:
+        return Match(
+            self.player_ids[self.player1[row]],
+            self.player_ids[self.player2[row]],
+            self.score1[row],
+            self.score2[row],
+            self.rating1[row],
+            self.rating2[row],
+            SPORTS[self.sport[row]],
+            HANDS[self.hand1[row]],
+            HANDS[self.hand2[row]],
+        )
+
+    def player1_wins(self) -> array:
+        return array("b", map(int.__gt__, self.score1, self.score2))
+
+    def take(self, rows: Iterable[int]) -> MatchTable:
+        """
+        Returns a table with only the given rows, sharing the interned player ids.
+        """
+        rows = list(rows)
+        table = MatchTable(self.player_ids, self.player_indices)
+        for name in ("player1", "player2", "score1", "score2", "rating1", "rating2", "hand1", "hand2", "sport"):
+            column = getattr(self, name)
+            setattr(table, name, array(column.typecode, [column[row] for row in rows]))
+        return table
+
+    def rows_with_player(self, player_id: str) -> list[int]:
+        index = self.player_indices.get(player_id)
+        if index is None:
+            return []
+        return [row for row, (p1, p2) in enumerate(zip(self.player1, self.player2)) if p1 == index or p2 == index]
+
+    def rows_in_sport(self, sport: Sport) -> list[int]:
+        sport_index = SPORT_INDICES[sport]
+        return list(compress(range(len(self)), (s == sport_index for s in self.sport)))
+
+    def wins(self, player_id: str, sport: Optional[Sport] = None, hand: Optional[Hand] = None) -> int:
+        return sum(won for won in self._results(player_id, sport, hand))
+
+    def losses(self, player_id: str, sport: Optional[Sport] = None, hand: Optional[Hand] = None) -> int:
+        return sum(not won for won in self._results(player_id, sport, hand))
+
+    def _results(self, player_id: str, sport: Optional[Sport], hand: Optional[Hand]) -> list[bool]:
+        """
+        Returns whether the player won, for each of their matches matching the filters.
+        """
+        index = self.player_indices.get(player_id)
+        if index is None:
+            return []
+        sport_index = None if sport is None else SPORT_INDICES[sport]
+        hand_index = None if hand is None else HAND_INDICES[hand]
+        results = []
+        columns = zip(self.player1, self.player2, self.score1, self.score2, self.hand1, self.hand2, self.sport)
+        for p1, p2, score1, score2, hand1, hand2, s in columns:
+            if sport_index is not None and s != sport_index:
+                continue
+            if p1 == index and (hand_index is None or hand1 == hand_index):
+                results.append(score1 > score2)
+            elif p2 == index and (hand_index is None or hand2 == hand_index):
+                results.append(score2 > score1)
+        return results
+
+    def head_to_head(self, player_id1: str, player_id2: str, sport: Optional[Sport] = None) -> tuple[int, int]:
+        """
+        Returns the number of matches between the two players won by the first and by the second player.
+        """
+        index1, index2 = self.player_indices.get(player_id1), self.player_indices.get(player_id2)
+        if index1 is None or index2 is None:
+            return 0, 0
+        sport_index = None if sport is None else SPORT_INDICES[sport]
+        wins1 = wins2 = 0
+        for p1, p2, score1, score2, s in zip(self.player1, self.player2, self.score1, self.score2, self.sport):
+            if (sport_index is not None and s != sport_index) or {p1, p2} != {index1, index2}:
+                continue
+            if (score1 > score2) == (p1 == index1):
+                wins1 += 1
+            else:
+                wins2 += 1
+        return wins1, wins2
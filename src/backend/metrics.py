@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+# Upper bounds in seconds of the latency histogram buckets; the last, implicit bucket is +Inf
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    count: int = 0
+    sum: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns the upper bound of the bucket holding the q-quantile, or +Inf if it is above the largest bucket.
+        """
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and latency histograms keyed by metric name and labels, rendered in the Prometheus
+    text format. Gauge callbacks are evaluated at render time, for values owned by other components.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._gauges: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, Histogram]] = {}
+        self._gauge_callbacks: dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def add_to_gauge(self, name: str, amount: float, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def register_gauge(self, name: str, callback: Callable[[], float]) -> None:
+        with self._lock:
+            self._gauge_callbacks[name] = callback
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @contextmanager
+    def track(self, prefix: str, **labels: str) -> Iterator[None]:
+        """
+        Times the block into the `<prefix>_seconds` histogram, counts raised exceptions in `<prefix>_errors_total`
+        and keeps the number of blocks running in the `<prefix>_in_flight` gauge.
+        """
+        self.add_to_gauge(f"{prefix}_in_flight", 1, **labels)
+        start = self._clock()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{prefix}_errors_total", 1, **labels)
+            raise
+        finally:
+            self.observe(f"{prefix}_seconds", self._clock() - start, **labels)
+            self.add_to_gauge(f"{prefix}_in_flight", -1, **labels)
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        with self._lock:
+            return self._histograms.get(name, {}).get(_labels(labels), Histogram())
+
+    def counter(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(labels), 0)
+
+    def gauge(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._gauges.get(name, {}).get(_labels(labels), 0)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, counter_series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{_format_labels(key)} {value:g}" for key, value in sorted(counter_series.items()))
+            gauges = {name: dict(gauge_series) for name, gauge_series in self._gauges.items()}
+            callbacks = dict(self._gauge_callbacks)
+            for name, histogram_series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(histogram_series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        for name, callback in callbacks.items():
+            gauges[name] = {(): callback()}
+        for name, gauge_series in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_format_labels(key)} {value:g}" for key, value in sorted(gauge_series.items()))
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> list[str]:
+        """
+        Returns one human readable line per latency histogram: call count, errors, mean and approximate p50 and p99.
+        """
+        lines = []
+        with self._lock:
+            for name, histogram_series in sorted(self._histograms.items()):
+                errors = self._counters.get(name.removesuffix("_seconds") + "_errors_total", {})
+                for key, histogram in sorted(histogram_series.items()):
+                    mean_ms = 1000 * histogram.sum / histogram.count if histogram.count else 0.0
+                    lines.append(
+                        f"{name.removesuffix('_seconds')}{_format_labels(key)}: {histogram.count} calls, "
+                        f"{errors.get(key, 0):g} errors, mean {mean_ms:.1f}ms, "
+                        f"p50 <= {1000 * histogram.quantile(0.5):g}ms, p99 <= {1000 * histogram.quantile(0.99):g}ms"
+                    )
+        return lines
+
+
+# Registry shared by the bot, its backend and the metrics endpoint
+REGISTRY = MetricsRegistry()
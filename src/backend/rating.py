@@ -1,54 +1,160 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Iterator, Optional
+from array import array
+from typing import Any, Iterable, Iterator, Optional, Sequence
 
 from src.backend.data_classes import Hand, Sport
 
 INITIAL_RATING = 1000
+K_FACTOR = 32
+# Largest rating difference covered by the RatingCalculator lookup table
+MAX_TABLE_DIFFERENCE = 2000
 
 
 class RatingCalculator:
+    """
+    Elo rating updates. Since ratings are integers, the rating changes only depend on the integer rating difference,
+    so an instance precomputes them for every difference up to `max_difference` and looks them up instead of
+    evaluating the expected scores. Larger differences fall back to `calculate_new_elo_ratings`.
+    """
+
+    def __init__(self, k_factor: int = K_FACTOR, max_difference: int = MAX_TABLE_DIFFERENCE) -> None:
+        self.k_factor = k_factor
+        self.max_difference = max_difference
+        # Rating changes of player 1 and player 2 when player 1 wins or loses, indexed by the rating difference
+        self._win_changes1, self._win_changes2 = array("l"), array("l")
+        self._loss_changes1, self._loss_changes2 = array("l"), array("l")
+        for difference in range(-max_difference, max_difference + 1):
+            win1, win2 = self.calculate_new_elo_ratings(difference, 0, True, k_factor)
+            loss1, loss2 = self.calculate_new_elo_ratings(difference, 0, False, k_factor)
+            self._win_changes1.append(win1 - difference)
+            self._win_changes2.append(win2)
+            self._loss_changes1.append(loss1 - difference)
+            self._loss_changes2.append(loss2)
+
     @staticmethod
-    def calculate_new_elo_ratings(rating1: int, rating2: int, player1_win: bool) -> tuple[int, int]:
+    def calculate_new_elo_ratings(
+        rating1: int, rating2: int, player1_win: bool, k_factor: int = K_FACTOR
+    ) -> tuple[int, int]:
         t1 = 10 ** (rating1 / 400)
         t2 = 10 ** (rating2 / 400)
         e1 = t1 / (t1 + t2)
         e2 = t2 / (t1 + t2)
         s1 = 1 if player1_win else 0
         s2 = 0 if player1_win else 1
-        new_rating1 = rating1 + int(round(32 * (s1 - e1)))
-        new_rating2 = rating2 + int(round(32 * (s2 - e2)))
+        new_rating1 = rating1 + int(round(k_factor * (s1 - e1)))
+        new_rating2 = rating2 + int(round(k_factor * (s2 - e2)))
         return new_rating1, new_rating2
 
+    def new_ratings(self, rating1: int, rating2: int, player1_win: bool) -> tuple[int, int]:
+        """
+        Same result as `calculate_new_elo_ratings` with this calculator's K-factor, using the precomputed table.
+        """
+        index = rating1 - rating2 + self.max_difference
+        if not 0 <= index <= 2 * self.max_difference:
+            return self.calculate_new_elo_ratings(rating1, rating2, player1_win, self.k_factor)
+        if player1_win:
+            return rating1 + self._win_changes1[index], rating2 + self._win_changes2[index]
+        return rating1 + self._loss_changes1[index], rating2 + self._loss_changes2[index]
+
+    def new_ratings_batch(
+        self, ratings1: Sequence[int], ratings2: Sequence[int], player1_wins: Sequence[bool]
+    ) -> tuple[array, array]:
+        """
+        Rates many independent matches at once. Returns the new ratings of all player 1s and all player 2s.
+        """
+        indices = [rating1 - rating2 + self.max_difference for rating1, rating2 in zip(ratings1, ratings2)]
+        if min(indices, default=0) < 0 or max(indices, default=0) > 2 * self.max_difference:
+            new_ratings = [self.new_ratings(*match) for match in zip(ratings1, ratings2, player1_wins)]
+            return array("l", (r1 for r1, _ in new_ratings)), array("l", (r2 for _, r2 in new_ratings))
+        win1, win2, loss1, loss2 = self._win_changes1, self._win_changes2, self._loss_changes1, self._loss_changes2
+        return (
+            array("l", [r + (win1[i] if w else loss1[i]) for r, i, w in zip(ratings1, indices, player1_wins)]),
+            array("l", [r + (win2[i] if w else loss2[i]) for r, i, w in zip(ratings2, indices, player1_wins)]),
+        )
+
 
 RatingDict = dict[Hand, dict[Sport, int]]
 
+HANDS = tuple(Hand)
+SPORTS = tuple(Sport)
+# Each (hand, sport) pair has a fixed slot, hand-major. New hands and sports must be appended to keep slots stable.
+SLOTS = {(hand, sport): i * len(SPORTS) + j for i, hand in enumerate(HANDS) for j, sport in enumerate(SPORTS)}
+# Marks slots that have no rating yet, which is different from a rating equal to INITIAL_RATING
+UNSET = -(2**15)
+ENCODING_PREFIX = "v1:"
+
 
 class Ratings:
+    """
+    Immutable ratings of one player, stored as one signed 16-bit value per (hand, sport) slot.
+    """
+
+    __slots__ = ("_slots",)
+
     def __init__(self, ratings: Optional[RatingDict] = None):
-        self._ratings: RatingDict = ratings or {}
+        self._slots = array("h", [UNSET]) * len(SLOTS)
+        for hand, sport_ratings in (ratings or {}).items():
+            for sport, rating in sport_ratings.items():
+                self._slots[SLOTS[(hand, sport)]] = rating
+
+    @classmethod
+    def from_slots(cls, slots: Iterable[int]) -> Ratings:
+        """
+        Creates ratings from one value per slot in SLOTS order, UNSET for slots without a rating.
+        """
+        return cls._from_slots(array("h", slots))
+
+    @classmethod
+    def _from_slots(cls, slots: array) -> Ratings:
+        ratings = cls.__new__(cls)
+        ratings._slots = slots
+        return ratings
 
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, Ratings):
             return False
-        return self._ratings == other._ratings
+        return self._slots == other._slots
+
+    def __repr__(self) -> str:
+        return f"Ratings({self.encode()!r})"
 
     def __iter__(self) -> Iterator[tuple[Hand, Sport, int]]:
-        for hand in self._ratings:
-            for sport, rating in self._ratings[hand].items():
-                yield hand, sport, rating
+        for slot, rating in enumerate(self._slots):
+            if rating != UNSET:
+                yield HANDS[slot // len(SPORTS)], SPORTS[slot % len(SPORTS)], rating
 
     def update(self, hand: Hand, sport: Sport, rating: int) -> Ratings:
-        return Ratings({**self._ratings, **{hand: {sport: rating}}})
+        slots = array("h", self._slots)
+        slots[SLOTS[(hand, sport)]] = rating
+        return Ratings._from_slots(slots)
 
     def get(self, hand: Hand, sport: Sport) -> int:
-        if hand not in self._ratings or sport not in self._ratings[hand]:
-            return INITIAL_RATING
-        return self._ratings[hand][sport]
+        rating = self._slots[SLOTS[(hand, sport)]]
+        return INITIAL_RATING if rating == UNSET else rating
+
+    def encode(self) -> str:
+        """
+        Compact representation used in storage, e.g. "v1:1016,,984," for the slots in SLOTS order.
+        """
+        return ENCODING_PREFIX + ",".join("" if rating == UNSET else str(rating) for rating in self._slots)
+
+    @classmethod
+    def decode(cls, s: str) -> Ratings:
+        """
+        Reads both the compact encoding and the JSON written before it existed.
+        """
+        if not s.startswith(ENCODING_PREFIX):
+            return cls.from_json(s)
+        slots = array("h", [int(value) if value else UNSET for value in s[len(ENCODING_PREFIX) :].split(",")])
+        # Encodings written before a hand or sport was added have fewer slots
+        if len(slots) < len(SLOTS):
+            slots.extend([UNSET] * (len(SLOTS) - len(slots)))
+        return cls._from_slots(slots)
 
     @classmethod
-    def from_json(self, s: str) -> Ratings:
+    def from_json(cls, s: str) -> Ratings:
         ratings_raw = json.loads(s)
         ratings: RatingDict = {}
         for hand in ratings_raw:
@@ -59,8 +165,6 @@ class Ratings:
 
     def to_json(self) -> str:
         ratings: dict[str, dict[str, int]] = {}
-        for hand in self._ratings:
-            ratings[hand.value] = {}
-            for sport, ranking in self._ratings[hand].items():
-                ratings[hand.value].update({sport.value: ranking})
+        for hand, sport, rating in self:
+            ratings.setdefault(hand.value, {})[sport.value] = rating
         return json.dumps(ratings)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+
+from src.backend.backend import Backend
+from src.backend.data_classes import Sport
+from src.backend.match_table import MatchTable
+from src.backend.rating import HANDS, INITIAL_RATING, K_FACTOR, SLOTS, SPORTS, UNSET, RatingCalculator, Ratings
+
+# The ratings of a player occupy consecutive slots in the same order as in Ratings
+SLOTS_PER_PLAYER = len(SLOTS)
+
+
+def rating_slot(player_index: int, hand_index: int, sport_index: int) -> int:
+    return (player_index * len(HANDS) + hand_index) * len(SPORTS) + sport_index
+
+
+@dataclass
+class ReplayResult:
+    player_ids: list[str]
+    # current rating per rating slot, see rating_slot
+    ratings: array
+    # whether each rating slot has been played at all
+    played: array
+    # ratings of the players going into each match, as stored in Match.player1_rating/player2_rating
+    player1_ratings: array
+    player2_ratings: array
+
+    def player_ratings(self, player_index: int) -> Ratings:
+        start = player_index * SLOTS_PER_PLAYER
+        slots = range(start, start + SLOTS_PER_PLAYER)
+        return Ratings.from_slots(self.ratings[slot] if self.played[slot] else UNSET for slot in slots)
+
+
+def replay(table: MatchTable, k_factor: int = K_FACTOR) -> ReplayResult:
+    """
+    Recomputes all ratings by replaying the matches in order, in a single pass over the table columns.
+    """
+    n_hands, n_sports = len(HANDS), len(SPORTS)
+    ratings = array("l", [INITIAL_RATING]) * (len(table.player_ids) * SLOTS_PER_PLAYER)
+    played = array("b", [0]) * len(ratings)
+    player1_ratings = array("l", [0]) * len(table)
+    player2_ratings = array("l", [0]) * len(table)
+    new_ratings = RatingCalculator(k_factor).new_ratings
+
+    matches = zip(table.player1, table.player2, table.hand1, table.hand2, table.sport, table.player1_wins())
+    for i, (p1, p2, h1, h2, sport, player1_win) in enumerate(matches):
+        slot1 = (p1 * n_hands + h1) * n_sports + sport
+        slot2 = (p2 * n_hands + h2) * n_sports + sport
+        rating1 = ratings[slot1]
+        rating2 = ratings[slot2]
+        player1_ratings[i] = rating1
+        player2_ratings[i] = rating2
+        ratings[slot1], ratings[slot2] = new_ratings(rating1, rating2, player1_win)
+        played[slot1] = played[slot2] = 1
+    return ReplayResult(table.player_ids, ratings, played, player1_ratings, player2_ratings)
+
+
+def replay_backend(backend: Backend, k_factor: int = K_FACTOR) -> ReplayResult:
+    """
+    Recomputes every player's ratings from the full match history and writes the ratings that changed back to the
+    backend in a single unit of work, together with the ratings going into each match, which undo restores.
+    """
+    # Listed per sport rather than as a table, as the match ids are needed to write the match ratings back
+    matches = [match for sport in Sport for match in backend.list_matches(sport)]
+    result = replay(MatchTable.from_matches(matches), k_factor)
+    player_indices = {player_id: i for i, player_id in enumerate(result.player_ids)}
+    with backend.transaction() as transaction:
+        for match, rating1, rating2 in zip(matches, result.player1_ratings, result.player2_ratings):
+            if (match.player1_rating, match.player2_rating) != (rating1, rating2):
+                transaction.update_match(match, rating1, rating2)
+        for player in backend.list_players():
+            index = player_indices.get(player.id)
+            new_ratings = result.player_ratings(index) if index is not None else Ratings()
+            if new_ratings != player.ratings:
+                transaction.update_player(player, ratings=new_ratings)
+    return result
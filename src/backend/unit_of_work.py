@@ -0,0 +1,52 @@
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+from src.backend.data_classes import Match, Player
+from src.backend.rating import Ratings
+
+
+@dataclass
+class PlayerUpdate:
+    player: Player
+    name: Optional[str] = None
+    ratings: Optional[Ratings] = None
+
+    def updated_player(self) -> Player:
+        return Player(self.player.id, self.name or self.player.name, self.ratings or self.player.ratings)
+
+
+@dataclass
+class UnitOfWork:
+    """
+    Collects writes so that a backend can commit them together, using as few round trips as it is able to.
+    """
+
+    matches: list[Match] = field(default_factory=list)
+    player_updates: list[PlayerUpdate] = field(default_factory=list)
+    deleted_matches: list[Match] = field(default_factory=list)
+    updated_matches: list[Match] = field(default_factory=list)
+
+    def create_match(self, match: Match) -> Match:
+        match = match.with_id()
+        self.matches.append(match)
+        return match
+
+    def delete_match(self, match: Match) -> None:
+        self.deleted_matches.append(match)
+
+    def update_match(self, match: Match, player1_rating: int, player2_rating: int) -> Match:
+        """
+        Registers new ratings of the players going into an already registered match and returns the match as it will
+        look after the commit.
+        """
+        updated_match = replace(match, player1_rating=player1_rating, player2_rating=player2_rating)
+        self.updated_matches.append(updated_match)
+        return updated_match
+
+    def update_player(self, player: Player, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
+        """
+        Registers an update of an already fetched player and returns the player as it will look after the commit.
+        """
+        player_update = PlayerUpdate(player, name, ratings)
+        self.player_updates.append(player_update)
+        return player_update.updated_player()
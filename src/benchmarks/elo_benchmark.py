@@ -0,0 +1,53 @@
+"""
+Compares the scalar Elo formula with the RatingCalculator lookup table and batch API.
+
+    python -m src.benchmarks.elo_benchmark --pairs 1000000
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Callable
+
+from src.backend.rating import RatingCalculator
+
+
+def timed(fn: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    ratings1 = [rng.randrange(700, 1400) for _ in range(args.pairs)]
+    ratings2 = [rng.randrange(700, 1400) for _ in range(args.pairs)]
+    player1_wins = [rng.random() < 0.5 for _ in range(args.pairs)]
+    pairs = list(zip(ratings1, ratings2, player1_wins))
+
+    calculator = RatingCalculator()
+    results = {
+        "scalar": timed(lambda: [RatingCalculator.calculate_new_elo_ratings(r1, r2, w) for r1, r2, w in pairs]),
+        "table": timed(lambda: [calculator.new_ratings(r1, r2, w) for r1, r2, w in pairs]),
+        "batch": timed(lambda: calculator.new_ratings_batch(ratings1, ratings2, player1_wins)),
+    }
+    for name, seconds in results.items():
+        print(
+            json.dumps(
+                {
+                    "benchmark": f"elo_{name}",
+                    "pairs": args.pairs,
+                    "seconds": round(seconds, 3),
+                    "pairs_per_second": round(args.pairs / seconds),
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
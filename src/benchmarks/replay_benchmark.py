@@ -0,0 +1,61 @@
+"""
+Times a full rating replay over a synthetic match log.
+
+    python -m src.benchmarks.replay_benchmark --matches 1000000 --players 300
+"""
+
+import argparse
+import json
+import random
+import time
+from array import array
+
+from src.backend.match_table import MatchTable
+from src.backend.rating import SPORTS
+from src.backend.replay import replay
+
+
+def synthetic_table(n_matches: int, n_players: int, seed: int = 0) -> MatchTable:
+    rng = random.Random(seed)
+    player_ids = [f"player{i}" for i in range(n_players)]
+    table = MatchTable(player_ids, {player_id: i for i, player_id in enumerate(player_ids)})
+    player1 = [rng.randrange(n_players) for _ in range(n_matches)]
+    player1_win = [rng.random() < 0.5 for _ in range(n_matches)]
+    table.player1 = array("l", player1)
+    table.player2 = array("l", ((p + rng.randrange(1, n_players)) % n_players for p in player1))
+    table.score1 = array("l", (11 if win else rng.randrange(11) for win in player1_win))
+    table.score2 = array("l", (rng.randrange(11) if win else 11 for win in player1_win))
+    # ratings at the time of each match are only used by queries, not by the replay
+    table.rating1 = array("l", [0]) * n_matches
+    table.rating2 = array("l", [0]) * n_matches
+    table.hand1 = array("b", (rng.random() < 0.1 for _ in range(n_matches)))
+    table.hand2 = array("b", (rng.random() < 0.1 for _ in range(n_matches)))
+    table.sport = array("b", (rng.randrange(len(SPORTS)) if rng.random() < 0.05 else 0 for _ in range(n_matches)))
+    return table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--players", type=int, default=300)
+    args = parser.parse_args()
+
+    table = synthetic_table(args.matches, args.players)
+    start = time.perf_counter()
+    replay(table)
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "benchmark": "replay",
+                "matches": args.matches,
+                "players": args.players,
+                "seconds": round(elapsed, 3),
+                "matches_per_second": round(args.matches / elapsed),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Times PingPongService operations and end-to-end bot commands on a synthetic office: against the in-memory backend,
+against the same data behind a fixed latency per backend call, and against BackendCdf on a FakeCogniteClient with the
+same latency per API call, simulating CDF round trips, with rating datapoints written directly and written behind.
+
+    python -m src.benchmarks.service_benchmark --players 100 --matches 5000 --latency-ms 20
+"""
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Optional, cast
+
+from cognite.client import CogniteClient
+from slack_sdk.rtm_v2 import RTMClient
+
+from src.backend.backend import Backend
+from src.backend.backend_cdf import BackendCdf
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Hand, Match, Player, Sport
+from src.backend.datapoint_queue import DatapointQueue
+from src.backend.fake_cognite_client import FakeCogniteClient
+from src.backend.rating import Ratings
+from src.pingpong.pingpong_service import PingPongService
+from src.pingpong.slackbot import BotCommand, CommandType, PingPongSlackBot
+
+BOT_ID = "BENCHBOT"
+CHANNEL_ID = "BENCHCHANNEL"
+
+
+class LatencyBackend(Backend):
+    """
+    Delegates to another backend, sleeping `latency` seconds (plus up to `jitter` seconds) before every call.
+    Transactions are committed through the individual write methods, one round trip each.
+    """
+
+    def __init__(self, backend: Backend, latency: float, jitter: float = 0.0, seed: int = 0) -> None:
+        self._backend = backend
+        self._latency = latency
+        self._jitter = jitter
+        self._rng = random.Random(seed)
+        self.round_trips = 0
+
+    def _round_trip(self) -> None:
+        self.round_trips += 1
+        time.sleep(self._latency + self._rng.uniform(0, self._jitter))
+
+    def wipe(self) -> None:
+        self._round_trip()
+        self._backend.wipe()
+
+    def create_player(self, player: Player) -> Player:
+        self._round_trip()
+        return self._backend.create_player(player)
+
+    def get_player(self, id: str) -> Optional[Player]:
+        self._round_trip()
+        return self._backend.get_player(id)
+
+    def list_players(self) -> list[Player]:
+        self._round_trip()
+        return self._backend.list_players()
+
+    def get_player_by_name(self, name: str) -> Optional[Player]:
+        self._round_trip()
+        return self._backend.get_player_by_name(name)
+
+    def is_name_taken(self, name: str) -> bool:
+        self._round_trip()
+        return self._backend.is_name_taken(name)
+
+    def update_player(self, id: str, name: Optional[str] = None, ratings: Optional[Ratings] = None) -> Player:
+        self._round_trip()
+        return self._backend.update_player(id, name=name, ratings=ratings)
+
+    def create_match(self, match: Match) -> Match:
+        self._round_trip()
+        return self._backend.create_match(match)
+
+    def list_matches(self, sport: Sport) -> list[Match]:
+        self._round_trip()
+        return self._backend.list_matches(sport)
+
+    def get_latest_match(self, sport: Sport) -> Optional[Match]:
+        self._round_trip()
+        return self._backend.get_latest_match(sport)
+
+    def delete_match(self, match: Match) -> None:
+        self._round_trip()
+        self._backend.delete_match(match)
+
+    def update_matches(self, matches: list[Match]) -> None:
+        self._round_trip()
+        self._backend.update_matches(matches)
+
+
+class _WebClient:
+    def rtm_connect(self) -> dict[str, Any]:
+        return {"self": {"id": BOT_ID}}
+
+    def chat_postMessage(self, channel: str, text: str) -> None:
+        pass
+
+
+class _RtmClient:
+    """
+    Stands in for the Slack RTM client; responses are discarded.
+    """
+
+    web_client = _WebClient()
+
+    def on(self, event_type: str) -> Callable[[Callable], None]:
+        return lambda handler: None
+
+
+class Office:
+    """
+    Synthetic office: players with skewed activity, where the i-th most active player plays with weight
+    1 / (i + 1) ** skew.
+    """
+
+    def __init__(self, n_players: int, skew: float, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.player_ids = [f"U{i:06}" for i in range(n_players)]
+        self.weights = [1 / (i + 1) ** skew for i in range(n_players)]
+        self.names = {player_id: f"player{i}" for i, player_id in enumerate(self.player_ids)}
+        self._names_issued = 0
+
+    def populate(self, backend: Backend, n_matches: int) -> None:
+        for player_id, name in self.names.items():
+            backend.create_player(Player(player_id, name, Ratings()))
+        service = PingPongService(backend)
+        for _ in range(n_matches):
+            self.add_match(service)
+
+    def pair(self) -> tuple[str, str]:
+        player1 = self.player()
+        while (player2 := self.player()) == player1:
+            pass
+        return player1, player2
+
+    def player(self) -> str:
+        return self.rng.choices(self.player_ids, self.weights)[0]
+
+    def name(self) -> str:
+        return self.names[self.player()]
+
+    def rename(self, service: PingPongService) -> None:
+        player_id = self.player()
+        self._names_issued += 1
+        self.names[player_id] = f"renamed{self._names_issued}"
+        service.update_display_name(service.get_player(player_id), self.names[player_id])
+
+    def add_match(self, service: PingPongService) -> None:
+        player1, player2 = self.pair()
+        hand1 = Hand.NON_DOMINANT if self.rng.random() < 0.1 else Hand.DOMINANT
+        hand2 = Hand.NON_DOMINANT if self.rng.random() < 0.1 else Hand.DOMINANT
+        won = self.rng.random() < 0.5
+        loser_score = self.rng.randrange(10)
+        service.add_match(player1, hand1, player2, hand2, 11 if won else loser_score, loser_score if won else 11)
+
+    def bot_command(self) -> BotCommand:
+        roll = self.rng.random()
+        sender = self.player()
+        if roll < 0.3:
+            player1, player2 = self.pair()
+            value = f"<@{player1}> <@{player2}> 11 {self.rng.randrange(10)}"
+            return BotCommand(CHANNEL_ID, sender, CommandType.MATCH, value, BOT_ID)
+        if roll < 0.7:
+            return BotCommand(CHANNEL_ID, sender, CommandType.STATS, None, BOT_ID)
+        if roll < 0.9:
+            return BotCommand(CHANNEL_ID, sender, CommandType.STATS, self.name(), BOT_ID)
+        return BotCommand(CHANNEL_ID, sender, CommandType.HELP, None, BOT_ID)
+
+
+def measure(operation: Callable[[], object], iterations: int) -> dict[str, float]:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        operation_start = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - operation_start)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "seconds": round(elapsed, 4),
+        "ops_per_second": round(iterations / elapsed, 1),
+        "p50_ms": round(1000 * statistics.median(latencies), 3),
+        "p99_ms": round(1000 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))], 3),
+    }
+
+
+def run(
+    backend_name: str,
+    backend: Backend,
+    office: Office,
+    iterations: int,
+    params: dict[str, Any],
+    round_trips: Optional[Callable[[], int]] = None,
+) -> None:
+    start = time.perf_counter()
+    service = PingPongService(backend)
+    startup_seconds = time.perf_counter() - start
+    bot = PingPongSlackBot(service, cast(RTMClient, _RtmClient()), {CHANNEL_ID})
+
+    operations: dict[str, Callable[[], object]] = {
+        "add_match": lambda: office.add_match(service),
+        "get_leaderboard": lambda: service.get_leaderboard(office.player()),
+        "get_player_stats": lambda: service.get_player_stats(office.name()),
+        "update_display_name": lambda: office.rename(service),
+        "handle_bot_command": lambda: bot._handle_bot_command(office.bot_command()),
+    }
+    startup = {"seconds": round(startup_seconds, 4)}
+    print(json.dumps({"benchmark": "service_startup", "backend": backend_name, **params, **startup}))
+    for name, operation in operations.items():
+        round_trips_before = round_trips() if round_trips else 0
+        result = measure(operation, iterations)
+        if round_trips:
+            result["round_trips_per_op"] = round((round_trips() - round_trips_before) / iterations, 2)
+        print(json.dumps({"benchmark": f"service_{name}", "backend": backend_name, **params, **result}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--matches", type=int, default=5000)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of player activity")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--latency-iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    office = Office(args.players, args.skew, args.seed)
+    backend = BackendInMemory()
+    office.populate(backend, args.matches)
+    params = {"players": args.players, "matches": args.matches, "skew": args.skew}
+
+    run("memory", backend, office, args.iterations, {**params, "iterations": args.iterations})
+    latency_backend = LatencyBackend(backend, args.latency_ms / 1000, args.jitter_ms / 1000, args.seed)
+    latency_params = {**params, "iterations": args.latency_iterations, "latency_ms": args.latency_ms}
+    run(
+        "latency", latency_backend, office, args.latency_iterations, latency_params, lambda: latency_backend.round_trips
+    )
+
+    client = FakeCogniteClient(seed=args.seed)
+    cdf_backend = BackendCdf("benchmark", cast(CogniteClient, client))
+    Office(args.players, args.skew, args.seed).populate(cdf_backend, args.matches)
+    client.latency, client.jitter = args.latency_ms / 1000, args.jitter_ms / 1000
+    cdf_office = Office(args.players, args.skew, args.seed)
+    run("fake_cdf", cdf_backend, cdf_office, args.latency_iterations, latency_params, client.call_log.count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        datapoint_queue = DatapointQueue(directory)
+        datapoint_queue.start(client.datapoints.insert_multiple, client.datapoints.delete_ranges)
+        queued_backend = BackendCdf("benchmark", cast(CogniteClient, client), datapoint_queue)
+        queued_backend.prefetch_time_series_ids()
+        run(
+            "fake_cdf_write_behind",
+            queued_backend,
+            cdf_office,
+            args.latency_iterations,
+            latency_params,
+            client.call_log.count,
+        )
+        datapoint_queue.close()
+
+
+if __name__ == "__main__":
+    main()
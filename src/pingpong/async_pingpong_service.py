@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from src.backend.async_backend import AsyncBackend
+from src.backend.data_classes import Hand, Player, Sport
+from src.backend.rating import Ratings
+from src.pingpong.leaderboard import LeaderboardIndex
+from src.pingpong.match_aggregates import MatchAggregates
+from src.pingpong.pingpong_service import (
+    MATCH_LOG_KEY,
+    InvalidMatchRegistration,
+    NoMatchToUndo,
+    PlayerDoesNotExist,
+    _to_name_and_rating,
+    leaderboard_entries,
+    name_key,
+    player_stats,
+    rate_match,
+    render_leaderboard,
+    restore_ratings,
+    update_leaderboard,
+)
+from src.pingpong.single_flight import AsyncSingleFlight
+
+
+class _ReadWriteLock:
+    """
+    asyncio lock that is either held by any number of readers or by one writer. Waiting writers go before new
+    readers, so a steady stream of readers cannot starve them.
+    """
+
+    def __init__(self) -> None:
+        self._changed = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @asynccontextmanager
+    async def reading(self) -> AsyncIterator[None]:
+        async with self._changed:
+            await self._changed.wait_for(lambda: not self._writer and self._waiting_writers == 0)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self._readers -= 1
+                self._changed.notify_all()
+
+    @asynccontextmanager
+    async def writing(self) -> AsyncIterator[None]:
+        async with self._changed:
+            self._waiting_writers += 1
+            try:
+                await self._changed.wait_for(lambda: not self._writer and self._readers == 0)
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self._writer = False
+                self._changed.notify_all()
+
+
+class AsyncPingPongService:
+    """
+    asyncio counterpart of PingPongService. Independent backend reads are issued concurrently, while writes hold the
+    locks of the players they touch, like the dispatcher's write keys. Matches share the match log lock, which undo
+    holds exclusively.
+    Use `AsyncPingPongService.create` to construct it, as the match aggregates and the leaderboard must be loaded from
+    the backend.
+    """
+
+    def __init__(
+        self, backend: AsyncBackend, aggregates: MatchAggregates, leaderboard: LeaderboardIndex, names: dict[str, str]
+    ) -> None:
+        self._backend = backend
+        self._aggregates = aggregates
+        self._leaderboard = leaderboard
+        self._names = names
+        self._reads = AsyncSingleFlight()
+        self._locks: dict[str, _ReadWriteLock] = {}
+
+    @classmethod
+    async def create(cls, backend: AsyncBackend) -> AsyncPingPongService:
+        players, matches_per_sport = await asyncio.gather(
+            backend.list_players(), asyncio.gather(*[backend.list_matches(sport) for sport in Sport])
+        )
+        aggregates = MatchAggregates.from_matches(match for matches in matches_per_sport for match in matches)
+        leaderboard = LeaderboardIndex.from_players(
+            Sport.PING_PONG, players, aggregates.active_players(Sport.PING_PONG)
+        )
+        return cls(backend, aggregates, leaderboard, {p.id: p.name for p in players})
+
+    @asynccontextmanager
+    async def _locked(self, *keys: str, shared: tuple[str, ...] = ()) -> AsyncIterator[None]:
+        """
+        Holds the locks of the given keys exclusively and those of the `shared` keys shared with other readers. They
+        are acquired in sorted order, so writers sharing keys cannot deadlock.
+        """
+        async with AsyncExitStack() as stack:
+            for key in sorted(set(keys) | set(shared)):
+                lock = self._locks.setdefault(key, _ReadWriteLock())
+                await stack.enter_async_context(lock.writing() if key in keys else lock.reading())
+            yield
+
+    async def add_new_player(self, id: str) -> Player:
+        player = Player(id, id, Ratings())
+        created_player = await self._backend.create_player(player)
+        self._names[created_player.id] = created_player.name
+        self._reads.invalidate()
+        return created_player
+
+    async def get_player(self, player_id: str) -> Player:
+        player = await self._backend.get_player(player_id)
+        if player:
+            return player
+        raise PlayerDoesNotExist()
+
+    async def update_display_name(self, player: Player, new_name: str) -> bool:
+        async with self._locked(player.id, name_key(new_name)):
+            if await self._backend.is_name_taken(new_name):
+                return False
+            await self._backend.update_player(player.id, name=new_name)
+            self._names[player.id] = new_name
+            self._reads.invalidate()
+            return True
+
+    async def add_match(
+        self, p1_id: str, p1_hand: Hand, p2_id: str, p2_hand: Hand, score_p1: int, score_p2: int
+    ) -> tuple[Player, int, Player, int]:
+        if p1_id == p2_id or int(score_p1) == int(score_p2):
+            raise InvalidMatchRegistration()
+
+        # The players are read under the locks, so concurrent matches of a player are rated one after the other
+        async with self._locked(p1_id, p2_id, shared=(MATCH_LOG_KEY,)):
+            p1, p2 = await asyncio.gather(self.get_player(p1_id), self.get_player(p2_id))
+
+            match, new_ratings1, new_ratings2 = rate_match(p1, p1_hand, p2, p2_hand, score_p1, score_p2)
+            async with self._backend.transaction() as transaction:
+                match = transaction.create_match(match)
+                new_p1 = transaction.update_player(p1, ratings=new_ratings1)
+                new_p2 = transaction.update_player(p2, ratings=new_ratings2)
+            self._aggregates.add(match)
+            self._names.update({new_p1.id: new_p1.name, new_p2.id: new_p2.name})
+            update_leaderboard(self._leaderboard, self._aggregates, match, new_p1, new_p2)
+            self._reads.invalidate()
+
+        return (
+            new_p1,
+            new_p1.ratings.get(p1_hand, Sport.PING_PONG) - p1.ratings.get(p1_hand, Sport.PING_PONG),
+            new_p2,
+            new_p2.ratings.get(p2_hand, Sport.PING_PONG) - p2.ratings.get(p2_hand, Sport.PING_PONG),
+        )
+
+    async def undo_last_match(self) -> tuple[str, int, str, int]:
+        async with self._locked(MATCH_LOG_KEY):
+            match = await self._backend.get_latest_match(Sport.PING_PONG)
+            if match is None:
+                raise NoMatchToUndo()
+            p1, p2 = await asyncio.gather(self.get_player(match.player1_id), self.get_player(match.player2_id))
+
+            ratings1, ratings2 = restore_ratings(match, p1, p2)
+            async with self._backend.transaction() as transaction:
+                transaction.delete_match(match)
+                new_p1 = transaction.update_player(p1, ratings=ratings1)
+                new_p2 = transaction.update_player(p2, ratings=ratings2)
+            self._aggregates.remove(match)
+            update_leaderboard(self._leaderboard, self._aggregates, match, new_p1, new_p2)
+            self._reads.invalidate()
+        return (*_to_name_and_rating(new_p1, match.player1_hand), *_to_name_and_rating(new_p2, match.player2_hand))
+
+    async def get_leaderboard(self, player_id: Optional[str] = None) -> str:
+        return await self._reads.do(("leaderboard", player_id), lambda: self._render_leaderboard(player_id))
+
+    async def _render_leaderboard(self, player_id: Optional[str]) -> str:
+        entries = leaderboard_entries(self._leaderboard, player_id)
+        return render_leaderboard(entries, await self._get_names({player_id for _, player_id, _, _ in entries}))
+
+    async def _get_names(self, player_ids: set[str]) -> dict[str, str]:
+        missing_players = await asyncio.gather(
+            *[self._backend.get_player(player_id) for player_id in player_ids - self._names.keys()]
+        )
+        self._names.update({player.id: player.name for player in missing_players if player})
+        return self._names
+
+    async def get_rank(self, player_id: str, hand: Hand) -> Optional[int]:
+        return self._leaderboard.rank_of(player_id, hand)
+
+    async def get_total_matches(self) -> int:
+        return await self._reads.do(("total_matches",), self._count_matches)
+
+    async def _count_matches(self) -> int:
+        return self._aggregates.total_matches(Sport.PING_PONG)
+
+    async def get_player_stats(self, name: str) -> tuple[int, int, int, str]:
+        return await self._reads.do(("player_stats", name), lambda: self._get_player_stats(name))
+
+    async def _get_player_stats(self, name: str) -> tuple[int, int, int, str]:
+        player = await self._backend.get_player_by_name(name)
+        if player is None:
+            raise PlayerDoesNotExist()
+        return player_stats(player, self._aggregates)
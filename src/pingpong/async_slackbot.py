@@ -0,0 +1,179 @@
+import asyncio
+from concurrent.futures import Future
+from functools import partial
+from typing import Any, Coroutine, Optional
+
+import structlog
+from slack_sdk.rtm_v2 import RTMClient
+
+from src.backend.data_classes import Player
+from src.backend.metrics import REGISTRY, MetricsRegistry
+from src.pingpong import pingpong_service, responses
+from src.pingpong.async_pingpong_service import AsyncPingPongService
+from src.pingpong.slackbot import (
+    COMMAND_METRIC,
+    IGNORED_EVENT,
+    SLACK_METRIC,
+    BotCommand,
+    CommandRouter,
+    CommandType,
+    MatchCommand,
+    PingPongSlackBot,
+)
+
+log = structlog.getLogger(__name__)
+
+
+class AsyncPingPongSlackBot:
+    """
+    Slack bot driven by an asyncio event loop. The RTM client delivers events on its own thread; each command is
+    scheduled as a coroutine on `loop`, so slow backend round trips never block the handling of other messages.
+    """
+
+    def __init__(
+        self,
+        ping_pong_service: AsyncPingPongService,
+        rtm_client: RTMClient,
+        answer_in_channels: set[str],
+        loop: asyncio.AbstractEventLoop,
+        metrics: MetricsRegistry = REGISTRY,
+        admin_channels: Optional[set[str]] = None,
+    ):
+        self.ping_pong_service = ping_pong_service
+        self.rtm_client = rtm_client
+        self.answer_in_channels = answer_in_channels
+        self.loop = loop
+        self.metrics = metrics
+        # Channels where admin commands such as `metrics` are answered
+        self.admin_channels = admin_channels or set()
+
+        info = self.rtm_client.web_client.rtm_connect()
+        self.ping_pong_bot_id = info["self"]["id"]
+        self.router: CommandRouter[Coroutine[Any, Any, str]] = CommandRouter(
+            self.ping_pong_bot_id, self.answer_in_channels
+        )
+        self.router.register(CommandType.HELP, self._handle_help_command)
+        self.router.register(CommandType.NAME, self._handle_name_command)
+        self.router.register(
+            CommandType.MATCH, lambda bot_command, player: self._handle_match_command(bot_command.command_value)
+        )
+        self.router.register(CommandType.STATS, self._handle_stats_command)
+        self.router.register(CommandType.UNDO, self._handle_undo_command)
+        self.router.register(CommandType.METRICS, self._handle_metrics_command)
+        self.rtm_client.on("message")(lambda client, event: self._handle(client, event))
+
+    def start(self) -> None:
+        log.info("Starting async pingpong bot")
+        self.rtm_client.start()
+
+    def _handle(self, client: RTMClient, event: dict) -> Optional[Future]:
+        if not self.router.accepts(event):
+            log.info(IGNORED_EVENT, channel=event.get("channel"), user=event.get("user"))
+            return None
+        log.info("Received slack event", **PingPongSlackBot._event_info_to_log(event))
+        bot_command = BotCommand.from_slack_event(event)
+        future = asyncio.run_coroutine_threadsafe(self._respond(client, bot_command), self.loop)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            log.error("Failed to respond to command", exc_info=future.exception())
+
+    async def _respond(self, client: RTMClient, bot_command: BotCommand) -> None:
+        try:
+            response = await self._handle_bot_command(bot_command)
+        except Exception:
+            log.exception("Command failed", command=bot_command.metric_label)
+            response = responses.command_failed()
+        post_message = partial(client.web_client.chat_postMessage, channel=bot_command.channel, text=response)
+        with self.metrics.track(SLACK_METRIC, method="chat_postMessage"):
+            await asyncio.get_running_loop().run_in_executor(None, post_message)
+
+    async def _handle_bot_command(self, bot_command: BotCommand) -> str:
+        with self.metrics.track(COMMAND_METRIC, command=bot_command.metric_label):
+            return await self._execute_bot_command(bot_command)
+
+    async def _execute_bot_command(self, bot_command: BotCommand) -> str:
+        """
+        Executes bot command if the command is known
+        """
+        try:
+            player = await self.ping_pong_service.get_player(bot_command.sender_id)
+        except pingpong_service.PlayerDoesNotExist:
+            await self.ping_pong_service.add_new_player(bot_command.sender_id)
+            return responses.new_player()
+
+        handler = self.router.handler_for(bot_command.command_type)
+        if handler is None:
+            return responses.unknown_command()
+        return await handler(bot_command, player)
+
+    async def _handle_help_command(self, bot_command: BotCommand, player: Player) -> str:
+        return responses.help()
+
+    async def _handle_metrics_command(self, bot_command: BotCommand, player: Player) -> str:
+        if bot_command.channel not in self.admin_channels:
+            return responses.unknown_command()
+        return responses.metrics(self.metrics.summary())
+
+    async def _handle_name_command(self, bot_command: BotCommand, player: Player) -> str:
+        if not bot_command.command_value:
+            return responses.name(player.name)
+        new_name = bot_command.command_value.lower()
+        if await self.ping_pong_service.update_display_name(player, new_name):
+            return responses.name_updated(new_name)
+        return responses.name_taken()
+
+    async def _handle_stats_command(self, bot_command: BotCommand, player: Player) -> str:
+        name = bot_command.command_value
+        if not name:
+            total_matches, leaderboard = await asyncio.gather(
+                self.ping_pong_service.get_total_matches(),
+                self.ping_pong_service.get_leaderboard(bot_command.sender_id),
+            )
+            return responses.stats(total_matches, leaderboard)
+        try:
+            rating, wins, losses, ratio = await self.ping_pong_service.get_player_stats(name)
+            return responses.player_stats(name, rating, ratio, wins, losses)
+        except pingpong_service.PlayerDoesNotExist:
+            return responses.player_does_not_exist()
+
+    async def _handle_undo_command(self, bot_command: BotCommand, player: Player) -> str:
+        try:
+            return responses.match_undone(*await self.ping_pong_service.undo_last_match())
+        except pingpong_service.NoMatchToUndo:
+            return responses.no_match_to_undo()
+        except pingpong_service.PlayerDoesNotExist:
+            return responses.player_does_not_exist()
+
+    async def _handle_match_command(self, match_string: Optional[str]) -> str:
+        match_command = MatchCommand.parse(match_string)
+        if match_command is None:
+            return responses.invalid_match_command()
+        try:
+            p1_old_rank, p2_old_rank = await asyncio.gather(
+                self.ping_pong_service.get_rank(match_command.player1_id, match_command.player1_hand),
+                self.ping_pong_service.get_rank(match_command.player2_id, match_command.player2_hand),
+            )
+            p1, p1_rating_diff, p2, p2_rating_diff = await self.ping_pong_service.add_match(
+                match_command.player1_id,
+                match_command.player1_hand,
+                match_command.player2_id,
+                match_command.player2_hand,
+                match_command.score1,
+                match_command.score2,
+            )
+            p1_new_rank, p2_new_rank = await asyncio.gather(
+                self.ping_pong_service.get_rank(match_command.player1_id, match_command.player1_hand),
+                self.ping_pong_service.get_rank(match_command.player2_id, match_command.player2_hand),
+            )
+            response = match_command.match_added_response(p1, p1_rating_diff, p2, p2_rating_diff)
+            return response + match_command.rank_changes_response(
+                p1, p1_old_rank, p1_new_rank, p2, p2_old_rank, p2_new_rank
+            )
+        except pingpong_service.PlayerDoesNotExist:
+            return responses.player_does_not_exist()
+        except pingpong_service.InvalidMatchRegistration:
+            return responses.invalid_match_registration()
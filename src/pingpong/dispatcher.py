@@ -0,0 +1,116 @@
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+import structlog
+
+log = structlog.getLogger(__name__)
+
+
+@dataclass
+class DispatcherMetrics:
+    queue_depth: int
+    max_queue_depth: int
+    in_flight: int
+    completed: int
+    rejected: int
+
+
+@dataclass
+class _Command:
+    run: Callable[[], object]
+    write_keys: frozenset[str]
+    read_keys: frozenset[str]
+
+
+class CommandDispatcher:
+    """
+    Runs commands on a bounded worker pool. Commands that write to a player are serialized per player id by passing
+    the ids as `write_keys`, while commands without keys run fully in parallel. Commands may share `read_keys` with
+    each other, but not with a command holding the same key as a write key. A command waits outside the pool until
+    its keys are free of conflicting running commands and earlier waiting ones, so blocked writers never take workers
+    away from other commands. At most `max_pending` commands may be queued or running at once; further commands are
+    rejected.
+    """
+
+    def __init__(self, max_workers: int = 8, max_pending: int = 100) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pingpong-command")
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # Keys of the commands handed to the pool, and the commands waiting for their keys in arrival order
+        self._held_keys: set[str] = set()
+        self._held_read_keys: Counter[str] = Counter()
+        self._waiting: deque[_Command] = deque()
+
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def submit(
+        self, command: Callable[[], object], write_keys: Iterable[str] = (), read_keys: Iterable[str] = ()
+    ) -> bool:
+        """
+        Schedules the command and returns True, or returns False if the dispatcher is at capacity.
+        """
+        with self._lock:
+            if self._queue_depth + self._in_flight >= self._max_pending:
+                self._rejected += 1
+                return False
+            self._queue_depth += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+            self._waiting.append(_Command(command, frozenset(write_keys), frozenset(read_keys)))
+            self._start_ready_commands()
+        return True
+
+    def _start_ready_commands(self) -> None:
+        """
+        Hands every waiting command whose keys are free to the pool. A command never overtakes an earlier waiting one
+        it conflicts with, so conflicting commands run in arrival order. Must hold the lock.
+        """
+        blocked_keys = set(self._held_keys)
+        blocked_read_keys = set(self._held_read_keys)
+        for command in list(self._waiting):
+            writes_free = command.write_keys.isdisjoint(blocked_keys | blocked_read_keys)
+            if writes_free and command.read_keys.isdisjoint(blocked_keys):
+                self._waiting.remove(command)
+                self._held_keys.update(command.write_keys)
+                self._held_read_keys.update(command.read_keys)
+                self._executor.submit(self._run, command)
+            blocked_keys.update(command.write_keys)
+            blocked_read_keys.update(command.read_keys)
+
+    def _run(self, command: _Command) -> None:
+        with self._lock:
+            self._queue_depth -= 1
+            self._in_flight += 1
+        try:
+            command.run()
+        except Exception:
+            log.exception("Command failed")
+        finally:
+            with self._lock:
+                self._held_keys.difference_update(command.write_keys)
+                self._held_read_keys -= Counter(command.read_keys)
+                self._in_flight -= 1
+                self._completed += 1
+                self._start_ready_commands()
+                if self._queue_depth + self._in_flight == 0:
+                    self._idle.notify_all()
+
+    def metrics(self) -> DispatcherMetrics:
+        with self._lock:
+            return DispatcherMetrics(
+                self._queue_depth, self._max_queue_depth, self._in_flight, self._completed, self._rejected
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        if wait:
+            # Waiting commands are only handed to the pool as earlier ones finish, so wait for those first
+            with self._lock:
+                self._idle.wait_for(lambda: self._queue_depth + self._in_flight == 0)
+        self._executor.shutdown(wait=wait)
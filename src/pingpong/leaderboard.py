@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, insort
+from typing import Iterable, Optional
+
+from src.backend.data_classes import Hand, Player, Sport
+
+# Sorting key of an entry: highest rating first, ties broken by player id and hand so the order is stable
+EntryKey = tuple[int, str, str]
+
+
+class LeaderboardIndex:
+    """
+    The (player id, hand) pairs of one sport ordered by rating. Entries are kept in a sorted list and located by
+    bisection, so a rating change only moves one entry instead of re-sorting the whole leaderboard.
+    """
+
+    def __init__(self, sport: Sport) -> None:
+        self.sport = sport
+        self._lock = threading.Lock()
+        self._keys: list[EntryKey] = []
+        self._ratings: dict[tuple[str, Hand], int] = {}
+
+    @classmethod
+    def from_players(
+        cls, sport: Sport, players: Iterable[Player], active_players: Iterable[tuple[str, Hand]]
+    ) -> LeaderboardIndex:
+        id_to_player = {p.id: p for p in players}
+        leaderboard = cls(sport)
+        for player_id, hand in active_players:
+            leaderboard.update(player_id, hand, id_to_player[player_id].ratings.get(hand, sport))
+        return leaderboard
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def _key(player_id: str, hand: Hand, rating: int) -> EntryKey:
+        return -rating, player_id, hand.value
+
+    def update(self, player_id: str, hand: Hand, rating: int) -> None:
+        with self._lock:
+            self._remove(player_id, hand)
+            self._ratings[(player_id, hand)] = rating
+            insort(self._keys, self._key(player_id, hand, rating))
+
+    def remove(self, player_id: str, hand: Hand) -> None:
+        with self._lock:
+            self._remove(player_id, hand)
+
+    def _remove(self, player_id: str, hand: Hand) -> None:
+        rating = self._ratings.pop((player_id, hand), None)
+        if rating is not None:
+            del self._keys[bisect_left(self._keys, self._key(player_id, hand, rating))]
+
+    def rank_of(self, player_id: str, hand: Hand) -> Optional[int]:
+        """
+        Returns the 1-based position of the entry, or None if the player has not played with that hand.
+        """
+        with self._lock:
+            rating = self._ratings.get((player_id, hand))
+            if rating is None:
+                return None
+            return bisect_left(self._keys, self._key(player_id, hand, rating)) + 1
+
+    def top(self, k: int) -> list[tuple[str, Hand, int]]:
+        return self.page(0, k)
+
+    def page(self, offset: int, n: int) -> list[tuple[str, Hand, int]]:
+        """
+        Returns n (player id, hand, rating) entries starting at the 0-based position offset.
+        """
+        with self._lock:
+            return [(player_id, Hand(hand), -rating) for rating, player_id, hand in self._keys[offset : offset + n]]
@@ -0,0 +1,119 @@
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, MutableMapping, Optional, TextIO
+
+import structlog
+
+DEFAULT_MAX_QUEUE_SIZE = 10_000
+
+
+class SamplingProcessor:
+    """
+    Structlog processor keeping only a fraction of the events whose name has a sampling rate, e.g. `{"Ignored slack
+    event": 0.01}` keeps one in a hundred. Events without a rate are always kept.
+    """
+
+    def __init__(self, rates: dict[str, float], random: Callable[[], float] = random.random) -> None:
+        self._rates = rates
+        self._random = random
+
+    def __call__(self, logger: Any, method_name: str, event_dict: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
+        rate = self._rates.get(event_dict.get("event", ""))
+        if rate is not None and self._random() >= rate:
+            raise structlog.DropEvent
+        return event_dict
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves all formatting to the listener thread and drops records instead of blocking or
+    raising when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def __init__(self, log_queue: queue.Queue, handler: logging.Handler) -> None:
+        super().__init__(log_queue, handler, respect_handler_level=True)
+        self._log_queue = log_queue
+
+    def enqueue_sentinel(self) -> None:
+        # Waits for room instead of failing when the queue is full at shutdown; None is the listener's stop sentinel
+        self._log_queue.put(None)
+
+
+class LogPipeline:
+    """
+    Routes structlog and stdlib logging through a bounded queue. The logging thread only samples, timestamps and
+    enqueues the event; rendering and writing to `stream` happen on a background listener thread, so a slow stream
+    never blocks the caller. When the queue is full, records are dropped and counted in `dropped`.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO = sys.stdout,
+        level: str = "INFO",
+        sample_rates: Optional[dict[str, float]] = None,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+    ) -> None:
+        self.level = level
+        self.sample_rates = sample_rates or {}
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._queue_handler = _DeferredQueueHandler(self._queue)
+
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(
+            structlog.stdlib.ProcessorFormatter(
+                processor=structlog.processors.JSONRenderer(),
+                foreign_pre_chain=[structlog.stdlib.add_log_level, structlog.processors.TimeStamper(fmt="iso")],
+            )
+        )
+        self._listener = _Listener(self._queue, stream_handler)
+
+    @property
+    def dropped(self) -> int:
+        return self._queue_handler.dropped
+
+    def start(self) -> None:
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self._queue_handler)
+        root.setLevel(self.level)
+        structlog.configure(
+            processors=[
+                structlog.stdlib.filter_by_level,
+                SamplingProcessor(self.sample_rates),
+                structlog.stdlib.add_logger_name,
+                structlog.stdlib.add_log_level,
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.processors.format_exc_info,
+                structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+            ],
+            logger_factory=structlog.stdlib.LoggerFactory(),
+            wrapper_class=structlog.stdlib.BoundLogger,
+            cache_logger_on_first_use=True,
+        )
+        self._listener.start()
+
+    def stop(self) -> None:
+        """
+        Writes out the queued records and detaches the pipeline from the root logger.
+        """
+        logging.getLogger().removeHandler(self._queue_handler)
+        self._listener.stop()
@@ -1,20 +1,47 @@
-import logging
+import asyncio
 import os
+import signal
+import sys
+import threading
+import time
+from functools import partial
+from typing import Optional
 
+import structlog
 from cognite.client import CogniteClient
 from slack_sdk.rtm_v2 import RTMClient
 
+from src.backend.async_backend_cdf import AsyncBackendCdf
+from src.backend.backend import Backend
+from src.backend.backend_caching import CachingBackend
 from src.backend.backend_cdf import BackendCdf
+from src.backend.backend_deferred import DeferredBackend
+from src.backend.backend_instrumented import InstrumentedBackend
+from src.backend.backend_journaled import JournaledBackend
+from src.backend.backend_sqlite import BackendSqlite
+from src.backend.datapoint_queue import DatapointQueue
+from src.pingpong.async_pingpong_service import AsyncPingPongService
+from src.pingpong.async_slackbot import AsyncPingPongSlackBot
+from src.pingpong.dispatcher import CommandDispatcher
+from src.pingpong.log_pipeline import LogPipeline
+from src.pingpong.metrics_server import DEFAULT_METRICS_PORT, MetricsServer
 from src.pingpong.pingpong_service import PingPongService
-from src.pingpong.slackbot import PingPongSlackBot
-
-logging.basicConfig(level="INFO")
+from src.pingpong.slackbot import IGNORED_EVENT, PingPongSlackBot
 
 ROOT_ASSET_EXTERNAL_ID = "Cogniters"
 PINGPONG_CHANNEL_ID = "C8MAMM6AC"
 ADMIN_CHANNEL_ID = "C02H9J7BP97"
 ERLEND_ADMIN_CHANNEL_ID = "D8J3CN9DX"
+ADMIN_CHANNELS = {ADMIN_CHANNEL_ID, ERLEND_ADMIN_CHANNEL_ID}
 SLACK_BOT_TOKEN = os.environ["SLACK_BOT_TOKEN"]
+CACHE_TTL_SECONDS = 600
+COMMAND_WORKERS = 8
+MAX_PENDING_COMMANDS = 100
+DEFAULT_SQLITE_PATH = "pingpong.db"
+IGNORED_EVENT_LOG_SAMPLE_RATE = 0.01
+STARTED_AT = time.monotonic()
+
+log = structlog.getLogger(__name__)
 
 
 def answer_channels() -> set[str]:
@@ -24,14 +51,125 @@ def answer_channels() -> set[str]:
     return {PINGPONG_CHANNEL_ID, ADMIN_CHANNEL_ID, ERLEND_ADMIN_CHANNEL_ID}
 
 
+def create_datapoint_queue() -> Optional[DatapointQueue]:
+    """
+    Rating datapoints of the CDF backend are written behind through a queue journaled in DATAPOINT_QUEUE_DIR, which
+    must be on persistent storage so queued datapoints survive a restart. Without it they are written on the command
+    path instead.
+    """
+    directory = os.getenv("DATAPOINT_QUEUE_DIR")
+    if os.getenv("BACKEND", "cdf") != "cdf" or not directory:
+        return None
+    return DatapointQueue(directory)
+
+
+def create_backend(datapoint_queue: Optional[DatapointQueue] = None) -> Backend:
+    """
+    Selects the backend with the BACKEND environment variable: "cdf" (default) or "sqlite", which stores everything in
+    the file given by SQLITE_PATH. If JOURNAL_DIR is set, the CDF backend is fronted by a local journal in that
+    directory instead of an in-memory cache. A restart then answers from the local snapshot while the connection to
+    CDF is set up in the background, and reconciles with CDF once it is.
+    """
+    backend_type = os.getenv("BACKEND", "cdf")
+    if backend_type == "sqlite":
+        return BackendSqlite(os.getenv("SQLITE_PATH", DEFAULT_SQLITE_PATH))
+    elif backend_type == "cdf":
+        cognite_client = CogniteClient()
+        if datapoint_queue is not None:
+            # Started once here rather than by each attempt to create the backend, which may be retried
+            datapoint_queue.start(cognite_client.datapoints.insert_multiple, cognite_client.datapoints.delete_ranges)
+        journal_dir = os.getenv("JOURNAL_DIR")
+        if journal_dir:
+            factory = partial(create_cdf_backend, cognite_client, datapoint_queue)
+            return JournaledBackend(DeferredBackend(factory), journal_dir)
+        return CachingBackend(create_cdf_backend(cognite_client, datapoint_queue), ttl=CACHE_TTL_SECONDS)
+    raise ValueError(f"Unknown backend {backend_type!r}")
+
+
+def create_cdf_backend(cognite_client: CogniteClient, datapoint_queue: Optional[DatapointQueue] = None) -> BackendCdf:
+    cdf_backend = BackendCdf(
+        root_asset_external_id=ROOT_ASSET_EXTERNAL_ID, cognite_client=cognite_client, datapoint_queue=datapoint_queue
+    )
+    cdf_backend.prefetch_time_series_ids()
+    return cdf_backend
+
+
+def reconcile_in_background(backend: JournaledBackend, service: PingPongService) -> None:
+    """
+    Brings a backend recovered from its local snapshot in line with CDF without delaying startup.
+    """
+
+    def reconcile() -> None:
+        start = time.monotonic()
+        try:
+            changed = backend.reconcile()
+        except Exception:
+            log.exception("Failed to reconcile with CDF, answering from the local snapshot")
+            return
+        if changed:
+            service.reload()
+        log.info("Reconciled with CDF", changed=changed, seconds=round(time.monotonic() - start, 3))
+
+    threading.Thread(target=reconcile, name="reconcile", daemon=True).start()
+
+
+def start_metrics_server() -> None:
+    """
+    Serves Prometheus metrics on localhost, on the port given by METRICS_PORT.
+    """
+    MetricsServer(port=int(os.getenv("METRICS_PORT", DEFAULT_METRICS_PORT))).start()
+
+
 def main() -> None:
-    cdf_backend = BackendCdf(root_asset_external_id=ROOT_ASSET_EXTERNAL_ID, cognite_client=CogniteClient())
-    ping_pong_service = PingPongService(backend=cdf_backend)
+    start_metrics_server()
+    datapoint_queue = create_datapoint_queue()
+    backend = create_backend(datapoint_queue)
+    ping_pong_service = PingPongService(backend=InstrumentedBackend(backend))
+    if isinstance(backend, JournaledBackend) and backend.recovered:
+        reconcile_in_background(backend, ping_pong_service)
+    rtm = RTMClient(token=SLACK_BOT_TOKEN)
+    dispatcher = CommandDispatcher(max_workers=COMMAND_WORKERS, max_pending=MAX_PENDING_COMMANDS)
+    slackbot = PingPongSlackBot(
+        ping_pong_service,
+        rtm,
+        answer_in_channels=answer_channels(),
+        dispatcher=dispatcher,
+        started_at=STARTED_AT,
+        admin_channels=ADMIN_CHANNELS,
+    )
+
+    try:
+        slackbot.start()
+    finally:
+        if datapoint_queue is not None:
+            datapoint_queue.close()
+
+
+def main_async() -> None:
+    start_metrics_server()
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    backend = AsyncBackendCdf(root_asset_external_id=ROOT_ASSET_EXTERNAL_ID, cognite_client=CogniteClient())
+    backend.backend_cdf.prefetch_time_series_ids()
+    ping_pong_service = asyncio.run_coroutine_threadsafe(AsyncPingPongService.create(backend), loop).result()
     rtm = RTMClient(token=SLACK_BOT_TOKEN)
-    slackbot = PingPongSlackBot(ping_pong_service, rtm, answer_in_channels=answer_channels())
+    slackbot = AsyncPingPongSlackBot(
+        ping_pong_service, rtm, answer_in_channels=answer_channels(), loop=loop, admin_channels=ADMIN_CHANNELS
+    )
 
     slackbot.start()
 
 
 if __name__ == "__main__":
-    main()
+    log_pipeline = LogPipeline(sample_rates={IGNORED_EVENT: IGNORED_EVENT_LOG_SAMPLE_RATE})
+    log_pipeline.start()
+    # Exits through SystemExit on SIGTERM, so queued writes are drained before shutdown
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if os.getenv("ASYNC_BOT"):
+            main_async()
+        else:
+            main()
+    finally:
+        # Stopped last, so the shutdown logs of the bot and the datapoint queue are written out
+        log_pipeline.stop()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Iterable, Optional
+
+from src.backend.data_classes import Hand, Match, Sport
+
+
+class MatchAggregates:
+    """
+    Materialized statistics over the match history, kept up to date by feeding it every registered match.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._total_matches: Counter[Sport] = Counter()
+        self._wins: Counter[tuple[str, Hand, Sport]] = Counter()
+        self._losses: Counter[tuple[str, Hand, Sport]] = Counter()
+        # dicts are used as insertion ordered sets
+        self._active_players: dict[Sport, dict[tuple[str, Hand], None]] = {sport: {} for sport in Sport}
+
+    @classmethod
+    def from_matches(cls, matches: Iterable[Match]) -> MatchAggregates:
+        aggregates = cls()
+        for match in matches:
+            aggregates.add(match)
+        return aggregates
+
+    def add(self, match: Match) -> None:
+        player1_win = match.player1_score > match.player2_score
+        player1_key = (match.player1_id, match.player1_hand, match.sport)
+        player2_key = (match.player2_id, match.player2_hand, match.sport)
+        with self._lock:
+            self._total_matches[match.sport] += 1
+            self._wins[player1_key if player1_win else player2_key] += 1
+            self._losses[player2_key if player1_win else player1_key] += 1
+            self._active_players[match.sport][(match.player1_id, match.player1_hand)] = None
+            self._active_players[match.sport][(match.player2_id, match.player2_hand)] = None
+
+    def remove(self, match: Match) -> None:
+        """
+        Reverts `add` for a match that has been deleted.
+        """
+        player1_win = match.player1_score > match.player2_score
+        player1_key = (match.player1_id, match.player1_hand, match.sport)
+        player2_key = (match.player2_id, match.player2_hand, match.sport)
+        with self._lock:
+            self._total_matches[match.sport] -= 1
+            self._wins[player1_key if player1_win else player2_key] -= 1
+            self._losses[player2_key if player1_win else player1_key] -= 1
+            for player_id, hand, sport in (player1_key, player2_key):
+                if self._wins[(player_id, hand, sport)] + self._losses[(player_id, hand, sport)] <= 0:
+                    self._active_players[sport].pop((player_id, hand), None)
+
+    def total_matches(self, sport: Sport) -> int:
+        return self._total_matches[sport]
+
+    def wins(self, player_id: str, sport: Sport, hand: Optional[Hand] = None) -> int:
+        hands = [hand] if hand else list(Hand)
+        return sum(self._wins[(player_id, h, sport)] for h in hands)
+
+    def losses(self, player_id: str, sport: Sport, hand: Optional[Hand] = None) -> int:
+        hands = [hand] if hand else list(Hand)
+        return sum(self._losses[(player_id, h, sport)] for h in hands)
+
+    def active_players(self, sport: Sport) -> list[tuple[str, Hand]]:
+        """
+        Returns every (player id, hand) pair that has played at least one match in the given sport.
+        """
+        with self._lock:
+            return list(self._active_players[sport])
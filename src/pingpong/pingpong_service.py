@@ -1,8 +1,24 @@
+import threading
 from typing import Optional
 
 from src.backend.backend import Backend
 from src.backend.data_classes import Hand, Match, Player, Sport
 from src.backend.rating import RatingCalculator, Ratings
+from src.backend.replay import replay_backend
+from src.pingpong.leaderboard import LeaderboardIndex
+from src.pingpong.match_aggregates import MatchAggregates
+from src.pingpong.single_flight import SingleFlight
+
+LEADERBOARD_SIZE = 20
+# Key of the match log, shared by commands appending matches and held alone by commands removing or rewriting them
+MATCH_LOG_KEY = "match-log"
+
+
+def name_key(name: str) -> str:
+    """
+    Write key of a display name, so two players cannot both check that a name is free and then both take it.
+    """
+    return f"name:{name.lower()}"
 
 
 class PlayerDoesNotExist(Exception):
@@ -13,13 +29,147 @@ class InvalidMatchRegistration(Exception):
     pass
 
 
+class NoMatchToUndo(Exception):
+    pass
+
+
+def rate_match(
+    p1: Player, p1_hand: Hand, p2: Player, p2_hand: Hand, score_p1: int, score_p2: int
+) -> tuple[Match, Ratings, Ratings]:
+    """
+    Returns the match to register together with the new ratings of both players.
+    """
+    match = Match(
+        p1.id,
+        p2.id,
+        score_p1,
+        score_p2,
+        p1.ratings.get(p1_hand, Sport.PING_PONG),
+        p2.ratings.get(p2_hand, Sport.PING_PONG),
+        sport=Sport.PING_PONG,
+        player1_hand=p1_hand,
+        player2_hand=p2_hand,
+    )
+    new_rating1, new_rating2 = RatingCalculator.calculate_new_elo_ratings(
+        rating1=p1.ratings.get(p1_hand, Sport.PING_PONG),
+        rating2=p2.ratings.get(p2_hand, Sport.PING_PONG),
+        player1_win=int(match.player1_score) > int(match.player2_score),
+    )
+    return (
+        match,
+        p1.ratings.update(p1_hand, Sport.PING_PONG, new_rating1),
+        p2.ratings.update(p2_hand, Sport.PING_PONG, new_rating2),
+    )
+
+
+def restore_ratings(match: Match, p1: Player, p2: Player) -> tuple[Ratings, Ratings]:
+    """
+    Returns the ratings both players had before the match, which are stored on the match itself.
+    """
+    return (
+        p1.ratings.update(match.player1_hand, match.sport, match.player1_rating),
+        p2.ratings.update(match.player2_hand, match.sport, match.player2_rating),
+    )
+
+
+def leaderboard_entries(
+    leaderboard: LeaderboardIndex, player_id: Optional[str] = None, size: int = LEADERBOARD_SIZE
+) -> list[tuple[int, str, Hand, int]]:
+    """
+    Returns (rank, player id, hand, rating) for the top `size` entries of the leaderboard, followed by the entries of
+    the given player if they are further down.
+    """
+    entries = [(i + 1, *entry) for i, entry in enumerate(leaderboard.top(size))]
+    if player_id:
+        ranks = sorted(rank for hand in Hand if (rank := leaderboard.rank_of(player_id, hand)) and rank > size)
+        entries.extend((rank, *leaderboard.page(rank - 1, 1)[0]) for rank in ranks)
+    return entries
+
+
+def render_leaderboard(entries: list[tuple[int, str, Hand, int]], names: dict[str, str]) -> str:
+    lines = []
+    previous_rank = 0
+    for rank, player_id, hand, rating in entries:
+        if rank > previous_rank + 1:
+            lines.append("...")
+        lines.append(f"{str(rank)+'.':4}{_display_name(names.get(player_id, player_id), hand)} ({rating})")
+        previous_rank = rank
+    return "\n".join(lines)
+
+
+def _display_name(name: str, hand: Hand) -> str:
+    return name + "(nd)" if hand == Hand.NON_DOMINANT else name
+
+
+def _to_name_and_rating(player: Player, hand: Hand) -> tuple[str, int]:
+    return _display_name(player.name, hand), player.ratings.get(hand, Sport.PING_PONG)
+
+
+def update_leaderboard(
+    leaderboard: LeaderboardIndex, aggregates: MatchAggregates, match: Match, *players: Player
+) -> None:
+    """
+    Moves the two players of a match that was just added or removed to their new positions on the leaderboard.
+    """
+    for player, hand in zip(players, (match.player1_hand, match.player2_hand)):
+        if aggregates.wins(player.id, match.sport, hand) + aggregates.losses(player.id, match.sport, hand) > 0:
+            leaderboard.update(player.id, hand, player.ratings.get(hand, match.sport))
+        else:
+            leaderboard.remove(player.id, hand)
+
+
+def player_stats(player: Player, aggregates: MatchAggregates) -> tuple[int, int, int, str]:
+    wins = aggregates.wins(player.id, Sport.PING_PONG)
+    losses = aggregates.losses(player.id, Sport.PING_PONG)
+    wl_ratio = "{:.2f}".format(wins / losses) if losses > 0 else "∞"
+    return player.ratings.get(Hand.DOMINANT, Sport.PING_PONG), wins, losses, wl_ratio
+
+
 class PingPongService:
     def __init__(self, backend: Backend) -> None:
         self._backend = backend
+        # Held by writers while they update the backend and the indexes below, so `reload` never sees half a write
+        self._write_lock = threading.Lock()
+        self._load()
+        # Results of the read commands, shared by concurrent callers and reused until the next write
+        self._reads = SingleFlight()
+
+    def _load(self) -> None:
+        self._aggregates = MatchAggregates.from_matches(
+            match for sport in Sport for match in self._backend.list_matches(sport)
+        )
+        players = self._backend.list_players()
+        self._names = {p.id: p.name for p in players}
+        self._leaderboard = LeaderboardIndex.from_players(
+            Sport.PING_PONG, players, self._aggregates.active_players(Sport.PING_PONG)
+        )
+
+    def reload(self) -> None:
+        """
+        Rebuilds the match aggregates, names and leaderboard from the backend, for when its contents were replaced.
+        """
+        with self._write_lock:
+            self._load()
+            self._reads.invalidate()
+
+    def replay_ratings(self) -> int:
+        """
+        Recomputes all ratings from the match history, e.g. after the rating formula changed, and returns the number
+        of matches replayed.
+        """
+        with self._write_lock:
+            result = replay_backend(self._backend)
+            self._load()
+            self._reads.invalidate()
+        return len(result.player1_ratings)
 
     def add_new_player(self, id: str) -> Player:
         player = Player(id, id, Ratings())
-        return self._backend.create_player(player)
+        with self._write_lock:
+            created_player = self._backend.create_player(player)
+            self._names[created_player.id] = created_player.name
+            self._reads.invalidate()
+        return created_player
 
     def get_player(self, player_id: str) -> Player:
         player = self._backend.get_player(player_id)
@@ -28,11 +178,12 @@ class PingPongService:
         raise PlayerDoesNotExist()
 
     def update_display_name(self, player: Player, new_name: str) -> bool:
-        players = self._backend.list_players()
-        names = [p.name.lower() for p in players]
-        if new_name.lower() in names:
+        if self._backend.is_name_taken(new_name):
             return False
-        self._backend.update_player(player.id, name=new_name)
+        with self._write_lock:
+            self._backend.update_player(player.id, name=new_name)
+            self._names[player.id] = new_name
+            self._reads.invalidate()
         return True
 
     def add_match(
@@ -44,26 +195,16 @@ class PingPongService:
         p1 = self.get_player(p1_id)
         p2 = self.get_player(p2_id)
 
-        match = Match(
-            p1_id,
-            p2_id,
-            score_p1,
-            score_p2,
-            p1.ratings.get(p1_hand, Sport.PING_PONG),
-            p2.ratings.get(p2_hand, Sport.PING_PONG),
-            sport=Sport.PING_PONG,
-            player1_hand=p1_hand,
-            player2_hand=p2_hand,
-        )
-        self._backend.create_match(match)
-
-        new_rating1, new_rating2 = RatingCalculator.calculate_new_elo_ratings(
-            rating1=p1.ratings.get(p1_hand, Sport.PING_PONG),
-            rating2=p2.ratings.get(p2_hand, Sport.PING_PONG),
-            player1_win=int(match.player1_score) > int(match.player2_score),
-        )
-        new_p1 = self._backend.update_player(p1.id, ratings=p1.ratings.update(p1_hand, Sport.PING_PONG, new_rating1))
-        new_p2 = self._backend.update_player(p2.id, ratings=p2.ratings.update(p2_hand, Sport.PING_PONG, new_rating2))
+        match, new_ratings1, new_ratings2 = rate_match(p1, p1_hand, p2, p2_hand, score_p1, score_p2)
+        with self._write_lock:
+            with self._backend.transaction() as transaction:
+                match = transaction.create_match(match)
+                new_p1 = transaction.update_player(p1, ratings=new_ratings1)
+                new_p2 = transaction.update_player(p2, ratings=new_ratings2)
+            self._aggregates.add(match)
+            self._names.update({new_p1.id: new_p1.name, new_p2.id: new_p2.name})
+            update_leaderboard(self._leaderboard, self._aggregates, match, new_p1, new_p2)
+            self._reads.invalidate()
 
         updated_players = (
             new_p1,
@@ -73,74 +214,49 @@ class PingPongService:
         )
         return updated_players
 
-    def undo_last_match(self) -> tuple[Optional[str], Optional[int], Optional[str], Optional[int]]:
-        ...
-        # matches = self._backend.list_matches(sport=Sport.PING_PONG)
-        #
-        # if not matches or True:  # Todo: fix undo
-        #     return None, None, None, None
-        #
-        # latest_match = matches[0]
-        #
-        # if latest_match.player1_score > latest_match.player2_score:
-        #     winner = self.get_player(player_id=latest_match.player1_id)
-        #     winner_prev_rating = latest_match.player1_rating
-        #     loser = self.get_player(player_id=latest_match.player2_id)
-        #     loser_prev_rating = latest_match.player2_rating
-        # else:
-        #     winner = self.get_player(player_id=latest_match.player2_id)
-        #     winner_prev_rating = latest_match.player2_rating
-        #     loser = self.get_player(player_id=latest_match.player1_id)
-        #     loser_prev_rating = latest_match.player1_rating
-        #
-        # # CDF_BACKEND.delete_matches(ids=[latest_match.id])
-        # self._backend.update_player(winner.id, sport=Sport.PING_PONG, new_rating=winner_prev_rating)
-        # self._backend.update_player(loser.id, sport=Sport.PING_PONG, new_rating=loser_prev_rating)
-        # return winner.name, winner_prev_rating, loser.name, loser_prev_rating
-
-    def get_leaderboard(self) -> str:
-        id_to_player = {p.id: p for p in self._backend.list_players()}
-        names_and_ratings: set[tuple[str, int]] = set()
-        for match in self._backend.list_matches(sport=Sport.PING_PONG):
-            names_and_ratings.add(self.__to_name_and_rating(id_to_player[match.player1_id], match.player1_hand))
-            names_and_ratings.add(self.__to_name_and_rating(id_to_player[match.player2_id], match.player2_hand))
-
-        sorted_names_and_ratings = sorted(list(names_and_ratings), key=lambda p: p[1], reverse=True)
-        printable_leaderboard = "\n".join(
-            [f"{str(i+1)+'.':4}{name} ({rating})" for i, (name, rating) in enumerate(sorted_names_and_ratings)]
-        )
-        return printable_leaderboard
+    def undo_last_match(self) -> tuple[str, int, str, int]:
+        match = self._backend.get_latest_match(Sport.PING_PONG)
+        if match is None:
+            raise NoMatchToUndo()
+        p1 = self.get_player(match.player1_id)
+        p2 = self.get_player(match.player2_id)
+
+        ratings1, ratings2 = restore_ratings(match, p1, p2)
+        with self._write_lock:
+            with self._backend.transaction() as transaction:
+                transaction.delete_match(match)
+                new_p1 = transaction.update_player(p1, ratings=ratings1)
+                new_p2 = transaction.update_player(p2, ratings=ratings2)
+            self._aggregates.remove(match)
+            update_leaderboard(self._leaderboard, self._aggregates, match, new_p1, new_p2)
+            self._reads.invalidate()
+        return (*_to_name_and_rating(new_p1, match.player1_hand), *_to_name_and_rating(new_p2, match.player2_hand))
+
+    def get_leaderboard(self, player_id: Optional[str] = None) -> str:
+        return self._reads.do(("leaderboard", player_id), lambda: self._render_leaderboard(player_id))
 
-    @staticmethod
-    def __to_name_and_rating(player: Player, hand: Hand) -> tuple[str, int]:
-        name = player.name
-        if hand == Hand.NON_DOMINANT:
-            name += "(nd)"
-        return (name, player.ratings.get(hand, Sport.PING_PONG))
+    def _render_leaderboard(self, player_id: Optional[str]) -> str:
+        entries = leaderboard_entries(self._leaderboard, player_id)
+        return render_leaderboard(entries, self._get_names({player_id for _, player_id, _, _ in entries}))
+
+    def _get_names(self, player_ids: set[str]) -> dict[str, str]:
+        for player_id in player_ids - self._names.keys():
+            player = self._backend.get_player(player_id)
+            if player:
+                self._names[player_id] = player.name
+        return self._names
+
+    def get_rank(self, player_id: str, hand: Hand) -> Optional[int]:
+        return self._leaderboard.rank_of(player_id, hand)
 
     def get_total_matches(self) -> int:
-        matches = self._backend.list_matches(sport=Sport.PING_PONG)
-        return len(matches)
+        return self._reads.do(("total_matches",), lambda: self._aggregates.total_matches(Sport.PING_PONG))
 
     def get_player_stats(self, name: str) -> tuple[int, int, int, str]:
-        players = self._backend.list_players()
-        try:
-            player = next(player for player in players if player.name == name)
-        except StopIteration:
+        return self._reads.do(("player_stats", name), lambda: self._get_player_stats(name))
+
+    def _get_player_stats(self, name: str) -> tuple[int, int, int, str]:
+        player = self._backend.get_player_by_name(name)
+        if player is None:
             raise PlayerDoesNotExist()
-        wins = 0
-        losses = 0
-        matches = self._backend.list_matches(sport=Sport.PING_PONG)
-        for match in matches:
-            if match.player1_id == player.id:
-                if match.player1_score > match.player2_score:
-                    wins += 1
-                else:
-                    losses += 1
-            elif match.player2_id == player.id:
-                if match.player2_score > match.player1_score:
-                    wins += 1
-                else:
-                    losses += 1
-        wl_ratio = "{:.2f}".format(wins / losses) if losses > 0 else "∞"
-        return player.ratings.get(Hand.DOMINANT, Sport.PING_PONG), wins, losses, wl_ratio
+        return player_stats(player, self._aggregates)
@@ -1,4 +1,5 @@
 import random
+from typing import Optional
 
 
 def help() -> str:
@@ -98,6 +99,20 @@ def match_added(p1: str, p1rating: int, p1diff: str, p2: str, p2rating: int, p2d
     )
 
 
+def rank_changes(p1: str, p1old: Optional[int], p1new: int, p2: str, p2old: Optional[int], p2new: int) -> str:
+    return "Leaderboard positions:\n{}: {}\n{}: {}\n".format(
+        p1, _rank_change(p1old, p1new), p2, _rank_change(p2old, p2new)
+    )
+
+
+def _rank_change(old: Optional[int], new: int) -> str:
+    if old is None:
+        return f"#{new} (new)"
+    if old == new:
+        return f"#{new}"
+    return f"#{new} ({'+' if new < old else '-'}{abs(old - new)})"
+
+
 def match_undone(p1: str, p1rating: int, p2: str, p2rating: int) -> str:
     return (
         "OK, I've undone the last match. Your new ratings are:\n"
@@ -106,6 +121,10 @@ def match_undone(p1: str, p1rating: int, p2: str, p2rating: int) -> str:
     )
 
 
+def no_match_to_undo() -> str:
+    return "There are no matches to undo."
+
+
 def player_stats(name: str, rating: int, ratio: str, wins: int, losses: int) -> str:
     return "Here are the stats for {}:\nRating: {:.2f}\nW/L Ratio: {}\nWins: {}\nLosses: {}".format(
         name, rating, ratio, wins, losses
@@ -116,5 +135,23 @@ def stats(total_matches: int, leaderboard: str) -> str:
     return "Total Matches played: {}\n{}".format(total_matches, leaderboard)
 
 
+def metrics(lines: list[str]) -> str:
+    if not lines:
+        return "No metrics recorded yet."
+    return "```\n{}\n```".format("\n".join(lines))
+
+
+def ratings_replayed(matches: int) -> str:
+    return "Recalculated all ratings from {} matches.".format(matches)
+
+
+def busy() -> str:
+    return "I'm a bit overwhelmed right now. Please try again in a moment."
+
+
+def command_failed() -> str:
+    return "Something went wrong. Please try again later."
+
+
 def unknown_command() -> str:
     return "Not sure what you mean. Try `help`."
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar, cast
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Shares read computations between threads. Concurrent calls with the same key wait for the one call already in
+    flight instead of computing the result again, and the result is served from memory until `invalidate` is called,
+    which writers do after every change. Errors are passed to every waiting caller but never remembered.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: dict[Hashable, _Call] = {}
+        self._results: dict[Hashable, Any] = {}
+        self._generation = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            if key in self._results:
+                return cast(T, self._results[key])
+            call = self._in_flight.get(key)
+            if call is None:
+                call = self._in_flight[key] = _Call()
+                generation = self._generation
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return cast(T, call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._in_flight.get(key) is call:
+                    del self._in_flight[key]
+                # A write during the computation may have made the result stale, so it is only handed to the callers
+                # that were already waiting
+                if call.error is None and generation == self._generation:
+                    self._results[key] = call.result
+            call.done.set()
+        return cast(T, call.result)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._results.clear()
+            self._in_flight.clear()
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio counterpart of `SingleFlight`, for coroutines running on one event loop.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self._results: dict[Hashable, Any] = {}
+        self._generation = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        if key in self._results:
+            return cast(T, self._results[key])
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return cast(T, await asyncio.shield(in_flight))
+
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        generation = self._generation
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Marks the exception as retrieved, so it is not reported when no other caller was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if generation == self._generation:
+                self._results[key] = result
+            return result
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._results.clear()
+        self._in_flight.clear()
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
 import re
+import threading
+import time
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Optional
+from typing import Any, Callable, Generic, Optional, TypeVar
 
 import structlog
 from slack_sdk.rtm_v2 import RTMClient
 
-from src.backend.data_classes import Hand, Sport
+from src.backend.data_classes import Hand, Player, Sport
+from src.backend.metrics import REGISTRY, MetricsRegistry
 from src.backend.util import BaseEnum
 from src.pingpong import pingpong_service, responses
-from src.pingpong.pingpong_service import PingPongService
+from src.pingpong.dispatcher import CommandDispatcher
+from src.pingpong.pingpong_service import MATCH_LOG_KEY, PingPongService, name_key
 
 log = structlog.getLogger(__name__)
 
@@ -19,6 +23,13 @@ PLAYER_REGEX = "<@([A-Z0-9]+)>"
 MATCH_REGEX = f"^{PLAYER_REGEX}\s+((?:nd\s+)?){PLAYER_REGEX}\s+((?:nd\s+)?)(\d+)(\s+|-)(\d+)"
 MENTION_REGEX = f"^{PLAYER_REGEX}(.*)"
 COMMAND_REGEX = "([a-zA-Z]*)(\s+.*)?"
+MATCH_PATTERN = re.compile(MATCH_REGEX)
+MENTION_PATTERN = re.compile(MENTION_REGEX)
+COMMAND_PATTERN = re.compile(COMMAND_REGEX)
+# Log event of messages the bot does not answer; high volume, so it is usually sampled
+IGNORED_EVENT = "Ignored slack event"
+COMMAND_METRIC = "pingpong_command"
+SLACK_METRIC = "pingpong_slack"
 
 
 class CommandType(BaseEnum):
@@ -27,6 +38,8 @@ class CommandType(BaseEnum):
     MATCH = "match"
     STATS = "stats"
     UNDO = "undo"
+    METRICS = "metrics"
+    REPLAY = "replay"
 
 
 class KeyWord(Enum):
@@ -50,6 +63,10 @@ class BotCommand:
         command_type_str, command_value = cls._parse_message_as_command(message)
         return BotCommand(channel, sender, CommandType.of(command_type_str), command_value, recipient_id)
 
+    @property
+    def metric_label(self) -> str:
+        return "unknown" if self.command_type is None else self.command_type.value
+
     @staticmethod
     def _parse_text_as_direct_mention(
         message_text: str,
@@ -58,7 +75,7 @@ class BotCommand:
         Finds a direct mention (a mention that is at the beginning) in message text
         and returns the user ID which was mentioned. If there is no direct mention, returns None
         """
-        matches = re.search(MENTION_REGEX, message_text)
+        matches = MENTION_PATTERN.match(message_text)
         # the first group contains the username, the second group contains the remaining message
         if matches:
             return matches.group(1), matches.group(2).strip()
@@ -70,7 +87,7 @@ class BotCommand:
     ) -> tuple[Optional[str], Optional[str]]:
         if not message:
             return None, None
-        parsed_command = re.match(COMMAND_REGEX, message)
+        parsed_command = COMMAND_PATTERN.match(message)
         command_type, command_value = None, None
         if parsed_command:
             command_type = parsed_command.group(1)
@@ -79,18 +96,130 @@ class BotCommand:
         return command_type, command_value
 
 
+@dataclass
+class MatchCommand:
+    player1_id: str
+    player1_hand: Hand
+    player2_id: str
+    player2_hand: Hand
+    score1: int
+    score2: int
+
+    @classmethod
+    def parse(cls, match_string: Optional[str]) -> Optional[MatchCommand]:
+        if match_string is None:
+            return None
+        parsed_match_string = MATCH_PATTERN.match(match_string)
+        if not parsed_match_string:
+            return None
+        player1_id, nondom1, player2_id, nondom2, score1, score2 = (
+            parsed_match_string.group(1),
+            parsed_match_string.group(2).strip(),
+            parsed_match_string.group(3),
+            parsed_match_string.group(4).strip(),
+            parsed_match_string.group(5),
+            parsed_match_string.group(7),
+        )
+        p1_hand = Hand.NON_DOMINANT if nondom1 == KeyWord.NON_DOMINANT.value else Hand.DOMINANT
+        p2_hand = Hand.NON_DOMINANT if nondom2 == KeyWord.NON_DOMINANT.value else Hand.DOMINANT
+        return MatchCommand(player1_id, p1_hand, player2_id, p2_hand, int(score1), int(score2))
+
+    def match_added_response(self, p1: Player, p1_rating_diff: int, p2: Player, p2_rating_diff: int) -> str:
+        return responses.match_added(
+            p1.name,
+            p1.ratings.get(self.player1_hand, Sport.PING_PONG),
+            ("+" if p1_rating_diff >= 0 else "") + str(p1_rating_diff),
+            p2.name,
+            p2.ratings.get(self.player2_hand, Sport.PING_PONG),
+            ("+" if p2_rating_diff >= 0 else "") + str(p2_rating_diff),
+        )
+
+    def rank_changes_response(
+        self,
+        p1: Player,
+        p1_old_rank: Optional[int],
+        p1_new_rank: Optional[int],
+        p2: Player,
+        p2_old_rank: Optional[int],
+        p2_new_rank: Optional[int],
+    ) -> str:
+        if p1_new_rank is None or p2_new_rank is None:
+            return ""
+        return responses.rank_changes(p1.name, p1_old_rank, p1_new_rank, p2.name, p2_old_rank, p2_new_rank)
+
+
+# Response type of a command handler: a string for the threaded bot, an awaitable string for the async bot
+R = TypeVar("R")
+CommandHandler = Callable[[BotCommand, Player], R]
+
+
+class CommandRouter(Generic[R]):
+    """
+    Maps command types to handlers. `accepts` is a cheap prefilter run on every Slack event before anything is logged
+    or parsed: only messages with a user and text, posted in one of the answered channels and starting with a mention
+    of the bot, get through.
+    """
+
+    def __init__(self, bot_id: str, channels: set[str]) -> None:
+        self._mention = f"<@{bot_id}>"
+        self._channels = channels
+        self._handlers: dict[Optional[CommandType], CommandHandler[R]] = {}
+
+    def register(self, command_type: Optional[CommandType], handler: CommandHandler[R]) -> None:
+        self._handlers[command_type] = handler
+
+    def accepts(self, event: dict[str, Any]) -> bool:
+        if event.get("type") != "message" or event.get("channel") not in self._channels or "user" not in event:
+            return False
+        text = event.get("text")
+        return isinstance(text, str) and text.startswith(self._mention)
+
+    def handler_for(self, command_type: Optional[CommandType]) -> Optional[CommandHandler[R]]:
+        return self._handlers.get(command_type)
+
+
 class PingPongSlackBot:
-    def __init__(self, ping_pong_service: PingPongService, rtm_client: RTMClient, answer_in_channels: set[str]):
+    def __init__(
+        self,
+        ping_pong_service: PingPongService,
+        rtm_client: RTMClient,
+        answer_in_channels: set[str],
+        dispatcher: Optional[CommandDispatcher] = None,
+        metrics: MetricsRegistry = REGISTRY,
+        started_at: Optional[float] = None,
+        admin_channels: Optional[set[str]] = None,
+    ):
         self.ping_pong_service = ping_pong_service
         self.rtm_client = rtm_client
         self.answer_in_channels = answer_in_channels
+        self.dispatcher = dispatcher
+        self.metrics = metrics
+        # Channels where admin commands such as `metrics` and `replay` are answered
+        self.admin_channels = admin_channels or set()
+        # time.monotonic() when the process started, which readiness and the first response are measured from
+        self.started_at = time.monotonic() if started_at is None else started_at
+        self._first_response_lock = threading.Lock()
+        self._answered = False
+        if dispatcher is not None:
+            metrics.register_gauge("pingpong_dispatcher_queue_depth", lambda: dispatcher.metrics().queue_depth)
+            metrics.register_gauge("pingpong_dispatcher_in_flight", lambda: dispatcher.metrics().in_flight)
 
         info = self.rtm_client.web_client.rtm_connect()
         self.ping_pong_bot_id = info["self"]["id"]
+        self.router: CommandRouter[str] = CommandRouter(self.ping_pong_bot_id, self.answer_in_channels)
+        self.router.register(CommandType.HELP, lambda bot_command, player: responses.help())
+        self.router.register(CommandType.NAME, self._handle_name_command)
+        self.router.register(
+            CommandType.MATCH, lambda bot_command, player: self._handle_match_command(bot_command.command_value)
+        )
+        self.router.register(CommandType.STATS, self._handle_stats_command)
+        self.router.register(CommandType.UNDO, self._handle_undo_command)
+        self.router.register(CommandType.METRICS, self._handle_metrics_command)
+        self.router.register(CommandType.REPLAY, self._handle_replay_command)
         self.rtm_client.on("message")(lambda client, event: self._handle(client, event))
 
     def start(self) -> None:
-        log.info("Starting pingpong bot")
+        log.info("Pingpong bot ready", seconds_since_start=round(time.monotonic() - self.started_at, 3))
         self.rtm_client.start()
 
     @staticmethod
@@ -99,19 +228,68 @@ class PingPongSlackBot:
         return {key: event.get(key) for key in essential_keys}
 
     def _handle(self, client: RTMClient, event: dict) -> None:
-        if event["type"] != "message":
+        if not self.router.accepts(event):
+            log.info(IGNORED_EVENT, channel=event.get("channel"), user=event.get("user"))
             return
         log.info("Received slack event", **self._event_info_to_log(event))
         bot_command = BotCommand.from_slack_event(event)
-        if bot_command.recipient_id != self.ping_pong_bot_id:
-            return
-        if bot_command.channel not in self.answer_in_channels:
-            return
 
-        response = self._handle_bot_command(bot_command)
-        client.web_client.chat_postMessage(channel=bot_command.channel, text=response)
+        if self.dispatcher is None:
+            self._respond(client, bot_command)
+        elif not self.dispatcher.submit(
+            lambda: self._respond(client, bot_command), self._write_keys(bot_command), self._read_keys(bot_command)
+        ):
+            self.metrics.inc("pingpong_dispatcher_rejected_total", 1)
+            self._post_message(client, bot_command.channel, responses.busy())
+
+    def _respond(self, client: RTMClient, bot_command: BotCommand) -> None:
+        try:
+            response = self._handle_bot_command(bot_command)
+        except Exception:
+            log.exception("Command failed", command=bot_command.metric_label)
+            response = responses.command_failed()
+        self._post_message(client, bot_command.channel, response)
+
+    def _post_message(self, client: RTMClient, channel: str, text: str) -> None:
+        with self.metrics.track(SLACK_METRIC, method="chat_postMessage"):
+            client.web_client.chat_postMessage(channel=channel, text=text)
+        with self._first_response_lock:
+            first_response, self._answered = not self._answered, True
+        if first_response:
+            log.info("First response sent", seconds_since_start=round(time.monotonic() - self.started_at, 3))
+
+    @staticmethod
+    def _write_keys(bot_command: BotCommand) -> list[str]:
+        """
+        Returns the ids of the players a command may write to. Commands touching the same player are serialized.
+        Undo does not know its players up front, so it writes the match log key, which match commands only read, and
+        so does replay, which rewrites every match. Renames are also serialized per new name.
+        """
+        if bot_command.command_type == CommandType.NAME and bot_command.command_value:
+            return [bot_command.sender_id, name_key(bot_command.command_value)]
+        if bot_command.command_type == CommandType.MATCH:
+            match_command = MatchCommand.parse(bot_command.command_value)
+            if match_command:
+                return [match_command.player1_id, match_command.player2_id]
+        if bot_command.command_type in (CommandType.UNDO, CommandType.REPLAY):
+            return [MATCH_LOG_KEY]
+        return []
+
+    @staticmethod
+    def _read_keys(bot_command: BotCommand) -> list[str]:
+        """
+        Returns the keys a command shares with other commands. Matches of different players run concurrently, but
+        never alongside an undo, which removes the latest match.
+        """
+        if bot_command.command_type == CommandType.MATCH:
+            return [MATCH_LOG_KEY]
+        return []
 
     def _handle_bot_command(self, bot_command: BotCommand) -> str:
+        with self.metrics.track(COMMAND_METRIC, command=bot_command.metric_label):
+            return self._execute_bot_command(bot_command)
+
+    def _execute_bot_command(self, bot_command: BotCommand) -> str:
         """
         Executes bot command if the command is known
         """
@@ -121,71 +299,70 @@ class PingPongSlackBot:
             self.ping_pong_service.add_new_player(bot_command.sender_id)
             return responses.new_player()
 
-        if bot_command.command_type is None:
+        handler = self.router.handler_for(bot_command.command_type)
+        if handler is None:
             return responses.unknown_command()
-        elif bot_command.command_type == CommandType.HELP:
-            return responses.help()
-        elif bot_command.command_type == CommandType.NAME:
-            if bot_command.command_value:
-                success = self.ping_pong_service.update_display_name(player, bot_command.command_value.lower())
-                if success:
-                    return responses.name_updated(bot_command.command_value.lower())
-                else:
-                    return responses.name_taken()
-            else:
-                return responses.name(player.name)
-        elif bot_command.command_type == CommandType.MATCH:
-            return self._handle_match_command(bot_command.command_value)
-        elif bot_command.command_type == CommandType.STATS:
-            name = bot_command.command_value
-            if name:
-                try:
-                    rating, wins, losses, ratio = self.ping_pong_service.get_player_stats(name)
-                    return responses.player_stats(name, rating, ratio, wins, losses)
-                except pingpong_service.PlayerDoesNotExist:
-                    return responses.player_does_not_exist()
-            else:
-                return responses.stats(
-                    self.ping_pong_service.get_total_matches(), self.ping_pong_service.get_leaderboard()
-                )
-        elif bot_command.command_type == CommandType.UNDO:
+        return handler(bot_command, player)
+
+    def _handle_metrics_command(self, bot_command: BotCommand, player: Player) -> str:
+        if bot_command.channel not in self.admin_channels:
+            return responses.unknown_command()
+        return responses.metrics(self.metrics.summary())
+
+    def _handle_replay_command(self, bot_command: BotCommand, player: Player) -> str:
+        if bot_command.channel not in self.admin_channels:
             return responses.unknown_command()
-            # w_name, w_rating, l_name, l_rating = pingpong_service.undo_last_match()
-            # return responses.match_undone(w_name, w_rating, l_name, l_rating)
-        return responses.unknown_command()
+        return responses.ratings_replayed(self.ping_pong_service.replay_ratings())
+
+    def _handle_name_command(self, bot_command: BotCommand, player: Player) -> str:
+        if not bot_command.command_value:
+            return responses.name(player.name)
+        new_name = bot_command.command_value.lower()
+        if self.ping_pong_service.update_display_name(player, new_name):
+            return responses.name_updated(new_name)
+        return responses.name_taken()
+
+    def _handle_stats_command(self, bot_command: BotCommand, player: Player) -> str:
+        name = bot_command.command_value
+        if not name:
+            return responses.stats(
+                self.ping_pong_service.get_total_matches(),
+                self.ping_pong_service.get_leaderboard(bot_command.sender_id),
+            )
+        try:
+            rating, wins, losses, ratio = self.ping_pong_service.get_player_stats(name)
+            return responses.player_stats(name, rating, ratio, wins, losses)
+        except pingpong_service.PlayerDoesNotExist:
+            return responses.player_does_not_exist()
+
+    def _handle_undo_command(self, bot_command: BotCommand, player: Player) -> str:
+        try:
+            return responses.match_undone(*self.ping_pong_service.undo_last_match())
+        except pingpong_service.NoMatchToUndo:
+            return responses.no_match_to_undo()
+        except pingpong_service.PlayerDoesNotExist:
+            return responses.player_does_not_exist()
 
     def _handle_match_command(self, match_string: Optional[str]) -> str:
-        if match_string is None:
-            return responses.invalid_match_command()
-        parsed_match_string = re.match(MATCH_REGEX, match_string)
-        if not parsed_match_string:
+        match_command = MatchCommand.parse(match_string)
+        if match_command is None:
             return responses.invalid_match_command()
-        player1_id, nondom1, player2_id, nondom2, score1, score2 = (
-            parsed_match_string.group(1),
-            parsed_match_string.group(2).strip(),
-            parsed_match_string.group(3),
-            parsed_match_string.group(4).strip(),
-            parsed_match_string.group(5),
-            parsed_match_string.group(7),
-        )
         try:
-            p1_hand = Hand.NON_DOMINANT if nondom1 == KeyWord.NON_DOMINANT.value else Hand.DOMINANT
-            p2_hand = Hand.NON_DOMINANT if nondom2 == KeyWord.NON_DOMINANT.value else Hand.DOMINANT
+            p1_old_rank = self.ping_pong_service.get_rank(match_command.player1_id, match_command.player1_hand)
+            p2_old_rank = self.ping_pong_service.get_rank(match_command.player2_id, match_command.player2_hand)
             p1, p1_rating_diff, p2, p2_rating_diff = self.ping_pong_service.add_match(
-                player1_id,
-                p1_hand,
-                player2_id,
-                p2_hand,
-                int(score1),
-                int(score2),
+                match_command.player1_id,
+                match_command.player1_hand,
+                match_command.player2_id,
+                match_command.player2_hand,
+                match_command.score1,
+                match_command.score2,
             )
-            return responses.match_added(
-                p1.name,
-                p1.ratings.get(p1_hand, Sport.PING_PONG),
-                ("+" if p1_rating_diff >= 0 else "") + str(p1_rating_diff),
-                p2.name,
-                p2.ratings.get(p2_hand, Sport.PING_PONG),
-                ("+" if p2_rating_diff >= 0 else "") + str(p2_rating_diff),
+            p1_new_rank = self.ping_pong_service.get_rank(match_command.player1_id, match_command.player1_hand)
+            p2_new_rank = self.ping_pong_service.get_rank(match_command.player2_id, match_command.player2_hand)
+            response = match_command.match_added_response(p1, p1_rating_diff, p2, p2_rating_diff)
+            return response + match_command.rank_changes_response(
+                p1, p1_old_rank, p1_new_rank, p2, p2_old_rank, p2_new_rank
             )
         except pingpong_service.PlayerDoesNotExist:
             return responses.player_does_not_exist()
@@ -0,0 +1,26 @@
+import pytest
+
+from src.backend.data_classes import Hand, Match, Sport
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def a_match(
+    score1: int = 11,
+    score2: int = 0,
+    hand1: Hand = Hand.DOMINANT,
+    hand2: Hand = Hand.DOMINANT,
+    sport: Sport = Sport.PING_PONG,
+) -> Match:
+    return Match("id1", "id2", score1, score2, 1000, 1000, sport, hand1, hand2)
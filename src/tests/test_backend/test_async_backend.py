@@ -0,0 +1,45 @@
+import asyncio
+from typing import Callable
+
+import pytest
+
+from src.backend.async_backend import AsyncBackend, ExecutorAsyncBackend
+from src.backend.async_backend_in_memory import AsyncBackendInMemory
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Hand, Match, Player, Sport
+from src.backend.rating import Ratings
+
+
+@pytest.fixture(params=[AsyncBackendInMemory, lambda: ExecutorAsyncBackend(BackendInMemory())])
+def async_backend(request: pytest.FixtureRequest) -> AsyncBackend:
+    factory: Callable[[], AsyncBackend] = request.param
+    return factory()
+
+
+class TestAsyncBackend:
+    def test_players(self, async_backend: AsyncBackend) -> None:
+        async def run() -> None:
+            player = await async_backend.create_player(Player("id1", "name1", Ratings()))
+            assert await async_backend.get_player("id1") == player
+            assert await async_backend.get_player("nothing") is None
+            updated_player = await async_backend.update_player("id1", name="newname")
+            assert await async_backend.list_players() == [updated_player]
+            assert await async_backend.get_player_by_name("NewName") == updated_player
+            assert await async_backend.is_name_taken("newname")
+            assert not await async_backend.is_name_taken("name1")
+
+        asyncio.run(run())
+
+    def test_transaction(self, async_backend: AsyncBackend) -> None:
+        match = Match("id1", "id2", 11, 0, 1000, 1000, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT)
+
+        async def run() -> None:
+            player = await async_backend.create_player(Player("id1", "name1", Ratings()))
+            async with async_backend.transaction() as transaction:
+                transaction.create_match(match)
+                transaction.update_player(player, name="newname")
+            assert await async_backend.list_matches(Sport.PING_PONG) == [match]
+            assert await async_backend.list_matches(Sport.SQUASH) == []
+            assert await async_backend.get_player("id1") == Player("id1", "newname", Ratings())
+
+        asyncio.run(run())
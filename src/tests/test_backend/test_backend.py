@@ -1,6 +1,8 @@
 import random
+import sqlite3
 import string
-from typing import Iterator
+from pathlib import Path
+from typing import Iterator, cast
 
 import pytest
 from _pytest.fixtures import SubRequest
@@ -8,9 +10,13 @@ from cognite.client import CogniteClient
 from tenacity import retry, retry_if_exception_type, stop_after_delay
 
 from src.backend.backend import Backend
+from src.backend.backend_caching import CachingBackend
 from src.backend.backend_cdf import BackendCdf
 from src.backend.backend_in_memory import BackendInMemory
+from src.backend.backend_journaled import JournaledBackend
+from src.backend.backend_sqlite import BackendSqlite
 from src.backend.data_classes import Hand, Match, Player, Sport
+from src.backend.fake_cognite_client import FakeCogniteClient
 from src.backend.rating import Ratings
 
 retry_ec = retry(stop=stop_after_delay(30), retry=retry_if_exception_type(AssertionError))
@@ -25,12 +31,23 @@ def random_identifier(length: int) -> str:
     return "PingPongSlackBotTest:" + "".join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
 
-@pytest.fixture(params=[BackendInMemory, BackendCdf])
-def backend(request: SubRequest, cognite_client: CogniteClient) -> Iterator[Backend]:
+@pytest.fixture(
+    params=[BackendInMemory, CachingBackend, BackendSqlite, JournaledBackend, BackendCdf, FakeCogniteClient]
+)
+def backend(request: SubRequest, tmp_path: Path) -> Iterator[Backend]:
     if request.param == BackendInMemory:
         backend: Backend = BackendInMemory()
+    elif request.param == CachingBackend:
+        backend = CachingBackend(BackendInMemory())
+    elif request.param == BackendSqlite:
+        backend = BackendSqlite(":memory:")
+    elif request.param == JournaledBackend:
+        backend = JournaledBackend(BackendInMemory(), str(tmp_path), fsync=False)
     elif request.param == BackendCdf:
-        backend = BackendCdf(random_identifier(10), cognite_client)
+        # Only the live CDF run needs credentials, the other backends run offline
+        backend = BackendCdf(random_identifier(10), request.getfixturevalue("cognite_client"))
+    elif request.param == FakeCogniteClient:
+        backend = BackendCdf(random_identifier(10), cast(CogniteClient, FakeCogniteClient()))
     else:
         raise RuntimeError(f"Invalid backend, {request.param}")
     yield backend
@@ -99,6 +116,28 @@ class TestBackend:
         for p in res:
             assert p in created_players
 
+    @retry_ec
+    def test_list_player_names(self, backend: Backend, created_players: list[Player]) -> None:
+        assert backend.list_player_names() == {p.id: p.name for p in created_players}
+
+    @retry_ec
+    def test_get_player_by_name(self, backend: Backend, created_players: list[Player]) -> None:
+        assert backend.get_player_by_name("NAME1") == created_players[0]
+        assert backend.get_player_by_name("name3") is None
+
+    @retry_ec
+    def test_is_name_taken(self, backend: Backend, created_players: list[Player]) -> None:
+        assert backend.is_name_taken("Name2")
+        assert not backend.is_name_taken("newname")
+
+        backend.update_player(created_players[1].id, name="newname")
+        with backend.transaction() as transaction:
+            transaction.update_player(created_players[0], name="other")
+        assert backend.is_name_taken("newname")
+        assert not backend.is_name_taken("name1")
+        assert not backend.is_name_taken("name2")
+        assert backend.get_player_by_name("other") == Player("id1", "other", Ratings())
+
     def test_update_player(self, backend: Backend, created_players: list[Player]) -> None:
         p1 = created_players[0]
         assert p1.ratings == Ratings()
@@ -140,3 +179,79 @@ class TestBackend:
         res = backend.list_matches(sport=Sport.SQUASH)
         assert len(res) == 1
         assert res[0] in created_matches
+
+    @retry_ec
+    def test_list_matches_table(self, backend: Backend, created_matches: list[Match]) -> None:
+        table = backend.list_matches_table(Sport.PING_PONG)
+        assert [table.match(row) for row in range(len(table))] == backend.list_matches(Sport.PING_PONG)
+        assert len(backend.list_matches_table()) == len(created_matches)
+
+    def test_commit(self, backend: Backend, created_players: list[Player]) -> None:
+        p1, p2 = created_players
+        match = Match(p1.id, p2.id, 11, 0, 1000, 1000, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT)
+        new_ratings = p1.ratings.update(Hand.DOMINANT, Sport.PING_PONG, 1016)
+        with backend.transaction() as transaction:
+            transaction.create_match(match)
+            new_p1 = transaction.update_player(p1, ratings=new_ratings)
+            new_p2 = transaction.update_player(p2, name="newname")
+
+        assert new_p1 == Player(p1.id, p1.name, new_ratings)
+        assert new_p2 == Player(p2.id, "newname", p2.ratings)
+        assert backend.get_player(p1.id) == new_p1
+        assert backend.get_player(p2.id) == new_p2
+        assert backend.list_matches(Sport.PING_PONG) == [match]
+
+    def test_transaction_not_committed_on_error(self, backend: Backend, created_players: list[Player]) -> None:
+        p1, p2 = created_players
+        with pytest.raises(RuntimeError):
+            with backend.transaction() as transaction:
+                transaction.update_player(p1, name="newname")
+                raise RuntimeError()
+        assert backend.get_player(p1.id) == p1
+
+    @retry_ec
+    def test_get_latest_match(self, backend: Backend, created_players: list[Player]) -> None:
+        p1, p2 = created_players
+        assert backend.get_latest_match(Sport.PING_PONG) is None
+        first = backend.create_match(
+            Match(p1.id, p2.id, 11, 0, 1000, 1000, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT)
+        )
+        second = backend.create_match(
+            Match(p1.id, p2.id, 0, 11, 1016, 984, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT)
+        )
+        latest = backend.get_latest_match(Sport.PING_PONG)
+        assert latest is not None
+        assert latest == second and latest.id == second.id
+        assert first.id != second.id
+        assert backend.get_latest_match(Sport.SQUASH) is None
+
+    @retry_ec
+    def test_delete_match(self, backend: Backend, created_players: list[Player]) -> None:
+        p1, p2 = created_players
+        first = backend.create_match(
+            Match(p1.id, p2.id, 11, 0, 1000, 1000, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT)
+        )
+        second = backend.create_match(
+            Match(p1.id, p2.id, 0, 11, 1016, 984, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT)
+        )
+        with backend.transaction() as transaction:
+            transaction.delete_match(second)
+        assert backend.list_matches(Sport.PING_PONG) == [first]
+        assert backend.get_latest_match(Sport.PING_PONG) == first
+
+    def test_update_matches(self, backend: Backend, created_matches: list[Match]) -> None:
+        first, second = created_matches
+        with backend.transaction() as transaction:
+            updated = transaction.update_match(second, 1020, 980)
+        assert (updated.id, updated.player1_rating, updated.player2_rating) == (second.id, 1020, 980)
+        assert backend.list_matches(Sport.PING_PONG) == [first]
+        assert backend.list_matches(Sport.SQUASH) == [updated]
+        assert backend.get_latest_match(Sport.SQUASH) == updated
+
+
+def test_sqlite_rejects_duplicate_player() -> None:
+    backend = BackendSqlite(":memory:")
+    backend.create_player(Player("id1", "name1", Ratings({Hand.DOMINANT: {Sport.PING_PONG: 1016}})))
+    with pytest.raises(sqlite3.IntegrityError):
+        backend.create_player(Player("id1", "name1", Ratings()))
+    assert backend.get_player("id1") == Player("id1", "name1", Ratings({Hand.DOMINANT: {Sport.PING_PONG: 1016}}))
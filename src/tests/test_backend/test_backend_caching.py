@@ -0,0 +1,100 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.backend.backend_caching import CachingBackend
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Player, Sport
+from src.backend.rating import Ratings
+from src.tests.conftest import FakeClock, a_match
+
+
+@pytest.fixture
+def inner() -> MagicMock:
+    return MagicMock(wraps=BackendInMemory())
+
+
+@pytest.fixture
+def caching_backend(inner: MagicMock, clock: FakeClock) -> CachingBackend:
+    return CachingBackend(inner, ttl=10, clock=clock)
+
+
+class TestCachingBackend:
+    def test_get_player_is_served_from_cache(self, caching_backend: CachingBackend, inner: MagicMock) -> None:
+        caching_backend.create_player(Player("id1", "name1", Ratings()))
+        assert caching_backend.get_player("id1") == Player("id1", "name1", Ratings())
+        assert inner.get_player.call_count == 0
+        assert caching_backend.stats.hits == 1
+
+    def test_update_player_writes_through(self, caching_backend: CachingBackend, inner: MagicMock) -> None:
+        caching_backend.create_player(Player("id1", "name1", Ratings()))
+        caching_backend.list_players()
+        caching_backend.update_player("id1", name="newname")
+
+        assert inner.update_player.call_count == 1
+        assert [p.name for p in caching_backend.list_players()] == ["newname"]
+        assert inner.list_players.call_count == 1
+
+    def test_create_match_writes_through(self, caching_backend: CachingBackend, inner: MagicMock) -> None:
+        assert caching_backend.list_matches(Sport.PING_PONG) == []
+        caching_backend.create_match(a_match())
+        caching_backend.create_match(a_match(sport=Sport.SQUASH))
+
+        assert caching_backend.list_matches(Sport.PING_PONG) == [a_match()]
+        assert inner.list_matches.call_count == 1
+        assert inner.create_match.call_count == 2
+
+    def test_ttl_expiry(self, caching_backend: CachingBackend, inner: MagicMock, clock: FakeClock) -> None:
+        caching_backend.list_matches(Sport.PING_PONG)
+        clock.now = 9
+        caching_backend.list_matches(Sport.PING_PONG)
+        assert inner.list_matches.call_count == 1
+        clock.now = 10
+        caching_backend.list_matches(Sport.PING_PONG)
+        assert inner.list_matches.call_count == 2
+        assert (caching_backend.stats.hits, caching_backend.stats.misses) == (1, 2)
+
+    def test_invalidate(self, caching_backend: CachingBackend, inner: MagicMock) -> None:
+        caching_backend.create_player(Player("id1", "name1", Ratings()))
+        caching_backend.list_players()
+        caching_backend.invalidate()
+        caching_backend.get_player("id1")
+        caching_backend.list_players()
+        assert inner.get_player.call_count == 1
+        assert inner.list_players.call_count == 2
+
+    def test_get_player_does_not_exist_is_not_cached(self, caching_backend: CachingBackend, inner: MagicMock) -> None:
+        assert caching_backend.get_player("nothing") is None
+        assert caching_backend.get_player("nothing") is None
+        assert inner.get_player.call_count == 2
+
+    def test_commit_writes_through(self, caching_backend: CachingBackend, inner: MagicMock) -> None:
+        player = caching_backend.create_player(Player("id1", "name1", Ratings()))
+        caching_backend.list_matches(Sport.PING_PONG)
+        with caching_backend.transaction() as transaction:
+            transaction.create_match(a_match())
+            transaction.update_player(player, name="newname")
+
+        assert inner.commit.call_count == 1
+        assert caching_backend.get_player("id1") == Player("id1", "newname", Ratings())
+        assert caching_backend.list_matches(Sport.PING_PONG) == [a_match()]
+        assert inner.get_player.call_count == 0
+        assert inner.list_matches.call_count == 1
+
+    def test_get_player_by_name_is_served_from_cache(self, caching_backend: CachingBackend, inner: MagicMock) -> None:
+        caching_backend.create_player(Player("id1", "name1", Ratings()))
+        caching_backend.update_player("id1", name="newname")
+        assert caching_backend.get_player_by_name("NEWNAME") == Player("id1", "newname", Ratings())
+        assert caching_backend.get_player_by_name("name1") is None
+        assert inner.get_player_by_name.call_count == 1
+
+        inner.create_player(Player("id2", "name2", Ratings()))
+        assert caching_backend.get_player_by_name("name2") == Player("id2", "name2", Ratings())
+        assert inner.get_player_by_name.call_count == 2
+
+    def test_cached_players_cannot_be_changed_by_callers(self, caching_backend: CachingBackend) -> None:
+        caching_backend.create_player(Player("id1", "name1", Ratings())).name = "changed"
+        caching_backend.get_player("id1").name = "changed"  # type: ignore[union-attr]
+        caching_backend.list_players()
+        caching_backend.list_players()[0].name = "changed"
+        assert caching_backend.get_player("id1") == Player("id1", "name1", Ratings())
@@ -0,0 +1,204 @@
+import time
+from pathlib import Path
+from typing import cast
+from unittest.mock import MagicMock, patch
+
+import pytest
+from cognite.client import CogniteClient
+from cognite.client.data_classes import Asset, TimeSeries
+
+from src.backend.backend_cdf import HAND, RATINGS, SPORT, BackendCdf
+from src.backend.data_classes import Hand, Match, Player, Sport
+from src.backend.datapoint_queue import DatapointQueue
+from src.backend.fake_cognite_client import FakeCogniteClient
+from src.backend.rating import Ratings
+from src.pingpong.pingpong_service import PingPongService
+
+
+@pytest.fixture
+def client() -> MagicMock:
+    client = MagicMock()
+    client.assets.retrieve_multiple.return_value = [
+        Asset(id=1, external_id="id1", name="name1"),
+        Asset(id=2, external_id="id2", name="name2"),
+    ]
+    client.time_series.list.return_value = [
+        TimeSeries(id=10, asset_id=1, metadata={HAND: Hand.DOMINANT.value, SPORT: Sport.PING_PONG.value})
+    ]
+    client.time_series.create.return_value = [TimeSeries(id=20)]
+    return client
+
+
+def register_match(backend: BackendCdf, p1: Player, p2: Player, rating1: int, rating2: int) -> tuple[Player, Player]:
+    with backend.transaction() as transaction:
+        transaction.create_match(Match(p1.id, p2.id, 11, 0, 1000, 1000, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT))
+        p1 = transaction.update_player(p1, ratings=p1.ratings.update(Hand.DOMINANT, Sport.PING_PONG, rating1))
+        p2 = transaction.update_player(p2, ratings=p2.ratings.update(Hand.DOMINANT, Sport.PING_PONG, rating2))
+    return p1, p2
+
+
+def test_commit_uses_bulk_calls(client: MagicMock) -> None:
+    backend = BackendCdf("root", client)
+    register_match(backend, Player("id1", "name1", Ratings()), Player("id2", "name2", Ratings()), 1016, 984)
+
+    assert client.events.create.call_count == 1
+    assert client.assets.retrieve_multiple.call_count == 1
+    assert client.assets.update.call_count == 1
+    assert len(client.assets.update.call_args[0][0]) == 2
+    assert client.time_series.list.call_count == 1
+    assert client.time_series.create.call_count == 1
+    client.datapoints.insert_multiple.assert_called_once()
+    inserted = client.datapoints.insert_multiple.call_args[0][0]
+    assert [(dps["id"], dps["datapoints"][0][1]) for dps in inserted] == [(10, 1016), (20, 984)]
+
+
+def test_time_series_ids_are_cached_and_only_changed_ratings_written(client: MagicMock) -> None:
+    backend = BackendCdf("root", client)
+    ratings = Ratings({Hand.NON_DOMINANT: {Sport.PING_PONG: 1100}})
+    p1, p2 = register_match(backend, Player("id1", "name1", ratings), Player("id2", "name2", ratings), 1016, 984)
+    register_match(backend, p1, p2, 1030, 970)
+
+    assert client.time_series.list.call_count == 1
+    assert client.time_series.create.call_count == 1
+    inserted = client.datapoints.insert_multiple.call_args[0][0]
+    assert [(dps["id"], dps["datapoints"][0][1]) for dps in inserted] == [(10, 1030), (20, 970)]
+
+
+def test_prefetch_time_series_ids(client: MagicMock) -> None:
+    backend = BackendCdf("root", client)
+    client.assets.list.return_value = [
+        Asset(id=1, external_id="id1", name="name1"),
+        Asset(id=2, external_id="id2", name="name2"),
+    ]
+    client.time_series.list.return_value = [
+        TimeSeries(id=10, asset_id=1, metadata={HAND: Hand.DOMINANT.value, SPORT: Sport.PING_PONG.value}),
+        TimeSeries(id=20, asset_id=2, metadata={HAND: Hand.DOMINANT.value, SPORT: Sport.PING_PONG.value}),
+    ]
+    backend.prefetch_time_series_ids()
+    register_match(backend, Player("id1", "name1", Ratings()), Player("id2", "name2", Ratings()), 1016, 984)
+
+    assert client.time_series.list.call_count == 1
+    assert client.time_series.create.call_count == 0
+    assert client.assets.retrieve_multiple.call_count == 0
+
+
+def test_delete_match_removes_event_and_datapoints(client: MagicMock) -> None:
+    backend = BackendCdf("root", client)
+    match = Match("id1", "id2", 11, 0, 1000, 1000, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT, "abc", 1234)
+    backend.delete_match(match)
+
+    client.events.delete.assert_called_once_with(id=None, external_id=["abc"])
+    client.datapoints.delete_ranges.assert_called_once_with([{"id": 10, "start": 1234, "end": 1235}])
+
+
+def test_datapoints_are_written_behind(client: MagicMock, tmp_path: Path) -> None:
+    datapoint_queue = DatapointQueue(str(tmp_path), flush_interval=60)
+    datapoint_queue.start(client.datapoints.insert_multiple, client.datapoints.delete_ranges)
+    backend = BackendCdf("root", client, datapoint_queue)
+    p1, p2 = Player("id1", "name1", Ratings()), Player("id2", "name2", Ratings())
+    match = Match("id1", "id2", 11, 0, 1000, 1000, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT, "abc", 1234)
+    with backend.transaction() as transaction:
+        transaction.create_match(match)
+        transaction.update_player(p1, ratings=p1.ratings.update(Hand.DOMINANT, Sport.PING_PONG, 1016))
+        transaction.update_player(p2, ratings=p2.ratings.update(Hand.DOMINANT, Sport.PING_PONG, 984))
+    datapoint_queue.put([(10, 5678, 1030)])
+    assert client.datapoints.insert_multiple.call_count == 0
+    assert datapoint_queue.pending == 3
+
+    # Queued datapoints of an undone match are dropped instead of inserted and deleted again
+    backend.delete_match(match)
+    client.datapoints.delete_ranges.assert_called_once_with(
+        [{"id": 10, "start": 1234, "end": 1235}, {"id": 20, "start": 1234, "end": 1235}]
+    )
+    assert datapoint_queue.pending == 1
+    datapoint_queue.close()
+    inserted = client.datapoints.insert_multiple.call_args[0][0]
+    assert inserted == [{"id": 10, "datapoints": [(5678, 1030)]}]
+
+
+def test_undo_with_queued_datapoints_makes_no_datapoint_inserts(tmp_path: Path) -> None:
+    client = FakeCogniteClient()
+    datapoint_queue = DatapointQueue(str(tmp_path), flush_interval=60)
+    datapoint_queue.start(client.datapoints.insert_multiple, client.datapoints.delete_ranges)
+    backend = BackendCdf("root", cast(CogniteClient, client), datapoint_queue)
+    backend.create_player(Player("id1", "name1", Ratings()))
+    backend.create_player(Player("id2", "name2", Ratings()))
+    service = PingPongService(backend)
+    service.add_match("id1", Hand.DOMINANT, "id2", Hand.DOMINANT, 11, 3)
+    # A queued datapoint of a time series that no longer exists
+    datapoint_queue.put([(123456789, 1, 1)])
+
+    service.undo_last_match()
+    assert backend.list_matches(Sport.PING_PONG) == []
+    assert service.get_player("id1").ratings.get(Hand.DOMINANT, Sport.PING_PONG) == 1000
+    assert client.call_log.count(method="datapoints.insert_multiple") == 0
+    assert datapoint_queue.pending == 1
+
+
+def test_delete_legacy_match_by_event_id(client: MagicMock) -> None:
+    backend = BackendCdf("root", client)
+    match = Match("id1", "id2", 11, 0, 1000, 1000, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT, id="event:42")
+    backend.delete_match(match)
+
+    client.events.delete.assert_called_once_with(id=[42], external_id=None)
+
+
+def test_list_players_decodes_ratings_lazily(client: MagicMock) -> None:
+    backend = BackendCdf("root", client)
+    ratings = Ratings({Hand.DOMINANT: {Sport.PING_PONG: 1016}})
+    client.assets.list.return_value = [
+        Asset(id=1, external_id="id1", name="name1", metadata={RATINGS: ratings.encode()}),
+        Asset(id=2, external_id="id2", name="name2", metadata={RATINGS: Ratings().to_json()}),
+    ]
+    with patch.object(Ratings, "decode", wraps=Ratings.decode) as decode:
+        players = backend.list_players()
+        assert [p.name for p in players] == ["name1", "name2"]
+        assert decode.call_count == 0
+        assert players[0].ratings == ratings
+        assert players[0] == Player("id1", "name1", ratings)
+        assert decode.call_count == 1
+    assert backend.list_player_names() == {"id1": "name1", "id2": "name2"}
+
+
+def test_service_round_trips() -> None:
+    client = FakeCogniteClient()
+    backend = BackendCdf("root", cast(CogniteClient, client))
+    backend.create_player(Player("id1", "name1", Ratings()))
+    backend.create_player(Player("id2", "name2", Ratings()))
+    call_log = client.call_log
+
+    with call_log.operation("startup"):
+        service = PingPongService(backend)
+    with call_log.operation("first match"):
+        service.add_match("id1", Hand.DOMINANT, "id2", Hand.DOMINANT, 11, 3)
+    with call_log.operation("add_match"):
+        service.add_match("id1", Hand.DOMINANT, "id2", Hand.DOMINANT, 11, 5)
+    with call_log.operation("stats"):
+        service.get_leaderboard("id1")
+        service.get_player_stats("name1")
+    with call_log.operation("undo"):
+        service.undo_last_match()
+    with call_log.operation("rename"):
+        assert not service.update_display_name(service.get_player("id1"), "NAME2")
+        assert service.update_display_name(service.get_player("id1"), "new name")
+
+    assert call_log.by_method("startup") == {"assets.list": 1, "events.list": 2}
+    assert call_log.count("first match") == 7
+    assert call_log.by_method("add_match") == {
+        "assets.retrieve": 2,
+        "events.create": 1,
+        "assets.update": 1,
+        "datapoints.insert_multiple": 1,
+    }
+    assert call_log.by_method("stats") == {"assets.retrieve": 1}
+    assert call_log.count("undo") == 6
+    assert call_log.by_method("rename") == {"assets.retrieve": 3, "assets.update": 1}
+    assert service.get_player_stats("New Name")[1] == 1
+
+
+def test_fake_client_latency() -> None:
+    client = FakeCogniteClient(latency=0.02)
+    start = time.perf_counter()
+    assert client.assets.retrieve(external_id="missing") is None
+    assert time.perf_counter() - start >= 0.02
+    assert client.call_log.by_method() == {"assets.retrieve": 1}
@@ -0,0 +1,27 @@
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Hand, Match, Player, Sport
+from src.backend.rating import Ratings
+
+
+class TestBackendInMemory:
+    def test_get_player_by_name(self) -> None:
+        backend = BackendInMemory()
+        backend.create_player(Player("id1", "Name1", Ratings()))
+        assert backend.get_player_by_name("name1") == Player("id1", "Name1", Ratings())
+
+        backend.update_player("id1", name="newname")
+        assert backend.get_player_by_name("name1") is None
+        assert backend.get_player_by_name("NEWNAME") == Player("id1", "newname", Ratings())
+
+    def test_matches_are_partitioned_by_sport(self) -> None:
+        backend = BackendInMemory()
+        matches = [
+            Match("id1", "id2", i, 0, 1000, 1000, sport, Hand.DOMINANT, Hand.DOMINANT)
+            for i in range(1, 4)
+            for sport in Sport
+        ]
+        for match in matches:
+            backend.create_match(match)
+        assert backend.list_matches(Sport.SQUASH) == [m for m in matches if m.sport == Sport.SQUASH]
+        backend.list_matches(Sport.SQUASH).clear()
+        assert len(backend.list_matches(Sport.SQUASH)) == 3
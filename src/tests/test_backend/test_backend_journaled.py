@@ -0,0 +1,114 @@
+import os
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from src.backend.backend import Backend
+from src.backend.backend_deferred import DeferredBackend
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.backend_journaled import JOURNAL_FILE, SNAPSHOT_FILE, JournaledBackend
+from src.backend.data_classes import Hand, Player, Sport
+from src.backend.rating import Ratings
+from src.tests.conftest import a_match
+
+
+def fill(backend: JournaledBackend) -> None:
+    p1 = backend.create_player(Player("id1", "name1", Ratings()))
+    backend.create_player(Player("id2", "name2", Ratings()))
+    backend.create_match(a_match(1))
+    with backend.transaction() as transaction:
+        transaction.create_match(a_match(2))
+        transaction.update_player(p1, ratings=p1.ratings.update(Hand.DOMINANT, Sport.PING_PONG, 1016))
+    backend.update_player("id2", name="newname")
+
+
+class TestJournaledBackend:
+    def test_bootstraps_from_wrapped_backend(self, tmp_path: Path) -> None:
+        inner = BackendInMemory()
+        inner.create_player(Player("id1", "name1", Ratings()))
+        inner.create_match(a_match(1))
+        backend = JournaledBackend(inner, str(tmp_path))
+        assert backend.list_players() == inner.list_players()
+        assert backend.list_matches(Sport.PING_PONG) == [a_match(1)]
+
+    def test_recovers_from_journal_without_wrapped_backend(self, tmp_path: Path) -> None:
+        backend = JournaledBackend(BackendInMemory(), str(tmp_path))
+        fill(backend)
+        backend.close()
+
+        inner = MagicMock()
+        recovered = JournaledBackend(inner, str(tmp_path))
+        assert inner.list_players.call_count == 0
+        assert inner.list_matches.call_count == 0
+        assert recovered.list_players() == backend.list_players()
+        assert recovered.list_matches(Sport.PING_PONG) == [a_match(1), a_match(2)]
+        assert recovered.get_player("id1") == Player("id1", "name1", Ratings({Hand.DOMINANT: {Sport.PING_PONG: 1016}}))
+
+    def test_snapshot_compacts_journal(self, tmp_path: Path) -> None:
+        backend = JournaledBackend(BackendInMemory(), str(tmp_path), snapshot_interval=4)
+        fill(backend)
+        backend.close()
+        assert os.path.getsize(tmp_path / JOURNAL_FILE) > 0
+        assert os.path.getsize(tmp_path / SNAPSHOT_FILE) > 0
+
+        recovered = JournaledBackend(MagicMock(), str(tmp_path), snapshot_interval=4)
+        assert recovered.list_players() == backend.list_players()
+        assert recovered.list_matches(Sport.PING_PONG) == backend.list_matches(Sport.PING_PONG)
+
+    def test_torn_journal_tail_is_discarded(self, tmp_path: Path) -> None:
+        backend = JournaledBackend(BackendInMemory(), str(tmp_path))
+        fill(backend)
+        backend.close()
+        journal_size = os.path.getsize(tmp_path / JOURNAL_FILE)
+        with open(tmp_path / JOURNAL_FILE, "ab") as f:
+            f.write(b"\x01\x02\x03")
+
+        recovered = JournaledBackend(BackendInMemory(), str(tmp_path))
+        assert os.path.getsize(tmp_path / JOURNAL_FILE) == journal_size
+        recovered.create_match(a_match(3))
+        recovered.close()
+        assert JournaledBackend(MagicMock(), str(tmp_path)).list_matches(Sport.PING_PONG)[-1] == a_match(3)
+
+    def test_reconcile_replaces_diverged_local_copy(self, tmp_path: Path) -> None:
+        inner = BackendInMemory()
+        backend = JournaledBackend(inner, str(tmp_path))
+        fill(backend)
+        backend.close()
+        assert not JournaledBackend(inner, str(tmp_path)).reconcile()
+
+        inner.create_match(a_match(3).with_id())
+        inner.update_player("id1", name="renamed")
+        recovered = JournaledBackend(inner, str(tmp_path))
+        assert recovered.recovered
+        assert recovered.list_matches(Sport.PING_PONG) == [a_match(1), a_match(2)]
+        assert recovered.reconcile()
+        assert recovered.list_matches(Sport.PING_PONG) == [a_match(1), a_match(2), a_match(3)]
+        assert recovered.get_player_by_name("renamed") == inner.get_player("id1")
+        recovered.close()
+        assert JournaledBackend(MagicMock(), str(tmp_path)).list_players() == inner.list_players()
+
+    def test_recovers_before_deferred_backend_is_created(self, tmp_path: Path) -> None:
+        inner = BackendInMemory()
+        fill(JournaledBackend(inner, str(tmp_path)))
+        created = threading.Event()
+
+        def create() -> Backend:
+            created.wait()
+            return inner
+
+        deferred = DeferredBackend(create)
+        recovered = JournaledBackend(deferred, str(tmp_path))
+        assert not deferred.is_ready()
+        assert recovered.get_player("id2") == inner.get_player("id2")
+        created.set()
+        recovered.create_match(a_match(3))
+        assert inner.list_matches(Sport.PING_PONG)[-1] == a_match(3)
+        assert not recovered.reconcile()
+
+    def test_deferred_backend_retries_creation(self, tmp_path: Path) -> None:
+        inner = BackendInMemory()
+        factory = MagicMock(side_effect=[IOError, IOError, inner])
+        deferred = DeferredBackend(factory, backoff=0.001)
+        deferred.create_player(Player("id1", "name1", Ratings()))
+        assert factory.call_count == 3
+        assert inner.get_player("id1") == Player("id1", "name1", Ratings())
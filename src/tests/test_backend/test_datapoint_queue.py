@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from cognite.client.exceptions import CogniteAPIError, CogniteNotFoundError
+
+from src.backend.datapoint_queue import DEAD_LETTER_FILE, JOURNAL_FILE, DatapointQueue
+
+
+def test_put_only_journals(tmp_path: Path) -> None:
+    queue = DatapointQueue(str(tmp_path), flush_interval=60)
+    insert = MagicMock()
+    queue.start(insert, MagicMock())
+    queue.put([(10, 1000, 1016), (20, 1000, 984)])
+    assert insert.call_count == 0
+    assert queue.pending == 2
+
+    queue.flush()
+    insert.assert_called_once_with([{"id": 10, "datapoints": [(1000, 1016)]}, {"id": 20, "datapoints": [(1000, 984)]}])
+    assert queue.pending == 0
+    queue.close()
+
+
+def test_flushes_in_batches_when_batch_is_full(tmp_path: Path) -> None:
+    queue = DatapointQueue(str(tmp_path), batch_size=2, flush_interval=60)
+    inserted = threading.Event()
+    batches: list[list[dict[str, Any]]] = []
+
+    def insert(datapoints: list[dict[str, Any]]) -> None:
+        batches.append(datapoints)
+        inserted.set()
+
+    queue.start(insert, MagicMock())
+    queue.put([(10, 1000, 1016)])
+    queue.put([(10, 2000, 1030), (10, 3000, 1040)])
+    assert inserted.wait(5)
+    queue.close()
+    assert batches == [
+        [{"id": 10, "datapoints": [(1000, 1016), (2000, 1030)]}],
+        [{"id": 10, "datapoints": [(3000, 1040)]}],
+    ]
+
+
+def test_flushes_after_interval(tmp_path: Path) -> None:
+    queue = DatapointQueue(str(tmp_path), flush_interval=0.01)
+    inserted = threading.Event()
+    queue.start(lambda datapoints: inserted.set(), MagicMock())
+    queue.put([(10, 1000, 1016)])
+    assert inserted.wait(5)
+    queue.close()
+
+
+def test_retries_with_backoff(tmp_path: Path) -> None:
+    queue = DatapointQueue(str(tmp_path), flush_interval=60, max_attempts=3, backoff=0.001)
+    insert = MagicMock(side_effect=[IOError, IOError, None])
+    queue.start(insert, MagicMock())
+    queue.put([(10, 1000, 1016)])
+    queue.flush()
+    assert insert.call_count == 3
+    assert queue.pending == 0
+    queue.close()
+
+
+def test_failed_batches_stay_queued_across_restarts(tmp_path: Path) -> None:
+    queue = DatapointQueue(str(tmp_path), flush_interval=60, max_attempts=2, backoff=0.001)
+    queue.start(MagicMock(side_effect=IOError), MagicMock())
+    queue.put([(10, 1000, 1016)])
+    queue.put([(20, 1000, 984)])
+    with pytest.raises(IOError):
+        queue.flush()
+    queue.close()
+    with open(tmp_path / JOURNAL_FILE, "ab") as f:
+        f.write(b"[[30,1000")
+
+    recovered = DatapointQueue(str(tmp_path), flush_interval=60)
+    assert recovered.pending == 2
+    insert = MagicMock()
+    recovered.start(insert, MagicMock())
+    recovered.close()
+    insert.assert_called_once_with([{"id": 10, "datapoints": [(1000, 1016)]}, {"id": 20, "datapoints": [(1000, 984)]}])
+    assert DatapointQueue(str(tmp_path)).pending == 0
+
+
+def test_close_drains_queue(tmp_path: Path) -> None:
+    queue = DatapointQueue(str(tmp_path), flush_interval=60)
+    insert = MagicMock()
+    queue.start(insert, MagicMock())
+    queue.put([(10, 1000, 1016)])
+    queue.close()
+    insert.assert_called_once()
+    with pytest.raises(RuntimeError):
+        queue.put([(10, 2000, 1030)])
+
+
+def test_permanently_rejected_datapoints_are_dead_lettered(tmp_path: Path) -> None:
+    queue = DatapointQueue(str(tmp_path), flush_interval=60, backoff=0.001)
+    insert = MagicMock(side_effect=[CogniteNotFoundError([{"id": 20}]), None, CogniteAPIError("Bad request", 400)])
+    queue.start(insert, MagicMock())
+    queue.put([(10, 1000, 1016), (20, 1000, 984)])
+    queue.flush()
+    assert insert.call_args_list[1][0][0] == [{"id": 10, "datapoints": [(1000, 1016)]}]
+
+    queue.put([(30, 1000, 1000)])
+    queue.flush()
+    assert insert.call_count == 3
+    assert queue.pending == 0
+    queue.close()
+    with open(tmp_path / DEAD_LETTER_FILE) as f:
+        assert [json.loads(line) for line in f] == [[[20, 1000, 984]], [[30, 1000, 1000]]]
+
+
+def test_discard_does_not_wait_for_insert_in_flight(tmp_path: Path) -> None:
+    queue = DatapointQueue(str(tmp_path), flush_interval=60)
+    inserting, release = threading.Event(), threading.Event()
+
+    def insert(datapoints: list[dict[str, Any]]) -> None:
+        inserting.set()
+        assert release.wait(5)
+
+    delete = MagicMock()
+    queue.start(insert, delete)
+    queue.put([(10, 1000, 1016), (20, 1000, 984)])
+    flush = threading.Thread(target=queue.flush)
+    flush.start()
+    assert inserting.wait(5)
+
+    queue.discard([(10, 1000, 1001)])
+    assert queue.pending == 1
+    delete.assert_not_called()
+    # The discarded datapoint is being inserted, so its range is deleted again once the insert is done
+    release.set()
+    flush.join()
+    delete.assert_called_once_with([{"id": 10, "start": 1000, "end": 1001}])
+    assert queue.pending == 0
+    queue.close()
+
+
+def test_journal_is_appended_to_and_truncated_when_empty(tmp_path: Path) -> None:
+    queue = DatapointQueue(str(tmp_path), batch_size=2, flush_interval=60, max_attempts=1)
+    failed = threading.Event()
+    calls: list[list[dict[str, Any]]] = []
+
+    def insert(datapoints: list[dict[str, Any]]) -> None:
+        calls.append(datapoints)
+        if len(calls) in (2, 3):
+            failed.set()
+            raise IOError
+
+    queue.put([(10, 1000, 1016), (20, 1000, 984), (30, 1000, 1000), (40, 1000, 1000)])
+    queue.start(insert, MagicMock())
+    assert failed.wait(5)
+    # Waits for the failed flush of the background thread to finish
+    with pytest.raises(IOError):
+        queue.flush()
+    with open(tmp_path / JOURNAL_FILE) as f:
+        assert [json.loads(line) for line in f] == [
+            [[10, 1000, 1016], [20, 1000, 984], [30, 1000, 1000], [40, 1000, 1000]],
+            {"inserted": 2},
+        ]
+
+    # Rewritten once it records more removed than queued datapoints
+    queue.discard([(40, 1000, 1001)])
+    with open(tmp_path / JOURNAL_FILE) as f:
+        assert [json.loads(line) for line in f] == [[[30, 1000, 1000]]]
+    assert DatapointQueue(str(tmp_path)).pending == 1
+
+    queue.close()
+    assert len(calls) == 4
+    assert os.path.getsize(tmp_path / JOURNAL_FILE) == 0
+
+
+def test_start_is_idempotent(tmp_path: Path) -> None:
+    queue = DatapointQueue(str(tmp_path), flush_interval=60)
+    insert = MagicMock()
+    queue.start(insert, MagicMock())
+    threads = threading.active_count()
+    queue.start(MagicMock(), MagicMock())
+    assert threading.active_count() == threads
+    queue.put([(10, 1000, 1016)])
+    queue.close()
+    insert.assert_called_once()
@@ -0,0 +1,43 @@
+from src.backend.data_classes import Hand, Match, Sport
+from src.backend.match_table import MatchTable
+
+MATCHES = [
+    Match("a", "b", 11, 5, 1000, 1000, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT),
+    Match("b", "a", 11, 9, 984, 1016, Sport.PING_PONG, Hand.DOMINANT, Hand.NON_DOMINANT),
+    Match("c", "a", 3, 11, 1000, 1000, Sport.SQUASH, Hand.DOMINANT, Hand.DOMINANT),
+    Match("a", "b", 11, 7, 1016, 1000, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT),
+]
+
+
+class TestMatchTable:
+    def test_from_matches(self) -> None:
+        table = MatchTable.from_matches(MATCHES)
+        assert len(table) == 4
+        assert table.player_ids == ["a", "b", "c"]
+        assert [table.match(row) for row in range(len(table))] == MATCHES
+        assert list(table.player1_wins()) == [1, 1, 0, 1]
+
+    def test_filters(self) -> None:
+        table = MatchTable.from_matches(MATCHES)
+        assert table.rows_with_player("c") == [2]
+        assert table.rows_with_player("unknown") == []
+        assert table.rows_in_sport(Sport.PING_PONG) == [0, 1, 3]
+        assert [table.match(row) for row in range(2)] == [
+            table.take(table.rows_in_sport(Sport.PING_PONG)).match(row) for row in range(2)
+        ]
+
+    def test_wins_and_losses(self) -> None:
+        table = MatchTable.from_matches(MATCHES)
+        assert table.wins("a") == 3
+        assert table.losses("a") == 1
+        assert table.wins("a", Sport.PING_PONG) == 2
+        assert table.losses("a", Sport.PING_PONG, Hand.NON_DOMINANT) == 1
+        assert table.wins("a", Sport.PING_PONG, Hand.NON_DOMINANT) == 0
+        assert table.wins("unknown") == 0
+
+    def test_head_to_head(self) -> None:
+        table = MatchTable.from_matches(MATCHES)
+        assert table.head_to_head("a", "b") == (2, 1)
+        assert table.head_to_head("b", "a") == (1, 2)
+        assert table.head_to_head("a", "c", Sport.PING_PONG) == (0, 0)
+        assert table.head_to_head("a", "c") == (1, 0)
@@ -0,0 +1,84 @@
+import urllib.request
+from typing import Iterator
+
+import pytest
+
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.backend_instrumented import InstrumentedBackend
+from src.backend.data_classes import Player
+from src.backend.metrics import Histogram, MetricsRegistry
+from src.backend.rating import Ratings
+from src.pingpong.metrics_server import MetricsServer
+from src.tests.conftest import FakeClock
+
+
+def test_histogram_quantile() -> None:
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in [0.005, 0.005, 0.05, 0.5, 5.0]:
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.quantile(0.4) == 0.01
+    assert histogram.quantile(0.6) == 0.1
+    assert histogram.quantile(1.0) == float("inf")
+
+
+def test_track_records_latency_errors_and_in_flight(clock: FakeClock) -> None:
+    metrics = MetricsRegistry(clock=clock)
+    with metrics.track("op", kind="a"):
+        assert metrics.gauge("op_in_flight", kind="a") == 1
+        clock.now += 0.02
+    with pytest.raises(ValueError):
+        with metrics.track("op", kind="a"):
+            raise ValueError
+
+    histogram = metrics.histogram("op_seconds", kind="a")
+    assert histogram.count == 2
+    assert histogram.sum == pytest.approx(0.02)
+    assert metrics.counter("op_errors_total", kind="a") == 1
+    assert metrics.gauge("op_in_flight", kind="a") == 0
+    assert metrics.summary() == ['op{kind="a"}: 2 calls, 1 errors, mean 10.0ms, p50 <= 1ms, p99 <= 25ms']
+
+
+def test_render_prometheus_text() -> None:
+    metrics = MetricsRegistry()
+    metrics.inc("requests_total", method="get")
+    metrics.observe("latency_seconds", 0.003)
+    metrics.register_gauge("queue_depth", lambda: 3)
+
+    lines = metrics.render().splitlines()
+    assert 'requests_total{method="get"} 1' in lines
+    assert 'latency_seconds_bucket{le="0.001"} 0' in lines
+    assert 'latency_seconds_bucket{le="0.005"} 1' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in lines
+    assert "latency_seconds_count 1" in lines
+    assert "# TYPE queue_depth gauge" in lines
+    assert "queue_depth 3" in lines
+
+
+def test_instrumented_backend() -> None:
+    metrics = MetricsRegistry()
+    backend = InstrumentedBackend(BackendInMemory(), metrics)
+    backend.create_player(Player("id", "name", Ratings()))
+    assert backend.get_player("id") == Player("id", "name", Ratings())
+    with pytest.raises(KeyError):
+        backend.update_player("unknown", name="x")
+
+    assert metrics.histogram("pingpong_backend_seconds", method="get_player").count == 1
+    assert metrics.histogram("pingpong_backend_seconds", method="update_player").count == 1
+    assert metrics.counter("pingpong_backend_errors_total", method="update_player") == 1
+
+
+@pytest.fixture
+def metrics_server() -> Iterator[MetricsServer]:
+    metrics = MetricsRegistry()
+    metrics.inc("requests_total")
+    server = MetricsServer(metrics, port=0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_metrics_server(metrics_server: MetricsServer) -> None:
+    with urllib.request.urlopen(f"http://127.0.0.1:{metrics_server.port}/metrics") as response:
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert "requests_total 1" in response.read().decode()
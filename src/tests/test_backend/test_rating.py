@@ -1,5 +1,7 @@
 import json
 
+import pytest
+
 from src.backend.data_classes import Hand, Sport
 from src.backend.rating import RatingCalculator, Ratings
 
@@ -10,6 +12,32 @@ def test_rating_calculator() -> None:
     assert 2000, 0 == RatingCalculator.calculate_new_elo_ratings(2000, 0, True)
 
 
+@pytest.mark.parametrize("rating2", [0, 613, 1000, 1387, 2500])
+def test_rating_table_matches_formula(rating2: int) -> None:
+    calculator = RatingCalculator()
+    for difference in range(-2000, 2001):
+        rating1 = rating2 + difference
+        for player1_win in (True, False):
+            expected = RatingCalculator.calculate_new_elo_ratings(rating1, rating2, player1_win)
+            assert calculator.new_ratings(rating1, rating2, player1_win) == expected
+
+
+def test_rating_table_with_k_factor_and_large_differences() -> None:
+    calculator = RatingCalculator(k_factor=20, max_difference=100)
+    for rating1, rating2 in [(1000, 1050), (1500, 1000), (1000, 1500)]:
+        expected = RatingCalculator.calculate_new_elo_ratings(rating1, rating2, True, k_factor=20)
+        assert calculator.new_ratings(rating1, rating2, True) == expected
+
+
+@pytest.mark.parametrize("max_difference", [2000, 100])
+def test_rating_batch(max_difference: int) -> None:
+    calculator = RatingCalculator(max_difference=max_difference)
+    ratings1, ratings2, player1_wins = [1000, 1200, 800], [1000, 950, 1400], [True, False, True]
+    new_ratings1, new_ratings2 = calculator.new_ratings_batch(ratings1, ratings2, player1_wins)
+    expected = [RatingCalculator.calculate_new_elo_ratings(*match) for match in zip(ratings1, ratings2, player1_wins)]
+    assert list(zip(new_ratings1, new_ratings2)) == expected
+
+
 class TestRatings:
     def test_get_rating_does_not_exist(self) -> None:
         r = Ratings()
@@ -44,3 +72,19 @@ class TestRatings:
             (Hand.NON_DOMINANT, Sport.PING_PONG, 1200),
         }
         assert set(ratings) == expected
+
+    def test_update_keeps_other_sports(self) -> None:
+        r = Ratings({Hand.DOMINANT: {Sport.PING_PONG: 1500, Sport.SQUASH: 900}})
+        r_updated = r.update(Hand.DOMINANT, Sport.PING_PONG, 1516)
+        assert r_updated == Ratings({Hand.DOMINANT: {Sport.PING_PONG: 1516, Sport.SQUASH: 900}})
+
+    def test_encode_decode(self) -> None:
+        r = Ratings({Hand.DOMINANT: {Sport.PING_PONG: 1500}, Hand.NON_DOMINANT: {Sport.SQUASH: 1000}})
+        assert r.encode() == "v1:1500,,,1000"
+        assert Ratings.decode(r.encode()) == r
+        assert Ratings.decode(Ratings().encode()) == Ratings()
+
+    def test_decode_legacy_json_and_short_encodings(self) -> None:
+        r = Ratings({Hand.DOMINANT: {Sport.PING_PONG: 1500}})
+        assert Ratings.decode(r.to_json()) == r
+        assert Ratings.decode("v1:1500") == r
@@ -0,0 +1,73 @@
+import random
+from unittest.mock import patch
+
+import pytest
+
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Hand, Player, Sport
+from src.backend.match_table import MatchTable
+from src.backend.rating import Ratings
+from src.backend.replay import replay, replay_backend
+from src.pingpong.pingpong_service import PingPongService
+
+
+@pytest.fixture
+def backend() -> BackendInMemory:
+    backend = BackendInMemory()
+    service = PingPongService(backend)
+    for i in range(5):
+        service.add_new_player(f"id{i}")
+    rng = random.Random(0)
+    for _ in range(200):
+        p1, p2 = rng.sample(range(5), 2)
+        hand1, hand2 = rng.choice(list(Hand)), rng.choice(list(Hand))
+        service.add_match(f"id{p1}", hand1, f"id{p2}", hand2, rng.randrange(11), 11)
+    return backend
+
+
+def test_replay_reproduces_stored_ratings(backend: BackendInMemory) -> None:
+    matches = backend.list_matches(Sport.PING_PONG)
+    result = replay(MatchTable.from_matches(matches))
+
+    assert list(result.player1_ratings) == [m.player1_rating for m in matches]
+    assert list(result.player2_ratings) == [m.player2_rating for m in matches]
+    for i, player_id in enumerate(result.player_ids):
+        player = backend.get_player(player_id)
+        assert player is not None
+        assert result.player_ratings(i) == player.ratings
+
+
+def test_replay_backend_writes_back_changed_ratings(backend: BackendInMemory) -> None:
+    with patch.object(backend, "commit", wraps=backend.commit) as commit:
+        replay_backend(backend)
+    assert commit.call_args[0][0].player_updates == []
+
+    ratings_before = [p.ratings for p in backend.list_players()]
+    replay_backend(backend, k_factor=16)
+    assert [p.ratings for p in backend.list_players()] != ratings_before
+
+    with patch.object(backend, "commit", wraps=backend.commit) as commit:
+        replay_backend(backend, k_factor=16)
+    assert commit.call_args[0][0].player_updates == []
+
+
+def test_replay_backend_writes_back_match_ratings(backend: BackendInMemory) -> None:
+    replay_backend(backend, k_factor=16)
+    matches = backend.list_matches(Sport.PING_PONG)
+    result = replay(MatchTable.from_matches(matches), k_factor=16)
+    assert [m.player1_rating for m in matches] == list(result.player1_ratings)
+    assert [m.player2_rating for m in matches] == list(result.player2_ratings)
+
+    # Undo restores the replayed ratings going into the last match
+    PingPongService(backend).undo_last_match()
+    last = matches[-1]
+    player1 = backend.get_player(last.player1_id)
+    assert player1 is not None
+    assert player1.ratings.get(last.player1_hand, Sport.PING_PONG) == last.player1_rating
+
+
+def test_replay_resets_players_without_matches() -> None:
+    backend = BackendInMemory()
+    backend.create_player(Player("id1", "name1", Ratings({Hand.DOMINANT: {Sport.PING_PONG: 1200}})))
+    replay_backend(backend)
+    assert backend.get_player("id1") == Player("id1", "name1", Ratings())
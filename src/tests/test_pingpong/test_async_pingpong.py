@@ -0,0 +1,160 @@
+import asyncio
+import threading
+from typing import Any, Iterator, Optional
+from unittest.mock import MagicMock
+
+import pytest
+from structlog.testing import capture_logs
+
+from src.backend.async_backend import ExecutorAsyncBackend
+from src.backend.async_backend_in_memory import AsyncBackendInMemory
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Hand, Player, Sport
+from src.backend.rating import Ratings
+from src.pingpong import responses
+from src.pingpong.async_pingpong_service import AsyncPingPongService
+from src.pingpong.async_slackbot import AsyncPingPongSlackBot
+from src.pingpong.pingpong_service import InvalidMatchRegistration, PlayerDoesNotExist
+
+PINGPONG_BOT_ID = "TESTTESTB"
+USER_ID = "TESTTESTU"
+CHANNEL_ID = "TESTTESTC"
+
+
+@pytest.fixture
+def loop() -> Iterator[asyncio.AbstractEventLoop]:
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture
+def backend(loop: asyncio.AbstractEventLoop) -> AsyncBackendInMemory:
+    backend = AsyncBackendInMemory()
+    for id, name in [(USER_ID, "erlend"), ("TESTID123", "name2")]:
+        asyncio.run_coroutine_threadsafe(backend.create_player(Player(id, name, Ratings())), loop).result()
+    return backend
+
+
+@pytest.fixture
+def service(backend: AsyncBackendInMemory, loop: asyncio.AbstractEventLoop) -> AsyncPingPongService:
+    return asyncio.run_coroutine_threadsafe(AsyncPingPongService.create(backend), loop).result()
+
+
+class TestAsyncPingPongService:
+    def test_add_match_and_stats(self, service: AsyncPingPongService, loop: asyncio.AbstractEventLoop) -> None:
+        async def run() -> None:
+            p1, p1_diff, p2, p2_diff = await service.add_match(
+                USER_ID, Hand.DOMINANT, "TESTID123", Hand.DOMINANT, 11, 0
+            )
+            assert (p1_diff, p2_diff) == (16, -16)
+            assert p1.ratings.get(Hand.DOMINANT, Sport.PING_PONG) == 1016
+            assert await service.get_total_matches() == 1
+            assert await service.get_leaderboard() == "1.  erlend (1016)\n2.  name2 (984)"
+            assert await service.get_player_stats("name2") == (984, 0, 1, "0.00")
+
+        asyncio.run_coroutine_threadsafe(run(), loop).result()
+
+    def test_concurrent_matches_of_a_player_are_serialized(self, loop: asyncio.AbstractEventLoop) -> None:
+        backend = BackendInMemory()
+        for id in ["a", "b", "c"]:
+            backend.create_player(Player(id, id, Ratings()))
+
+        async def run() -> None:
+            service = await AsyncPingPongService.create(ExecutorAsyncBackend(backend))
+            await asyncio.gather(
+                service.add_match("a", Hand.DOMINANT, "b", Hand.DOMINANT, 11, 0),
+                service.add_match("a", Hand.DOMINANT, "c", Hand.DOMINANT, 11, 0),
+            )
+
+        asyncio.run_coroutine_threadsafe(run(), loop).result()
+        a = backend.get_player("a")
+        assert a is not None and a.ratings.get(Hand.DOMINANT, Sport.PING_PONG) == 1031
+
+    def test_matches_of_different_players_run_concurrently(self, loop: asyncio.AbstractEventLoop) -> None:
+        # The players of both matches are only read once all four reads are in flight
+        barrier = threading.Barrier(4, timeout=5)
+
+        class BarrierBackendInMemory(BackendInMemory):
+            reads = 0
+            reads_lock = threading.Lock()
+
+            def get_player(self, id: str) -> Optional[Player]:
+                with self.reads_lock:
+                    self.reads += 1
+                    blocking = self.reads <= 4
+                if blocking:
+                    barrier.wait()
+                return super().get_player(id)
+
+        backend = BarrierBackendInMemory()
+        for id in ["a", "b", "c", "d"]:
+            backend.create_player(Player(id, id, Ratings()))
+
+        async def run() -> None:
+            service = await AsyncPingPongService.create(ExecutorAsyncBackend(backend))
+            # Undo waits for both matches instead of finding no match to undo
+            await asyncio.gather(
+                service.add_match("a", Hand.DOMINANT, "b", Hand.DOMINANT, 11, 0),
+                service.add_match("c", Hand.DOMINANT, "d", Hand.DOMINANT, 11, 0),
+                service.undo_last_match(),
+            )
+
+        asyncio.run_coroutine_threadsafe(run(), loop).result()
+        assert len(backend.list_matches(Sport.PING_PONG)) == 1
+
+    def test_add_match_invalid(self, service: AsyncPingPongService, loop: asyncio.AbstractEventLoop) -> None:
+        with pytest.raises(InvalidMatchRegistration):
+            asyncio.run_coroutine_threadsafe(
+                service.add_match(USER_ID, Hand.DOMINANT, USER_ID, Hand.DOMINANT, 11, 0), loop
+            ).result()
+        with pytest.raises(PlayerDoesNotExist):
+            asyncio.run_coroutine_threadsafe(
+                service.add_match(USER_ID, Hand.DOMINANT, "NOPE", Hand.DOMINANT, 11, 0), loop
+            ).result()
+
+
+class TestAsyncPingPongSlackBot:
+    @pytest.fixture
+    def client(self) -> MagicMock:
+        client = MagicMock()
+        client.web_client.rtm_connect.return_value = {"self": {"id": PINGPONG_BOT_ID}}
+        return client
+
+    @pytest.fixture
+    def slackbot(
+        self, service: AsyncPingPongService, client: MagicMock, loop: asyncio.AbstractEventLoop
+    ) -> AsyncPingPongSlackBot:
+        return AsyncPingPongSlackBot(service, client, {CHANNEL_ID}, loop)
+
+    @staticmethod
+    def send(slackbot: AsyncPingPongSlackBot, client: MagicMock, text: str) -> Any:
+        future = slackbot._handle(
+            client, {"type": "message", "user": USER_ID, "channel": CHANNEL_ID, "text": f"<@{PINGPONG_BOT_ID}> {text}"}
+        )
+        assert future is not None
+        future.result()
+        return client.web_client.chat_postMessage.call_args.kwargs["text"]
+
+    def test_match_and_stats(self, slackbot: AsyncPingPongSlackBot, client: MagicMock) -> None:
+        response = self.send(slackbot, client, "match <@TESTTESTU> <@TESTID123> 11 0")
+        assert "erlend: 1016 (+16)\nname2: 984 (-16)" in response
+        assert self.send(slackbot, client, "stats") == responses.stats(1, "1.  erlend (1016)\n2.  name2 (984)")
+
+    def test_ignores_other_recipients(self, slackbot: AsyncPingPongSlackBot, client: MagicMock) -> None:
+        future = slackbot._handle(
+            client, {"type": "message", "user": USER_ID, "channel": CHANNEL_ID, "text": "<@OTHER1234> stats"}
+        )
+        assert future is None
+
+    def test_failed_command_is_logged_and_answered(
+        self, slackbot: AsyncPingPongSlackBot, service: AsyncPingPongService, client: MagicMock
+    ) -> None:
+        service.get_total_matches = MagicMock(side_effect=RuntimeError("boom"))  # type: ignore[method-assign]
+        with capture_logs() as logs:
+            assert self.send(slackbot, client, "stats") == responses.command_failed()
+        assert [entry["event"] for entry in logs if entry["log_level"] == "error"] == ["Command failed"]
@@ -0,0 +1,139 @@
+import threading
+import time
+from typing import Optional
+from unittest.mock import MagicMock
+
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Hand, Player, Sport
+from src.backend.metrics import MetricsRegistry
+from src.backend.rating import Ratings
+from src.pingpong import responses
+from src.pingpong.dispatcher import CommandDispatcher
+from src.pingpong.pingpong_service import PingPongService
+from src.pingpong.slackbot import BotCommand, PingPongSlackBot
+
+PINGPONG_BOT_ID = "TESTTESTB"
+CHANNEL_ID = "TESTTESTC"
+
+
+class SlowBackendInMemory(BackendInMemory):
+    def get_player(self, id: str) -> Optional[Player]:
+        time.sleep(0.001)
+        return super().get_player(id)
+
+
+class TestCommandDispatcher:
+    def test_commands_with_same_write_key_are_serialized(self) -> None:
+        dispatcher = CommandDispatcher(max_workers=4)
+        running = []
+        overlaps = []
+
+        def command() -> None:
+            running.append(1)
+            overlaps.append(len(running) > 1)
+            time.sleep(0.01)
+            running.pop()
+
+        for _ in range(8):
+            assert dispatcher.submit(command, write_keys=["player"])
+        dispatcher.shutdown()
+        assert overlaps == [False] * 8
+        assert dispatcher.metrics().completed == 8
+
+    def test_commands_without_write_keys_run_in_parallel(self) -> None:
+        dispatcher = CommandDispatcher(max_workers=4)
+        barrier = threading.Barrier(4, timeout=5)
+        for _ in range(4):
+            dispatcher.submit(barrier.wait)
+        dispatcher.shutdown()
+        assert not barrier.broken
+
+    def test_readers_share_keys_and_writers_wait_for_them(self) -> None:
+        dispatcher = CommandDispatcher(max_workers=4)
+        barrier = threading.Barrier(2, timeout=5)
+        written = threading.Event()
+        for key in ["player1", "player2"]:
+            assert dispatcher.submit(barrier.wait, write_keys=[key], read_keys=["match-log"])
+        assert dispatcher.submit(written.set, write_keys=["match-log"])
+        dispatcher.shutdown()
+        assert not barrier.broken
+        assert written.is_set()
+
+    def test_backpressure(self) -> None:
+        dispatcher = CommandDispatcher(max_workers=1, max_pending=2)
+        release = threading.Event()
+        assert dispatcher.submit(release.wait)
+        assert dispatcher.submit(release.wait)
+        assert not dispatcher.submit(release.wait)
+        metrics = dispatcher.metrics()
+        assert metrics.rejected == 1
+        assert metrics.queue_depth + metrics.in_flight == 2
+        release.set()
+        dispatcher.shutdown()
+        assert dispatcher.metrics().completed == 2
+
+
+def test_concurrent_matches_do_not_lose_rating_updates() -> None:
+    backend = SlowBackendInMemory()
+    players = [backend.create_player(Player(f"PLAYER{i}", f"name{i}", Ratings())) for i in range(3)]
+    dispatcher = CommandDispatcher(max_workers=8)
+    client = MagicMock()
+    client.web_client.rtm_connect.return_value = {"self": {"id": PINGPONG_BOT_ID}}
+    slackbot = PingPongSlackBot(PingPongService(backend), client, {CHANNEL_ID}, dispatcher=dispatcher)
+
+    for i in range(30):
+        p1, p2 = players[i % 3], players[(i + 1) % 3]
+        event = {
+            "type": "message",
+            "user": p1.id,
+            "channel": CHANNEL_ID,
+            "text": f"<@{PINGPONG_BOT_ID}> match <@{p1.id}> <@{p2.id}> 11 {i % 10}",
+        }
+        slackbot._handle(client, event)
+    dispatcher.shutdown()
+
+    assert len(backend.list_matches(Sport.PING_PONG)) == 30
+    ratings = [p.ratings.get(Hand.DOMINANT, Sport.PING_PONG) for p in backend.list_players()]
+    assert sum(ratings) == 3000
+    assert ratings != [1000, 1000, 1000]
+
+
+def test_blocked_writers_do_not_hold_workers() -> None:
+    dispatcher = CommandDispatcher(max_workers=2)
+    release = threading.Event()
+    for _ in range(8):
+        assert dispatcher.submit(release.wait, write_keys=["match-log"])
+    read = threading.Event()
+    dispatcher.submit(read.set)
+    assert read.wait(5)
+    assert dispatcher.metrics().queue_depth == 7
+    release.set()
+    dispatcher.shutdown()
+    assert dispatcher.metrics().completed == 9
+
+
+def test_renames_to_the_same_name_are_serialized() -> None:
+    def name_command(user: str, name: str) -> BotCommand:
+        event = {"type": "message", "user": user, "channel": CHANNEL_ID, "text": f"<@{PINGPONG_BOT_ID}> name {name}"}
+        return BotCommand.from_slack_event(event)
+
+    keys1 = PingPongSlackBot._write_keys(name_command("PLAYER1", "Ace"))
+    keys2 = PingPongSlackBot._write_keys(name_command("PLAYER2", "ace"))
+    assert set(keys1) & set(keys2)
+
+
+def test_rejected_commands_are_counted() -> None:
+    dispatcher = CommandDispatcher(max_workers=1, max_pending=1)
+    release = threading.Event()
+    dispatcher.submit(release.wait)
+    client = MagicMock()
+    client.web_client.rtm_connect.return_value = {"self": {"id": PINGPONG_BOT_ID}}
+    metrics = MetricsRegistry()
+    slackbot = PingPongSlackBot(PingPongService(BackendInMemory()), client, {CHANNEL_ID}, dispatcher, metrics)
+
+    event = {"type": "message", "user": "PLAYER1", "channel": CHANNEL_ID, "text": f"<@{PINGPONG_BOT_ID}> help"}
+    slackbot._handle(client, event)
+    release.set()
+    dispatcher.shutdown()
+    assert client.web_client.chat_postMessage.call_args.kwargs["text"] == responses.busy()
+    assert metrics.counter("pingpong_dispatcher_rejected_total") == 1
@@ -0,0 +1,58 @@
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Hand, Player, Sport
+from src.backend.rating import Ratings
+from src.pingpong import responses
+from src.pingpong.leaderboard import LeaderboardIndex
+from src.pingpong.pingpong_service import LEADERBOARD_SIZE, PingPongService
+
+
+class TestLeaderboardIndex:
+    def test_rank_top_and_page(self) -> None:
+        leaderboard = LeaderboardIndex(Sport.PING_PONG)
+        leaderboard.update("a", Hand.DOMINANT, 1000)
+        leaderboard.update("b", Hand.DOMINANT, 1100)
+        leaderboard.update("a", Hand.NON_DOMINANT, 900)
+        leaderboard.update("c", Hand.DOMINANT, 1050)
+
+        assert len(leaderboard) == 4
+        assert leaderboard.rank_of("b", Hand.DOMINANT) == 1
+        assert leaderboard.rank_of("a", Hand.NON_DOMINANT) == 4
+        assert leaderboard.rank_of("b", Hand.NON_DOMINANT) is None
+        assert leaderboard.top(2) == [("b", Hand.DOMINANT, 1100), ("c", Hand.DOMINANT, 1050)]
+        assert leaderboard.page(2, 5) == [("a", Hand.DOMINANT, 1000), ("a", Hand.NON_DOMINANT, 900)]
+
+    def test_update_moves_entry(self) -> None:
+        leaderboard = LeaderboardIndex(Sport.PING_PONG)
+        leaderboard.update("a", Hand.DOMINANT, 1000)
+        leaderboard.update("b", Hand.DOMINANT, 1016)
+        leaderboard.update("a", Hand.DOMINANT, 1032)
+        assert leaderboard.top(10) == [("a", Hand.DOMINANT, 1032), ("b", Hand.DOMINANT, 1016)]
+
+        leaderboard.remove("a", Hand.DOMINANT)
+        assert leaderboard.top(10) == [("b", Hand.DOMINANT, 1016)]
+        assert leaderboard.rank_of("a", Hand.DOMINANT) is None
+
+    def test_ties_are_ordered_by_player_id(self) -> None:
+        leaderboard = LeaderboardIndex(Sport.PING_PONG)
+        for player_id in ["c", "a", "b"]:
+            leaderboard.update(player_id, Hand.DOMINANT, 1000)
+        assert [player_id for player_id, _, _ in leaderboard.top(3)] == ["a", "b", "c"]
+
+
+def test_leaderboard_shows_top_and_own_position() -> None:
+    backend = BackendInMemory()
+    for i in range(LEADERBOARD_SIZE + 2):
+        backend.create_player(Player(f"id{i:02}", f"name{i:02}", Ratings()))
+    service = PingPongService(backend)
+    for i in range(0, LEADERBOARD_SIZE + 2, 2):
+        service.add_match(f"id{i:02}", Hand.DOMINANT, f"id{i + 1:02}", Hand.DOMINANT, 11, 0)
+
+    lines = service.get_leaderboard("id21").split("\n")
+    assert len(lines) == LEADERBOARD_SIZE + 2
+    assert lines[-2:] == ["...", "22. name21 (984)"]
+    assert service.get_rank("id21", Hand.DOMINANT) == 22
+    assert "..." not in service.get_leaderboard("id00")
+
+
+def test_rank_changes_response() -> None:
+    assert responses.rank_changes("a", 3, 1, "b", None, 4) == "Leaderboard positions:\na: #1 (+2)\nb: #4 (new)\n"
@@ -0,0 +1,70 @@
+import io
+import json
+import logging
+import threading
+import time
+from typing import Iterator
+
+import pytest
+import structlog
+
+from src.pingpong.log_pipeline import LogPipeline, SamplingProcessor
+
+
+class BlockingStream(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.unblocked = threading.Event()
+
+    def write(self, s: str) -> int:
+        self.unblocked.wait()
+        return super().write(s)
+
+
+@pytest.fixture(autouse=True)
+def reset_logging() -> Iterator[None]:
+    yield
+    structlog.reset_defaults()
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def test_sampling_processor() -> None:
+    samples = iter([0.5, 0.005])
+    processor = SamplingProcessor({"ignored": 0.01}, random=lambda: next(samples))
+
+    with pytest.raises(structlog.DropEvent):
+        processor(None, "info", {"event": "ignored"})
+    assert processor(None, "info", {"event": "ignored"}) == {"event": "ignored"}
+    assert processor(None, "info", {"event": "answered"}) == {"event": "answered"}
+
+
+def test_pipeline_renders_on_listener_thread() -> None:
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream, sample_rates={"ignored": 0.0})
+    pipeline.start()
+    log = structlog.get_logger("test")
+    log.info("answered", channel="C1")
+    log.info("ignored", channel="C2")
+    logging.getLogger("stdlib").warning("plain")
+    pipeline.stop()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(line["event"], line["level"]) for line in lines] == [("answered", "info"), ("plain", "warning")]
+    assert lines[0]["channel"] == "C1"
+
+
+def test_slow_stream_does_not_block_logging() -> None:
+    stream = BlockingStream()
+    pipeline = LogPipeline(stream, max_queue_size=10)
+    pipeline.start()
+    log = structlog.get_logger("test")
+
+    start = time.monotonic()
+    for i in range(100):
+        log.info("event", i=i)
+    assert time.monotonic() - start < 1
+    assert pipeline.dropped > 0
+
+    stream.unblocked.set()
+    pipeline.stop()
+    assert len(stream.getvalue().splitlines()) == 100 - pipeline.dropped
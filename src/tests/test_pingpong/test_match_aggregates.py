@@ -0,0 +1,54 @@
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.data_classes import Hand, Player, Sport
+from src.backend.rating import Ratings
+from src.pingpong.match_aggregates import MatchAggregates
+from src.pingpong.pingpong_service import PingPongService
+from src.tests.conftest import a_match
+
+
+class TestMatchAggregates:
+    def test_empty(self) -> None:
+        aggregates = MatchAggregates()
+        assert aggregates.total_matches(Sport.PING_PONG) == 0
+        assert aggregates.wins("id1", Sport.PING_PONG) == 0
+        assert aggregates.active_players(Sport.PING_PONG) == []
+
+    def test_add(self) -> None:
+        aggregates = MatchAggregates.from_matches(
+            [
+                a_match(11, 0),
+                a_match(0, 11, hand1=Hand.NON_DOMINANT),
+                a_match(11, 5, hand1=Hand.NON_DOMINANT),
+                a_match(11, 0, sport=Sport.SQUASH),
+            ]
+        )
+        assert aggregates.total_matches(Sport.PING_PONG) == 3
+        assert aggregates.total_matches(Sport.SQUASH) == 1
+        assert aggregates.wins("id1", Sport.PING_PONG) == 2
+        assert aggregates.wins("id1", Sport.PING_PONG, Hand.NON_DOMINANT) == 1
+        assert aggregates.losses("id1", Sport.PING_PONG, Hand.NON_DOMINANT) == 1
+        assert aggregates.losses("id2", Sport.PING_PONG) == 2
+        assert aggregates.active_players(Sport.PING_PONG) == [
+            ("id1", Hand.DOMINANT),
+            ("id2", Hand.DOMINANT),
+            ("id1", Hand.NON_DOMINANT),
+        ]
+
+    def test_remove(self) -> None:
+        aggregates = MatchAggregates.from_matches([a_match(11, 0), a_match(0, 11, hand1=Hand.NON_DOMINANT)])
+        aggregates.remove(a_match(0, 11, hand1=Hand.NON_DOMINANT))
+        assert aggregates.total_matches(Sport.PING_PONG) == 1
+        assert aggregates.losses("id1", Sport.PING_PONG) == 0
+        assert aggregates.wins("id2", Sport.PING_PONG) == 0
+        assert aggregates.active_players(Sport.PING_PONG) == [("id1", Hand.DOMINANT), ("id2", Hand.DOMINANT)]
+
+    def test_service_rebuilds_aggregates_from_backend(self) -> None:
+        backend = BackendInMemory()
+        backend.create_player(Player("id1", "name1", Ratings()))
+        backend.create_player(Player("id2", "name2", Ratings()))
+        backend.create_match(a_match(11, 0))
+        backend.create_match(a_match(11, 3))
+
+        service = PingPongService(backend)
+        assert service.get_total_matches() == 2
+        assert service.get_player_stats("name2") == (1000, 0, 2, "0.00")
@@ -4,6 +4,7 @@ from unittest.mock import MagicMock
 
 import pytest
 from slack_sdk.rtm_v2 import RTMClient
+from structlog.testing import capture_logs
 
 from src.backend.backend import Backend
 from src.backend.backend_in_memory import BackendInMemory
@@ -309,22 +310,93 @@ class TestPingPongSlackbot:
         assert response == responses.player_does_not_exist()
 
     def test_undo(self, slack_user_emulator: SlackUserEmulator, created_players: list[Player]) -> None:
+        p1 = created_players[0]
+        p2 = created_players[-1]
+        slack_user_emulator.send_match_message(p1.id, p2.id, 11, 5)
+        slack_user_emulator.send_match_message(p1.id, p2.id, 11, 7, nd1=True)
+
         response = slack_user_emulator.send_undo_message()
-        assert response == responses.unknown_command()
-        # pingpong_service.add_match(TEST_USER_ID, False, PINGPONG_BOT_ID, False, 11, 0)
-        # conn, cursor = db.connect()
-        # matches = db.get_matches(cursor)
-        # winner = db.list_players(cursor, ids=[TEST_USER_ID])[0]
-        # assert len(matches) == 1
-        # assert winner.get_rating() == 1016
-        #
-        # res = slackbot.handle_command("undo", TEST_USER_ID)
-        #
-        # assert res == responses.match_undone("erlend", 1000, "pingpong", 1000)
-        #
-        # players = db.list_players(cursor)
-        # conn.close()
-        # for p in players:
-        #     assert p.get_rating() == 1000
-        #
-        # assert pingpong_service.get_total_matches() == 0
+        assert response == responses.match_undone("erlend(nd)", 1000, "name3", 984)
+        response = slack_user_emulator.send_stats_message()
+        assert response == responses.stats(1, "1.  erlend (1016)\n2.  name3 (984)")
+
+        response = slack_user_emulator.send_undo_message()
+        assert response == responses.match_undone("erlend", 1000, "name3", 1000)
+        assert slack_user_emulator.send_stats_message() == responses.stats(0, "")
+
+    def test_undo_without_matches(self, slack_user_emulator: SlackUserEmulator, created_players: list[Player]) -> None:
+        response = slack_user_emulator.send_undo_message()
+        assert response == responses.no_match_to_undo()
+
+    def test_metrics(
+        self,
+        ping_pong_service: PingPongService,
+        rtm_client: RTMClient,
+        slack_user_emulator: SlackUserEmulator,
+        created_players: list[Player],
+    ) -> None:
+        assert slack_user_emulator.send_bot_direct_message("metrics") == responses.unknown_command()
+        PingPongSlackBot(ping_pong_service, rtm_client, {CHANNEL_ID}, admin_channels={CHANNEL_ID})
+        slack_user_emulator.send_bot_direct_message("help")
+        response = slack_user_emulator.send_bot_direct_message("metrics")
+        assert 'pingpong_command{command="help"}: ' in response
+        assert 'pingpong_slack{method="chat_postMessage"}: ' in response
+
+    def test_replay(
+        self,
+        ping_pong_service: PingPongService,
+        rtm_client: RTMClient,
+        slack_user_emulator: SlackUserEmulator,
+        created_players: list[Player],
+    ) -> None:
+        slack_user_emulator.send_match_message(created_players[0].id, created_players[1].id, 11, 0)
+        assert slack_user_emulator.send_bot_direct_message("replay") == responses.unknown_command()
+        PingPongSlackBot(ping_pong_service, rtm_client, {CHANNEL_ID}, admin_channels={CHANNEL_ID})
+        assert slack_user_emulator.send_bot_direct_message("replay") == responses.ratings_replayed(1)
+        assert ping_pong_service.get_player_stats("erlend")[:3] == (1016, 1, 0)
+
+    def test_first_response_is_logged_once(self, slack_user_emulator: SlackUserEmulator) -> None:
+        with capture_logs() as logs:
+            slack_user_emulator.send_bot_direct_message("help")
+            slack_user_emulator.send_bot_direct_message("help")
+        first_responses = [entry for entry in logs if entry["event"] == "First response sent"]
+        assert len(first_responses) == 1
+        assert first_responses[0]["seconds_since_start"] >= 0
+
+    def test_failed_command_is_logged_and_answered(
+        self, ping_pong_service: PingPongService, slack_user_emulator: SlackUserEmulator, created_players: list[Player]
+    ) -> None:
+        ping_pong_service.get_total_matches = MagicMock(side_effect=RuntimeError("boom"))  # type: ignore[method-assign]
+        with capture_logs() as logs:
+            assert slack_user_emulator.send_stats_message() == responses.command_failed()
+        assert [entry["event"] for entry in logs if entry["log_level"] == "error"] == ["Command failed"]
+
+    def test_reload_picks_up_replaced_backend_contents(
+        self,
+        ping_pong_service: PingPongService,
+        slack_user_emulator: SlackUserEmulator,
+        backend: Backend,
+        created_players: list[Player],
+    ) -> None:
+        assert slack_user_emulator.send_stats_message() == responses.stats(0, "")
+        match = Match(USER_ID, "TESTID123", 11, 5, 1016, 984, Sport.PING_PONG, Hand.DOMINANT, Hand.DOMINANT)
+        backend.create_match(match)
+        ping_pong_service.reload()
+        assert ping_pong_service.get_total_matches() == 1
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        text_to_slack_event("nomention"),
+        text_to_slack_event(f"<@OTHER1234> <@{PINGPONG_BOT_ID}> help"),
+        {**text_to_slack_event(f"<@{PINGPONG_BOT_ID}> help"), "channel": "OTHERCHAN"},
+        {**text_to_slack_event(f"<@{PINGPONG_BOT_ID}> help"), "type": "reaction_added"},
+        {key: value for key, value in text_to_slack_event(f"<@{PINGPONG_BOT_ID}> help").items() if key != "user"},
+        {key: value for key, value in text_to_slack_event("").items() if key != "text"},
+    ],
+)
+def test_ignores_irrelevant_events(ping_pong_slackbot: PingPongSlackBot, event: dict[str, Any]) -> None:
+    client = MagicMock()
+    ping_pong_slackbot._handle(client, event)
+    client.web_client.chat_postMessage.assert_not_called()
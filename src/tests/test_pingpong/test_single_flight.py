@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.backend.backend_in_memory import BackendInMemory
+from src.backend.backend_instrumented import InstrumentedBackend
+from src.backend.data_classes import Hand, Player
+from src.backend.metrics import MetricsRegistry
+from src.backend.rating import Ratings
+from src.pingpong.pingpong_service import PingPongService, PlayerDoesNotExist
+from src.pingpong.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_share_one_computation() -> None:
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute() -> int:
+        calls.append(1)
+        release.wait()
+        return 42
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(single_flight.do, "key", compute) for _ in range(4)]
+        while not calls:
+            pass
+        release.set()
+        assert [future.result() for future in futures] == [42] * 4
+    assert len(calls) == 1
+
+
+def test_results_are_reused_until_invalidated() -> None:
+    single_flight = SingleFlight()
+    values = iter([1, 2])
+    assert single_flight.do("key", lambda: next(values)) == 1
+    assert single_flight.do("key", lambda: next(values)) == 1
+    single_flight.invalidate()
+    assert single_flight.do("key", lambda: next(values)) == 2
+
+
+def test_errors_are_not_remembered() -> None:
+    single_flight = SingleFlight()
+
+    def fail() -> int:
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        single_flight.do("key", fail)
+    assert single_flight.do("key", lambda: 1) == 1
+
+
+def test_result_computed_across_a_write_is_not_remembered() -> None:
+    single_flight = SingleFlight()
+
+    def compute_during_write() -> int:
+        single_flight.invalidate()
+        return 1
+
+    assert single_flight.do("key", compute_during_write) == 1
+    assert single_flight.do("key", lambda: 2) == 2
+
+
+def test_async_single_flight() -> None:
+    single_flight = AsyncSingleFlight()
+    calls = []
+
+    async def compute() -> int:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def run() -> list[int]:
+        results = await asyncio.gather(*[single_flight.do("key", compute) for _ in range(4)])
+        results.append(await single_flight.do("key", compute))
+        single_flight.invalidate()
+        results.append(await single_flight.do("key", compute))
+        return results
+
+    assert asyncio.run(run()) == [42] * 6
+    assert len(calls) == 2
+
+
+def test_service_reads_are_reused_until_the_next_write() -> None:
+    metrics = MetricsRegistry()
+    backend = InstrumentedBackend(BackendInMemory(), metrics)
+    backend.create_player(Player("id1", "name1", Ratings()))
+    backend.create_player(Player("id2", "name2", Ratings()))
+    service = PingPongService(backend)
+
+    def lookups() -> int:
+        return metrics.histogram("pingpong_backend_seconds", method="get_player_by_name").count
+
+    assert service.get_player_stats("name1") == service.get_player_stats("name1")
+    assert lookups() == 1
+    service.add_match("id1", Hand.DOMINANT, "id2", Hand.DOMINANT, 11, 5)
+    assert service.get_player_stats("name1")[1] == 1
+    assert lookups() == 2
+    with pytest.raises(PlayerDoesNotExist):
+        service.get_player_stats("nope")